@@ -0,0 +1,248 @@
+"""Микробенчмарки горячих функций шахматной логики.
+
+Замеряются ``validate_and_apply_move`` и ``compute_game_flags`` из
+``shared.chess`` (вызываются на каждый запрос к серверу и каждый клик в
+клиенте), а также ``Board.set_fen`` и ``Board._fen_to_grid`` клиента на
+наборе дебютных, миттельшпильных и эндшпильных позиций.
+
+Результаты сравниваются с базовыми из ``benchmarks/chess_baseline.json``.
+Чтобы сравнение не зависело от скорости машины, все времена делятся на
+время эталонной нагрузки на чистом Python, замеренной в том же запуске.
+Если функция стала медленнее базовой больше чем в ``--threshold`` раз,
+скрипт завершается с кодом 1.
+
+Пример::
+
+    python -m benchmarks.chess_bench                    # проверить
+    python -m benchmarks.chess_bench --update-baseline  # обновить базу
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import timeit
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import chess
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+# ``client.config`` требует адрес сервера даже без сетевых запросов
+os.environ.setdefault("SERVER_URL", "http://benchmark")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+from client.main import Board  # noqa: E402
+from shared.chess import (  # noqa: E402
+    compute_game_flags,
+    validate_and_apply_move,
+)
+
+BASELINE_PATH = Path(__file__).with_name("chess_baseline.json")
+DEFAULT_THRESHOLD = 1.5
+_CALIBRATION = "calibration"
+
+CORPUS: Dict[str, List[str]] = {
+    "opening": [
+        "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+        "rnbqkbnr/pppp1ppp/8/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R b KQkq - 1 2",
+        "r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4",
+        "rnbqkb1r/pp2pppp/3p1n2/8/3NP3/2N5/PPP2PPP/R1BQKB1R b KQkq - 2 5",
+    ],
+    "middlegame": [
+        "r1bq1rk1/pp2bppp/2n1pn2/3p4/2PP4/2N1PN2/PP2BPPP/R2QKB1R w KQ - 0 9",
+        "r2q1rk1/1b1nbppp/p2ppn2/1p6/3NP3/1BN1BP2/PPPQ2PP/2KR3R w - - 2 12",
+        "r4rk1/pp1n1ppp/2pbpq2/3p4/2PP4/1PN1P3/PB1Q1PPP/R4RK1 b - - 3 14",
+        "2r2rk1/1p1qbppp/p2pbn2/4p3/4P3/1NN1BP2/PPPQ2PP/2KR1B1R w - - 6 14",
+    ],
+    "endgame": [
+        "8/5pk1/6p1/8/3R4/6P1/5PKP/r7 w - - 0 40",
+        "8/8/4k3/3p4/3P4/4K3/8/8 w - - 0 50",
+        "6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 30",
+        "8/8/8/4k3/8/8/2Q5/K7 w - - 0 60",
+    ],
+}
+
+
+def _first_move(fen: str) -> str:
+    """Вернуть первый по алфавиту легальный ход позиции в UCI."""
+    return min(move.uci() for move in chess.Board(fen).legal_moves)
+
+
+def _cases() -> Dict[str, Callable[[], None]]:
+    """Собрать замеряемые вызовы: ключ ``функция/фаза``."""
+    cases: Dict[str, Callable[[], None]] = {}
+    for phase, fens in CORPUS.items():
+        moves = [(fen, _first_move(fen)) for fen in fens]
+        boards = [chess.Board(fen) for fen in fens]
+        client_board = Board()
+
+        def validate(moves=moves) -> None:
+            for fen, move in moves:
+                validate_and_apply_move(fen, move)
+
+        def flags(boards=boards) -> None:
+            for board in boards:
+                compute_game_flags(board)
+
+        def set_fen(fens=fens, board=client_board) -> None:
+            for fen in fens:
+                board.set_fen(fen)
+
+        def fen_to_grid(fens=fens) -> None:
+            for fen in fens:
+                Board._fen_to_grid(fen)
+
+        cases[f"validate_and_apply_move/{phase}"] = validate
+        cases[f"compute_game_flags/{phase}"] = flags
+        cases[f"Board.set_fen/{phase}"] = set_fen
+        cases[f"Board._fen_to_grid/{phase}"] = fen_to_grid
+    return cases
+
+
+def _calibration() -> None:
+    """Эталонная нагрузка на чистом Python для нормировки времён."""
+    grid: Dict[Tuple[int, int], str] = {}
+    for row in range(8):
+        for col in range(8):
+            grid[row, col] = "pnbrqk"[(row * col) % 6]
+    "".join(grid.values()).split("k")
+
+
+def measure(
+    funcs: Dict[str, Callable[[], None]], repeat: int
+) -> Dict[str, float]:
+    """Вернуть время одного вызова каждой функции в наносекундах.
+
+    Замеры идут раундами: в каждом раунде все функции замеряются по разу,
+    и для каждой берётся минимум по ``repeat`` раундам. Так кратковременная
+    посторонняя нагрузка на машину влияет на все случаи одинаково и не
+    попадает в итоговый минимум.
+    """
+    timers = {name: timeit.Timer(func) for name, func in funcs.items()}
+    numbers = {name: timer.autorange()[0] for name, timer in timers.items()}
+    best = {name: float("inf") for name in funcs}
+    for _ in range(repeat):
+        for name, timer in timers.items():
+            elapsed = timer.timeit(numbers[name]) / numbers[name]
+            best[name] = min(best[name], elapsed)
+    return {name: value * 1e9 for name, value in best.items()}
+
+
+def run(repeat: int = 7) -> Dict[str, object]:
+    """Замерить все случаи и эталонную нагрузку."""
+    funcs = {_CALIBRATION: _calibration, **_cases()}
+    results = measure(funcs, repeat)
+    calibration = results.pop(_CALIBRATION)
+    return {"calibration_ns": calibration, "results": results}
+
+
+def compare(
+    current: Dict[str, object],
+    baseline: Dict[str, object],
+    threshold: float = DEFAULT_THRESHOLD,
+) -> List[Tuple[str, float]]:
+    """Сравнить замеры с базовыми.
+
+    Returns
+    -------
+    list
+        Пары ``(имя, отношение)`` для случаев, где нормированное время
+        выросло больше чем в ``threshold`` раз. Случаи, которых нет в
+        базе, пропускаются.
+    """
+    scale = baseline["calibration_ns"] / current["calibration_ns"]
+    regressions = []
+    for name, value in current["results"].items():
+        base = baseline["results"].get(name)
+        if not base:
+            continue
+        ratio = value * scale / base
+        if ratio > threshold:
+            regressions.append((name, ratio))
+    return regressions
+
+
+def format_report(
+    current: Dict[str, object], baseline: Optional[Dict[str, object]]
+) -> str:
+    """Сформировать таблицу: время вызова и отношение к базе."""
+    scale = 1.0
+    if baseline:
+        scale = baseline["calibration_ns"] / current["calibration_ns"]
+    lines = [f"{'case':<36} {'us':>9} {'vs base':>8}"]
+    for name, value in current["results"].items():
+        base = (baseline or {}).get("results", {}).get(name)
+        ratio = f"{value * scale / base:>7.2f}x" if base else f"{'-':>8}"
+        lines.append(f"{name:<36} {value / 1000:>9.2f} {ratio}")
+    return "\n".join(lines)
+
+
+def load_baseline(path: Path) -> Optional[Dict[str, object]]:
+    """Прочитать базовые результаты; ``None``, если файла нет."""
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--baseline",
+        type=Path,
+        default=BASELINE_PATH,
+        help="файл с базовыми результатами",
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="записать текущие результаты как базовые",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="допустимое замедление относительно базы (раз)",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=7, help="число раундов замера"
+    )
+    parser.add_argument(
+        "--json", action="store_true", help="вывести результат в JSON"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+    current = run(args.repeat)
+    if args.update_baseline:
+        args.baseline.write_text(
+            json.dumps(current, indent=2, sort_keys=True) + "\n",
+            encoding="utf-8",
+        )
+        print(f"Базовые результаты записаны в {args.baseline}")
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    if args.json:
+        print(json.dumps(current, indent=2))
+    else:
+        print(format_report(current, baseline))
+    if baseline is None:
+        print(f"Нет базовых результатов в {args.baseline}", file=sys.stderr)
+        return 0
+
+    regressions = compare(current, baseline, args.threshold)
+    for name, ratio in regressions:
+        print(
+            f"Регрессия: {name} медленнее базы в {ratio:.2f} раза",
+            file=sys.stderr,
+        )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
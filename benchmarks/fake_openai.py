@@ -0,0 +1,361 @@
+"""Локальная замена OpenAI Responses API с внесением сбоев.
+
+Сервер реализует ту часть API, которой пользуется ``gpt_client``:
+``POST /v1/responses`` отвечает ходом из списка легальных ходов в запросе.
+Сценарий :class:`Scenario` задаёт распределение задержки и доли ответов
+с ошибкой 500, отказом 429 с ``Retry-After``, обрезанным текстом и
+нелегальным ходом. Сценарий можно менять на лету запросом
+``PUT /_scenario`` с JSON-телом, а счётчики ответов получить через
+``GET /_stats``.
+
+Сервер подключается через ``OPENAI_BASE_URL``::
+
+    python -m benchmarks.fake_openai --port 8900 --latency lognormal:300:0.5 \\
+        --error-rate 0.05 --rate-limit-rate 0.05
+    OPENAI_BASE_URL=http://127.0.0.1:8900/v1 uvicorn server.app.main:app
+"""
+
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+_LEGAL_MOVES = re.compile(r"Legal moves:\s*(.*)$", re.MULTILINE)
+# Ходы, которые не бывают легальными: поле не может пойти само на себя
+_ILLEGAL_MOVES = ("a1a1", "h8h8", "e4e4")
+
+
+def parse_latency(spec: str) -> Tuple[str, float, float]:
+    """Разобрать распределение задержки в миллисекундах.
+
+    Форматы: ``"200"`` — постоянная, ``"uniform:100:300"`` — равномерная
+    на отрезке, ``"exp:200"`` — экспоненциальная со средним 200,
+    ``"lognormal:200:0.5"`` — логнормальная с медианой 200 и ``sigma``
+    0.5 (длинный хвост, как у настоящего API).
+    """
+    kind, _, rest = spec.partition(":")
+    if not rest:
+        return "fixed", float(kind), 0.0
+    params = [float(value) for value in rest.split(":")]
+    if kind == "uniform" and len(params) == 2:
+        return kind, params[0], params[1]
+    if kind == "exp" and len(params) == 1:
+        return kind, params[0], 0.0
+    if kind == "lognormal" and len(params) == 2:
+        return kind, params[0], params[1]
+    raise ValueError(f"Неизвестное распределение задержки: {spec}")
+
+
+@dataclass
+class Scenario:
+    """Поведение поддельного API.
+
+    Attributes
+    ----------
+    latency: str
+        Распределение задержки ответа (см. :func:`parse_latency`).
+    error_rate: float
+        Доля ответов ``500 Internal Server Error``.
+    rate_limit_rate: float
+        Доля ответов ``429 Too Many Requests``.
+    retry_after: float
+        Значение ``Retry-After`` в секундах для ответов 429.
+    truncate_rate: float
+        Доля ответов, обрезанных по ``max_output_tokens`` (статус
+        ``incomplete`` и неполный ход).
+    illegal_rate: float
+        Доля ответов с нелегальным ходом.
+    """
+
+    latency: str = "0"
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    retry_after: float = 1.0
+    truncate_rate: float = 0.0
+    illegal_rate: float = 0.0
+
+    def __post_init__(self) -> None:
+        parse_latency(self.latency)
+
+    def delay(self, rng: random.Random) -> float:
+        """Выбрать задержку ответа в секундах."""
+        kind, first, second = parse_latency(self.latency)
+        if kind == "uniform":
+            value = rng.uniform(first, second)
+        elif kind == "exp":
+            value = rng.expovariate(1 / first) if first > 0 else 0.0
+        elif kind == "lognormal":
+            value = rng.lognormvariate(0.0, second) * first
+        else:
+            value = first
+        return max(value, 0.0) / 1000
+
+
+class FakeResponsesServer(ThreadingHTTPServer):
+    """HTTP-сервер поддельного Responses API.
+
+    Parameters
+    ----------
+    address: tuple
+        Адрес ``(host, port)``; порт ``0`` — выбрать свободный.
+    scenario: Scenario, optional
+        Исходный сценарий.
+    seed: int, optional
+        Зерно генератора случайных чисел для воспроизводимых прогонов.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int] = ("127.0.0.1", 0),
+        scenario: Optional[Scenario] = None,
+        seed: Optional[int] = None,
+    ) -> None:
+        super().__init__(address, _Handler)
+        self.scenario = scenario or Scenario()
+        self.stats: Counter = Counter()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """Адрес для ``OPENAI_BASE_URL``."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeResponsesServer":
+        """Запустить сервер в фоновом потоке."""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Остановить сервер и закрыть сокет."""
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "FakeResponsesServer":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    def decide(self) -> Tuple[str, float, float]:
+        """Выбрать исход ответа, задержку и случайное число для хода."""
+        with self._lock:
+            scenario = self.scenario
+            delay = scenario.delay(self._rng)
+            roll = self._rng.random()
+            pick = self._rng.random()
+        outcome = "ok"
+        for name, rate in (
+            ("error", scenario.error_rate),
+            ("rate_limited", scenario.rate_limit_rate),
+            ("truncated", scenario.truncate_rate),
+            ("illegal", scenario.illegal_rate),
+        ):
+            if roll < rate:
+                outcome = name
+                break
+            roll -= rate
+        with self._lock:
+            self.stats[outcome] += 1
+        return outcome, delay, pick
+
+
+def _response_body(model: str, text: str, complete: bool) -> Dict[str, Any]:
+    """Собрать объект ``response`` в формате Responses API."""
+    return {
+        "id": f"resp_{uuid.uuid4().hex}",
+        "object": "response",
+        "created_at": int(time.time()),
+        "model": model,
+        "status": "completed" if complete else "incomplete",
+        "incomplete_details": (
+            None if complete else {"reason": "max_output_tokens"}
+        ),
+        "output": [
+            {
+                "type": "message",
+                "id": f"msg_{uuid.uuid4().hex}",
+                "status": "completed" if complete else "incomplete",
+                "role": "assistant",
+                "content": [
+                    {"type": "output_text", "text": text, "annotations": []}
+                ],
+            }
+        ],
+        "parallel_tool_calls": False,
+        "tool_choice": "auto",
+        "tools": [],
+        "usage": {
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "total_tokens": 0,
+        },
+    }
+
+
+def _legal_moves(prompt: Any) -> List[str]:
+    """Извлечь список легальных ходов из текста запроса."""
+    if not isinstance(prompt, str):
+        prompt = json.dumps(prompt)
+    match = _LEGAL_MOVES.search(prompt)
+    if not match:
+        return []
+    return [move.strip() for move in match.group(1).split(",") if move]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Обработчик запросов поддельного API."""
+
+    server: FakeResponsesServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        """Не выводить журнал запросов."""
+
+    def _send(
+        self,
+        status: int,
+        body: Dict[str, Any],
+        headers: Optional[Dict[str, str]] = None,
+    ) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_json(self) -> Any:
+        length = int(self.headers.get("content-length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self) -> None:
+        if self.path == "/_stats":
+            with self.server._lock:
+                stats = dict(self.server.stats)
+            self._send(200, stats)
+        elif self.path == "/_scenario":
+            self._send(200, dataclasses.asdict(self.server.scenario))
+        else:
+            self._send(404, {"error": {"message": "Not found"}})
+
+    def do_PUT(self) -> None:
+        if self.path != "/_scenario":
+            self._send(404, {"error": {"message": "Not found"}})
+            return
+        try:
+            scenario = Scenario(**self._read_json())
+        except (TypeError, ValueError) as exc:
+            self._send(400, {"error": {"message": str(exc)}})
+            return
+        with self.server._lock:
+            self.server.scenario = scenario
+        self._send(200, dataclasses.asdict(scenario))
+
+    def do_POST(self) -> None:
+        if not self.path.rstrip("/").endswith("/responses"):
+            self._send(404, {"error": {"message": "Not found"}})
+            return
+        try:
+            request = self._read_json()
+        except ValueError:
+            self._send(400, {"error": {"message": "Invalid JSON"}})
+            return
+        outcome, delay, pick = self.server.decide()
+        if delay > 0:
+            time.sleep(delay)
+
+        if outcome == "error":
+            self._send(
+                500,
+                {"error": {"message": "Injected failure", "type": "server"}},
+            )
+            return
+        if outcome == "rate_limited":
+            retry_after = self.server.scenario.retry_after
+            self._send(
+                429,
+                {
+                    "error": {
+                        "message": "Rate limit reached",
+                        "type": "requests",
+                        "code": "rate_limit_exceeded",
+                    }
+                },
+                {
+                    "retry-after": f"{retry_after:g}",
+                    "retry-after-ms": f"{retry_after * 1000:.0f}",
+                },
+            )
+            return
+
+        legal_moves = _legal_moves(request.get("input", ""))
+        if outcome == "illegal" or not legal_moves:
+            text = next(
+                move for move in _ILLEGAL_MOVES if move not in legal_moves
+            )
+        else:
+            text = legal_moves[int(pick * len(legal_moves))]
+        if outcome == "truncated":
+            text = text[:2]
+        model = request.get("model", "fake")
+        self._send(200, _response_body(model, text, outcome != "truncated"))
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument(
+        "--latency", default="0", help="распределение задержки, мс"
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--truncate-rate", type=float, default=0.0)
+    parser.add_argument("--illegal-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    args = parse_args(argv)
+    scenario = Scenario(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        truncate_rate=args.truncate_rate,
+        illegal_rate=args.illegal_rate,
+    )
+    server = FakeResponsesServer((args.host, args.port), scenario, args.seed)
+    print(f"Поддельный Responses API: {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
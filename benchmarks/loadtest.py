@@ -0,0 +1,353 @@
+"""Нагрузочный тест ``POST /new`` и ``POST /move``.
+
+Виртуальные игроки воспроизводят записанные партии из PGN (по умолчанию
+``benchmarks/games.pgn``, партию выбирает ``--seed``): создают игру через
+``/new`` и отправляют в ``/move`` позицию партии и записанный ход той
+стороны, что начинает партию, до конца записи или ``--max-plies``
+полуходов, после чего берут следующую. Если ход ИИ расходится с записью,
+игрок всё равно отправляет следующую позицию партии, и сервер начинает
+сессию заново с её FEN.
+
+По умолчанию тест запускает приложение FastAPI в том же процессе (через
+``httpx.ASGITransport``), а обращение к модели заменяется заглушкой с
+настраиваемой задержкой, которая отвечает записанными ходами партий,
+поэтому сеть не нужна. С ``--openai-base-url`` запросы к модели идут по
+HTTP на совместимый сервер (например, ``benchmarks/fake_openai.py``), а с
+``--url`` нагрузка подаётся на работающий сервер.
+
+Пример::
+
+    python -m benchmarks.loadtest --concurrency 32 --duration 20 \\
+        --stub-latency-ms 300 --stub-jitter-ms 100
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import chess
+import chess.pgn
+import httpx
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+GAMES_PATH = Path(__file__).with_name("games.pgn")
+
+# Полуход записанной партии: FEN позиции и ход в формате UCI
+Ply = Tuple[str, str]
+
+
+@dataclass
+class EndpointStats:
+    """Задержки и ошибки запросов к одному эндпоинту."""
+
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+
+    def summary(self, elapsed: float) -> Dict[str, float]:
+        """Вернуть число запросов, пропускную способность и перцентили."""
+        samples = sorted(self.latencies)
+        return {
+            "requests": len(samples),
+            "errors": self.errors,
+            "rps": len(samples) / elapsed if elapsed > 0 else 0.0,
+            "p50_ms": percentile(samples, 50) * 1000,
+            "p95_ms": percentile(samples, 95) * 1000,
+            "p99_ms": percentile(samples, 99) * 1000,
+        }
+
+
+def percentile(samples: Sequence[float], q: float) -> float:
+    """Вернуть ``q``-й перцентиль отсортированной выборки (0 — если пусто)."""
+    if not samples:
+        return 0.0
+    index = min(int(len(samples) * q / 100), len(samples) - 1)
+    return samples[index]
+
+
+class Pacer:
+    """Ограничение общей частоты запросов ``rate`` в секунду (0 — нет)."""
+
+    def __init__(self, rate: float) -> None:
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(self._next, now) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def load_games(path: Path = GAMES_PATH) -> List[List[Ply]]:
+    """Прочитать партии из PGN как последовательности полуходов.
+
+    Поддерживаются партии с заголовком ``FEN``; партии без ходов
+    пропускаются.
+    """
+    games = []
+    with open(path, encoding="utf-8") as handle:
+        while True:
+            game = chess.pgn.read_game(handle)
+            if game is None:
+                break
+            board = game.board()
+            plies = []
+            for move in game.mainline_moves():
+                plies.append((board.fen(), move.uci()))
+                board.push(move)
+            if plies:
+                games.append(plies)
+    if not games:
+        raise ValueError(f"В {path} нет партий")
+    return games
+
+
+def install_stub_model(
+    latency_ms: float,
+    jitter_ms: float,
+    seed: int,
+    games: Sequence[Sequence[Ply]] = (),
+) -> Callable[[], None]:
+    """Заменить обращение к модели заглушкой с заданной задержкой.
+
+    Заглушка выполняется в пуле потоков, как и настоящий запрос, и
+    отвечает записанным ходом из ``games`` для известной позиции, а для
+    остальных — случайным легальным ходом. Возвращает функцию, которая
+    восстанавливает исходное обращение к модели.
+    """
+    from server.app import gpt_client
+
+    rng = random.Random(seed)
+    book = {fen: move for plies in games for fen, move in plies}
+    original = gpt_client.query_model
+
+    def stub(fen: str, legal_moves: List[str], deadline=None) -> str:
+        delay = max(latency_ms + rng.uniform(-jitter_ms, jitter_ms), 0.0)
+        time.sleep(delay / 1000)
+        move = book.get(fen)
+        return move if move in legal_moves else rng.choice(legal_moves)
+
+    def restore() -> None:
+        gpt_client.query_model = original
+        gpt_client._move_cache.clear()
+
+    gpt_client.query_model = stub
+    gpt_client._move_cache.clear()
+    return restore
+
+
+def use_openai_base_url(base_url: str) -> Callable[[], None]:
+    """Направить запросы к модели на совместимый с OpenAI сервер.
+
+    Возвращает функцию, которая восстанавливает прежний клиент OpenAI.
+    """
+    from server.app import gpt_client
+
+    original = gpt_client._client
+
+    def restore() -> None:
+        gpt_client._client = original
+        gpt_client._move_cache.clear()
+
+    gpt_client._client = gpt_client._create_client("local", base_url)
+    gpt_client._move_cache.clear()
+    return restore
+
+
+async def play(
+    http: httpx.AsyncClient,
+    stats: Dict[str, EndpointStats],
+    pacer: Pacer,
+    stop_at: float,
+    max_plies: int,
+    games: Sequence[Sequence[Ply]],
+    rng: random.Random,
+) -> None:
+    """Воспроизводить партии за одного виртуального игрока до ``stop_at``.
+
+    Игрок ходит за сторону, начинающую партию, и отправляет каждую её
+    позицию из записи, даже если ИИ ответил не записанным ходом.
+    """
+
+    async def call(path: str, payload: Optional[dict] = None):
+        await pacer.wait()
+        started = time.perf_counter()
+        try:
+            response = await http.post(path, json=payload)
+        except httpx.HTTPError:
+            stats[path].errors += 1
+            return None
+        stats[path].latencies.append(time.perf_counter() - started)
+        if response.status_code != 200:
+            stats[path].errors += 1
+            return None
+        return response.json()
+
+    while time.monotonic() < stop_at:
+        game = await call("/new")
+        if game is None:
+            continue
+        plies = rng.choice(games)[:max_plies]
+        for fen, move in plies[::2]:
+            if time.monotonic() >= stop_at:
+                break
+            data = await call(
+                "/move",
+                {
+                    "fen": fen,
+                    "side": fen.split()[1],
+                    "client_move": move,
+                    "game_id": game.get("game_id"),
+                },
+            )
+            if data is None or data.get("status") != "ok":
+                break
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    """Запустить нагрузку и вернуть сводку по эндпоинтам."""
+    games = load_games(args.games)
+    restore = None
+    if args.url:
+        transport = None
+        base_url = args.url
+    else:
+        if args.openai_base_url:
+            restore = use_openai_base_url(args.openai_base_url)
+        else:
+            restore = install_stub_model(
+                args.stub_latency_ms, args.stub_jitter_ms, args.seed, games
+            )
+        from server.app.main import app
+
+        transport = httpx.ASGITransport(app=app)
+        base_url = "http://loadtest"
+    try:
+        return await _load(args, games, transport, base_url)
+    finally:
+        if restore is not None:
+            restore()
+
+
+async def _load(
+    args: argparse.Namespace,
+    games: Sequence[Sequence[Ply]],
+    transport: Optional[httpx.AsyncBaseTransport],
+    base_url: str,
+) -> Dict[str, Dict[str, float]]:
+    """Подать нагрузку виртуальными игроками и собрать сводку."""
+    stats = {"/new": EndpointStats(), "/move": EndpointStats()}
+    pacer = Pacer(args.rate)
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(
+        transport=transport, base_url=base_url, limits=limits, timeout=60.0
+    ) as http:
+        started = time.monotonic()
+        stop_at = started + args.duration
+        await asyncio.gather(
+            *(
+                play(
+                    http,
+                    stats,
+                    pacer,
+                    stop_at,
+                    args.max_plies,
+                    games,
+                    random.Random(args.seed + index),
+                )
+                for index in range(args.concurrency)
+            )
+        )
+        elapsed = time.monotonic() - started
+    return {path: item.summary(elapsed) for path, item in stats.items()}
+
+
+def format_report(report: Dict[str, Dict[str, float]]) -> str:
+    """Сформировать таблицу результатов."""
+    lines = [
+        f"{'endpoint':<8} {'requests':>8} {'errors':>6} {'rps':>8} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    ]
+    for path, row in report.items():
+        lines.append(
+            f"{path:<8} {row['requests']:>8} {row['errors']:>6} "
+            f"{row['rps']:>8.1f} {row['p50_ms']:>8.1f} "
+            f"{row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f}"
+        )
+    return "\n".join(lines)
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--concurrency", type=int, default=16, help="виртуальных игроков"
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=0.0,
+        help="общий лимит запросов в секунду (0 — без ограничения)",
+    )
+    parser.add_argument(
+        "--duration", type=float, default=10.0, help="длительность, с"
+    )
+    parser.add_argument(
+        "--max-plies", type=int, default=60, help="полуходов в партии"
+    )
+    parser.add_argument(
+        "--stub-latency-ms",
+        type=float,
+        default=200.0,
+        help="задержка заглушки модели",
+    )
+    parser.add_argument(
+        "--stub-jitter-ms",
+        type=float,
+        default=50.0,
+        help="разброс задержки заглушки",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--games",
+        type=Path,
+        default=GAMES_PATH,
+        help="PGN с партиями для воспроизведения",
+    )
+    parser.add_argument(
+        "--openai-base-url",
+        help="адрес совместимого с OpenAI API вместо заглушки модели",
+    )
+    parser.add_argument(
+        "--url", help="адрес работающего сервера вместо запуска в процессе"
+    )
+    parser.add_argument(
+        "--json", action="store_true", help="вывести результат в JSON"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(format_report(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Профиль импорта и время холодного запуска сервера.
+
+Скрипт выводит модули, дольше всего импортируемые при загрузке
+``server.app.main`` (по данным ``python -X importtime``), и измеряет
+время от запуска процесса ``uvicorn`` до первого успешного ответа
+``GET /health``. Каждый замер выполняется в новом процессе.
+
+Пример::
+
+    python -m benchmarks.startup --runs 5 --top 15
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+ROOT = Path(__file__).resolve().parents[1]
+MODULE = "server.app.main"
+
+
+def _free_port() -> int:
+    """Вернуть свободный TCP-порт на локальном интерфейсе."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def import_profile(module: str = MODULE) -> List[Tuple[str, float, float]]:
+    """Импортировать ``module`` в новом процессе и вернуть профиль.
+
+    Returns
+    -------
+    list
+        Тройки ``(модуль, собственное время, суммарное время)`` в
+        миллисекундах в порядке завершения импорта.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.split(":", 1)[1].split("|")
+        rows.append(
+            (name.strip(), int(self_us) / 1000, int(cumulative_us) / 1000)
+        )
+    return rows
+
+
+def cold_start(timeout: float = 30.0) -> float:
+    """Запустить сервер и вернуть время до первого ответа ``/health``."""
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}/health"
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            f"{MODULE}:app",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        cwd=ROOT,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+    )
+    try:
+        with httpx.Client(timeout=1.0) as client:
+            while time.perf_counter() - started < timeout:
+                try:
+                    if client.get(url).status_code == 200:
+                        return time.perf_counter() - started
+                except httpx.TransportError:
+                    pass
+                if process.poll() is not None:
+                    raise RuntimeError("Сервер завершился при запуске")
+                time.sleep(0.005)
+        raise TimeoutError(f"/health не ответил за {timeout} с")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def run(runs: int, top: int) -> Dict[str, object]:
+    """Собрать профиль импорта и замеры холодного запуска."""
+    profile = import_profile()
+    total = next(
+        (cumulative for name, _, cumulative in profile if name == MODULE),
+        0.0,
+    )
+    slowest = sorted(profile, key=lambda row: row[1], reverse=True)[:top]
+    starts = [cold_start() * 1000 for _ in range(runs)]
+    return {
+        "import_ms": total,
+        "slowest_imports": [
+            {"module": name, "self_ms": own, "cumulative_ms": cumulative}
+            for name, own, cumulative in slowest
+        ],
+        "cold_start_ms": {
+            "median": statistics.median(starts),
+            "min": min(starts),
+            "max": max(starts),
+        },
+    }
+
+
+def format_report(report: Dict[str, object]) -> str:
+    """Сформировать текстовый отчёт."""
+    lines = [
+        f"Импорт {MODULE}: {report['import_ms']:.0f} мс",
+        "",
+        f"{'module':<48} {'self ms':>8} {'cum ms':>8}",
+    ]
+    for row in report["slowest_imports"]:
+        lines.append(
+            f"{row['module']:<48} {row['self_ms']:>8.1f} "
+            f"{row['cumulative_ms']:>8.1f}"
+        )
+    start = report["cold_start_ms"]
+    lines.append("")
+    lines.append(
+        "Холодный запуск до /health: медиана {median:.0f} мс "
+        "(min {min:.0f}, max {max:.0f})".format(**start)
+    )
+    return "\n".join(lines)
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--runs", type=int, default=5, help="замеров холодного запуска"
+    )
+    parser.add_argument(
+        "--top", type=int, default=15, help="самых медленных модулей"
+    )
+    parser.add_argument(
+        "--json", action="store_true", help="вывести результат в JSON"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    args = parse_args(argv)
+    report = run(args.runs, args.top)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(format_report(report))
+
+
+if __name__ == "__main__":
+    main()
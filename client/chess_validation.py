@@ -1,5 +1,17 @@
 """Обёртка над общими функциями шахматной логики для клиента."""
 
-from shared.chess import compute_game_flags, validate_and_apply_move
+from shared.chess import (
+    PositionAnalysis,
+    analyze_position,
+    compute_game_flags,
+    position_hash,
+    validate_and_apply_move,
+)
 
-__all__ = ["validate_and_apply_move", "compute_game_flags"]
+__all__ = [
+    "validate_and_apply_move",
+    "compute_game_flags",
+    "analyze_position",
+    "PositionAnalysis",
+    "position_hash",
+]
@@ -35,3 +35,5 @@ load_env_smart()
 SERVER_URL = os.getenv("SERVER_URL")
 if not SERVER_URL:
     raise RuntimeError("Переменная окружения SERVER_URL не задана")
+# Показывать тайминги сервера поверх доски с самого запуска (F3 — переключить)
+SHOW_TIMINGS = os.getenv("SHOW_TIMINGS") == "1"
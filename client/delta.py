@@ -0,0 +1,108 @@
+"""Компактный протокол ходов: хэш позиции вместо FEN.
+
+:class:`DeltaMoveClient` хранит у себя доску python-chess и хэш
+последней позиции, подтверждённой сервером. Если доска клиента совпадает
+с ней, ход отправляется в ``/move/delta`` без FEN, а новая позиция
+вычисляется локально применением хода ИИ. При расхождении хэшей или
+ошибке ``resync_required`` ход отправляется в ``/move`` с полным FEN и
+полем ``delta``, по которому сервер возвращает хэш новой позиции.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Any, Optional
+
+import chess
+import httpx
+
+from client.chess_validation import position_hash
+
+logger = logging.getLogger(__name__)
+
+RESYNC_REQUIRED = "resync_required"
+
+
+class DeltaMoveClient:
+    """Отправка ходов через ``/move/delta`` с откатом на ``/move``.
+
+    Parameters
+    ----------
+    http_client: httpx.Client
+        Клиент с ``base_url`` сервера.
+    """
+
+    def __init__(self, http_client: httpx.Client) -> None:
+        self.http_client = http_client
+        self.board: Optional[chess.Board] = None
+        self.hash: Optional[str] = None
+        self.enabled = True
+        # Заголовок Server-Timing последнего ответа
+        self.server_timing = ""
+
+    def send_move(self, fen: str, side: str, move: str) -> dict[str, Any]:
+        """Отправить ход и вернуть ответ в формате ``/move``.
+
+        Ответ всегда содержит ``new_fen``: при компактном обмене он
+        вычисляется на клиенте.
+        """
+        if self.enabled and self.hash is not None and self._matches(fen):
+            data = self._send_delta(move)
+            if data is not None:
+                return data
+        return self._send_full(fen, side, move)
+
+    def _matches(self, fen: str) -> bool:
+        """Совпадает ли позиция ``fen`` с последней подтверждённой."""
+        return self.board is not None and self.board.fen() == fen
+
+    def _send_delta(self, move: str) -> Optional[dict[str, Any]]:
+        """Отправить ход в ``/move/delta``; ``None`` — нужен полный FEN."""
+        response = self.http_client.post(
+            "/move/delta",
+            json={
+                "hash": self.hash,
+                "client_move": move,
+                "halfmove_clock": self.board.halfmove_clock,
+                "fullmove_number": self.board.fullmove_number,
+            },
+        )
+        self.server_timing = response.headers.get("server-timing", "")
+        if response.status_code == 404:
+            logger.info("Сервер не поддерживает /move/delta")
+            self.enabled = False
+            return None
+        response.raise_for_status()
+        data = response.json()
+        if RESYNC_REQUIRED in data.get("errors", []):
+            logger.info("Сервер запросил полную синхронизацию позиции")
+            return None
+        board = self.board.copy()
+        if data.get("applied_client_move"):
+            board.push_uci(move)
+        if data.get("ai_move"):
+            board.push_uci(data["ai_move"])
+        if data.get("hash") and position_hash(board) != data["hash"]:
+            logger.warning("Хэш позиции расходится с сервером")
+            self.hash = None
+            return None
+        self.board = board
+        self.hash = data.get("hash") or self.hash
+        data["new_fen"] = board.fen()
+        return data
+
+    def _send_full(self, fen: str, side: str, move: str) -> dict[str, Any]:
+        """Отправить ход в ``/move`` с полным FEN."""
+        payload = {"fen": fen, "side": side, "client_move": move}
+        if self.enabled:
+            payload["delta"] = True
+        response = self.http_client.post("/move", json=payload)
+        self.server_timing = response.headers.get("server-timing", "")
+        data = response.json()
+        self.hash = data.get("hash")
+        new_fen = data.get("new_fen")
+        try:
+            self.board = chess.Board(new_fen) if new_fen else None
+        except ValueError:
+            self.board = None
+        return data
@@ -14,7 +14,8 @@ import pygame
 # Добавляем корневую директорию проекта в путь поиска модулей
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 from client.chess_validation import validate_and_apply_move  # noqa: E402
-from client.config import SERVER_URL  # noqa: E402
+from client.config import SERVER_URL, SHOW_TIMINGS  # noqa: E402
+from client.delta import DeltaMoveClient  # noqa: E402
 from logging_config import setup_logging  # noqa: E402
 
 WHITE = (240, 217, 181)
@@ -23,6 +24,9 @@ LAST_MOVE_COLOR = (246, 246, 105)
 SELECT_COLOR = (106, 170, 100)
 COORD_COLOR = (0, 0, 0)
 COORD_FONT_SIZE = 16
+TIMINGS_FONT_SIZE = 20
+TIMINGS_BACKGROUND = (0, 0, 0, 170)
+TIMINGS_COLOR = (255, 255, 255)
 BOARD_SIZE = 8
 SQUARE_SIZE = 80
 WINDOW_SIZE = BOARD_SIZE * SQUARE_SIZE
@@ -114,6 +118,81 @@ def uci_to_coords(move: str) -> tuple[tuple[int, int], tuple[int, int]]:
     return from_sq, to_sq
 
 
+def parse_server_timing(header: str) -> dict[str, float]:
+    """Разобрать заголовок ``Server-Timing`` в длительности этапов.
+
+    Parameters
+    ----------
+    header: str
+        Значение заголовка, например ``"ai;dur=812.4, total;dur=813.9"``.
+
+    Returns
+    -------
+    dict[str, float]
+        Длительности этапов в миллисекундах; повторяющиеся этапы
+        суммируются, этапы без ``dur`` пропускаются.
+    """
+    timings: dict[str, float] = {}
+    for metric in header.split(","):
+        name, *params = (part.strip() for part in metric.split(";"))
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() != "dur":
+                continue
+            try:
+                duration = float(value.strip().strip('"'))
+            except ValueError:
+                continue
+            timings[name] = timings.get(name, 0.0) + duration
+    return timings
+
+
+def format_timings(timings: dict[str, float]) -> list[str]:
+    """Подготовить строки панели таймингов сервера.
+
+    Первой строкой выводится ``total``, затем этапы по убыванию
+    длительности.
+
+    Parameters
+    ----------
+    timings: dict[str, float]
+        Длительности этапов в миллисекундах (см.
+        :func:`parse_server_timing`).
+
+    Returns
+    -------
+    list[str]
+        Строки вида ``"ai-gpt: 812.4 мс"``; пустой список, если
+        таймингов нет.
+    """
+    stages = sorted(
+        (item for item in timings.items() if item[0] != "total"),
+        key=lambda item: item[1],
+        reverse=True,
+    )
+    if "total" in timings:
+        stages.insert(0, ("total", timings["total"]))
+    return [f"{name}: {duration:.1f} мс" for name, duration in stages]
+
+
+def draw_timings(screen: pygame.Surface, lines: list[str]) -> None:
+    """Нарисовать панель таймингов сервера в левом верхнем углу."""
+    if not lines:
+        return
+    font = pygame.font.SysFont("DejaVu Sans", TIMINGS_FONT_SIZE)
+    rendered = [font.render(line, True, TIMINGS_COLOR) for line in lines]
+    pad = 4
+    width = max(text.get_width() for text in rendered) + pad * 2
+    height = sum(text.get_height() for text in rendered) + pad * 2
+    panel = pygame.Surface((width, height), pygame.SRCALPHA)
+    panel.fill(TIMINGS_BACKGROUND)
+    y = pad
+    for text in rendered:
+        panel.blit(text, (pad, y))
+        y += text.get_height()
+    screen.blit(panel, (0, 0))
+
+
 def can_select_square(board: Board, row: int, col: int) -> bool:
     """Проверить, можно ли выбрать клетку.
 
@@ -297,23 +376,26 @@ def main() -> None:
     last_move: list[tuple[int, int]] | None = None
     message = ""
     waiting = False
+    # Тайминги последнего ответа сервера для панели отладки (F3)
+    timing_lines: list[str] = []
+    show_timings = SHOW_TIMINGS
+    # Одно keep-alive соединение на всю игру вместо нового на каждый ход
+    http_client = httpx.Client(base_url=SERVER_URL, timeout=30.0)
+    # Ходы отправляются без FEN, пока позиция совпадает с серверной
+    move_client = DeltaMoveClient(http_client)
     logger.info("Клиент запущен")
 
     def send_move(fen: str, side: str, move: str) -> None:
         """Отправить ход на сервер и обработать ответ."""
-        nonlocal last_move, message, waiting
+        nonlocal last_move, message, waiting, timing_lines
         try:
-            payload = {
-                "fen": fen,
-                "side": side,
-                "client_move": move,
-            }
-            logger.info("Отправка хода: %s", payload)
-            response = httpx.post(
-                f"{SERVER_URL}/move", json=payload, timeout=30.0
-            )
-            data = response.json()
+            logger.info("Отправка хода: fen=%s move=%s", fen, move)
+            data = move_client.send_move(fen, side, move)
             logger.info("Ответ сервера: %s", data)
+            timings = parse_server_timing(move_client.server_timing)
+            if timings:
+                logger.info("Тайминги сервера, мс: %s", timings)
+            timing_lines = format_timings(timings)
             if data.get("new_fen"):
                 board.set_fen(data["new_fen"])
             if data.get("ai_move"):
@@ -339,6 +421,8 @@ def main() -> None:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                show_timings = not show_timings
             elif (
                 event.type == pygame.MOUSEBUTTONDOWN
                 and not waiting
@@ -378,6 +462,8 @@ def main() -> None:
                         selected = None
 
         draw_board(screen, board, last_move, selected)
+        if show_timings:
+            draw_timings(screen, timing_lines)
         font = pygame.font.SysFont(None, 24)
         if message:
             text = font.render(message, True, pygame.Color("red"))
@@ -391,6 +477,7 @@ def main() -> None:
             screen.blit(wait_text, (WINDOW_SIZE - 120, WINDOW_SIZE - 20))
         pygame.display.flip()
         clock.tick(30)
+    http_client.close()
     pygame.quit()
 
 
@@ -1,18 +1,179 @@
-"""Настройка уровня логирования для MiniGPTChess."""
+"""Настройка логирования для MiniGPTChess.
 
+Записи передаются через очередь фоновому потоку (``QueueListener``),
+поэтому вызов логгера не ждёт вывода в поток. Формат вывода задаётся
+``LOG_FORMAT`` (``text`` или ``json``), а ``LOG_SAMPLING`` позволяет
+пропускать часть информационных записей отдельных логгеров.
+"""
+
+import atexit
+import copy
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import random
+from typing import Any, Callable, Dict, Optional
+
+_TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+# Форматирует трассировку исключения до передачи записи в очередь
+_EXC_FORMATTER = logging.Formatter()
+
+_handler: Optional[logging.Handler] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class Lazy:
+    """Аргумент лога, вычисляемый только при выводе записи.
+
+    Пример: ``logger.info("FEN: %s", Lazy(board.fen))`` — ``board.fen()``
+    не вызывается, если запись отброшена по уровню или выборке.
+    """
+
+    __slots__ = ("func", "args")
+
+    def __init__(self, func: Callable[..., Any], *args: Any) -> None:
+        self.func = func
+        self.args = args
+
+    def __str__(self) -> str:
+        return str(self.func(*self.args))
+
+    __repr__ = __str__
+
+
+class JsonFormatter(logging.Formatter):
+    """Форматировать запись как одну строку JSON."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            # Трассировка, отформатированная до постановки в очередь
+            data["exc_info"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """Пропускать только долю записей уровня ниже ``WARNING``.
+
+    Parameters
+    ----------
+    rates: Dict[str, float]
+        Доля сохраняемых записей по имени логгера. Правило для
+        ``server.app`` действует и на ``server.app.routes``; выбирается
+        самое длинное совпадающее имя. Предупреждения и ошибки
+        сохраняются всегда.
+    """
+
+    def __init__(self, rates: Dict[str, float]) -> None:
+        super().__init__()
+        self.rates = rates
+        self._cache: Dict[str, float] = {}
+
+    def _rate(self, name: str) -> float:
+        rate = self._cache.get(name)
+        if rate is None:
+            rate = 1.0
+            best = -1
+            for prefix, value in self.rates.items():
+                matches = name == prefix or name.startswith(prefix + ".")
+                if matches and len(prefix) > best:
+                    rate, best = value, len(prefix)
+            self._cache[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Обработчик, который отбрасывает записи при переполнении очереди."""
+
+    def __init__(self, log_queue: "queue.Queue[Any]") -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Подготовить копию записи для передачи в поток вывода.
+
+        Стандартный ``prepare`` склеивает сообщение с трассировкой
+        исключения. Здесь аргументы подставляются в сообщение, а
+        трассировка сохраняется отдельно в ``exc_text``, поэтому
+        :class:`JsonFormatter` выводит её в поле ``exc_info``.
+        """
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _EXC_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def parse_sampling(spec: str) -> Dict[str, float]:
+    """Разобрать ``LOG_SAMPLING`` вида ``server.app.routes=0.1,...``."""
+    rates: Dict[str, float] = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, value = item.partition("=")
+        try:
+            rates[name.strip()] = min(max(float(value), 0.0), 1.0)
+        except ValueError:
+            continue
+    return rates
 
 
 def setup_logging() -> None:
-    """Настроить вывод логов в зависимости от переменной окружения.
+    """Настроить вывод логов в зависимости от переменных окружения.
 
     Если переменная ``DEBUG_LOGS`` установлена в ``"1"``, уровень логирования
     устанавливается на ``INFO``. В противном случае используются предупреждения
-    и ошибки.
+    и ошибки. Записи выводятся в фоновом потоке через очередь размером
+    ``LOG_QUEUE_SIZE`` (``0`` — выводить синхронно); при переполнении
+    очереди записи отбрасываются. Повторный вызов ничего не меняет.
     """
+    global _handler, _listener
+    if _handler is not None:
+        return
+    root = logging.getLogger()
     level = logging.INFO if os.getenv("DEBUG_LOGS") == "1" else logging.WARNING
-    logging.basicConfig(
-        level=level,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    )
+    root.setLevel(level)
+
+    stream = logging.StreamHandler()
+    if os.getenv("LOG_FORMAT", "text") == "json":
+        stream.setFormatter(JsonFormatter())
+    else:
+        stream.setFormatter(logging.Formatter(_TEXT_FORMAT))
+
+    queue_size = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    handler: logging.Handler = stream
+    if queue_size > 0:
+        handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+        _listener = logging.handlers.QueueListener(
+            handler.queue, stream, respect_handler_level=True
+        )
+        _listener.start()
+        atexit.register(_listener.stop)
+
+    rates = parse_sampling(os.getenv("LOG_SAMPLING", ""))
+    if rates:
+        handler.addFilter(SamplingFilter(rates))
+    _handler = handler
+    root.addHandler(handler)
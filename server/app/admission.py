@@ -0,0 +1,137 @@
+"""Контроль допуска запросов: лимит частоты по клиенту и очередь к GPT.
+
+:class:`RateLimiter` ограничивает частоту запросов каждого клиента
+алгоритмом «ведро токенов». :class:`AdmissionGate` ограничивает число
+одновременных обращений к модели и длину очереди ожидающих; при полной
+очереди запрос сразу отклоняется исключением :class:`Overloaded`, и
+сервер отвечает 429 с заголовком ``Retry-After``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Optional
+
+
+class Overloaded(Exception):
+    """Запрос отклонён; повторить его стоит через ``retry_after`` секунд."""
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(f"retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Ведро из ``burst`` токенов, пополняемое со скоростью ``rate`` в с."""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float, now: float) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, cost: float, now: float) -> Optional[float]:
+        """Забрать ``cost`` токенов.
+
+        Возвращает ``None`` при успехе или время в секундах, через
+        которое токенов станет достаточно. Запрос дороже ёмкости ведра
+        допускается при полном ведре и уводит его в долг.
+        """
+        self.tokens = min(
+            self.burst, self.tokens + (now - self.updated) * self.rate
+        )
+        self.updated = now
+        needed = min(cost, self.burst)
+        if self.tokens >= needed:
+            self.tokens -= cost
+            return None
+        return (needed - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """Лимит частоты запросов по ключу клиента (IP или ключ API).
+
+    Parameters
+    ----------
+    rate: float
+        Скорость пополнения токенов в секунду.
+    burst: float
+        Ёмкость ведра — допустимый всплеск запросов.
+    max_clients: int
+        Сколько вёдер хранить; давно не обращавшиеся клиенты вытесняются.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float,
+        max_clients: int = 10_000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.max_clients = max_clients
+        self._clock = clock
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    def check(self, key: str, cost: float = 1.0) -> Optional[float]:
+        """Списать ``cost`` запросов клиента ``key``.
+
+        Возвращает ``None``, если запрос допущен, иначе рекомендуемую
+        паузу в секундах для ``Retry-After``.
+        """
+        now = self._clock()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self.rate, self.burst, now)
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket.take(cost, now)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class AdmissionGate:
+    """Не более ``max_concurrent`` вызовов и ``max_queue`` ожидающих.
+
+    Если все места заняты и очередь заполнена, :meth:`slot` сразу
+    выбрасывает :class:`Overloaded` с паузой ``retry_after``.
+    """
+
+    def __init__(
+        self, max_concurrent: int, max_queue: int, retry_after: float = 1.0
+    ) -> None:
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._semaphore = asyncio.Semaphore(self.max_concurrent)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Занять место для вызова, дождавшись очереди при необходимости."""
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise Overloaded(self.retry_after)
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
@@ -0,0 +1,351 @@
+"""Встроенный шахматный движок для выбора хода без обращения к сети.
+
+Движок использует ``python-chess`` для генерации ходов и реализует
+перебор альфа-бета (negamax) с итеративным углублением, таблицей
+транспозиций, упорядочиванием ходов и форсированным поиском взятий.
+Поиск прерывается по истечении заданного бюджета времени, и возвращается
+лучший ход последней завершённой итерации.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import chess
+import chess.polyglot
+
+MATE_SCORE = 100_000
+_INF = MATE_SCORE + 1
+
+PIECE_VALUES = {
+    chess.PAWN: 100,
+    chess.KNIGHT: 320,
+    chess.BISHOP: 330,
+    chess.ROOK: 500,
+    chess.QUEEN: 900,
+    chess.KING: 0,
+}
+
+# Позиционные таблицы для белых; строки идут от 8-й горизонтали к 1-й
+_PST_RAW = {
+    chess.PAWN: (
+        0, 0, 0, 0, 0, 0, 0, 0,
+        50, 50, 50, 50, 50, 50, 50, 50,
+        10, 10, 20, 30, 30, 20, 10, 10,
+        5, 5, 10, 25, 25, 10, 5, 5,
+        0, 0, 0, 20, 20, 0, 0, 0,
+        5, -5, -10, 0, 0, -10, -5, 5,
+        5, 10, 10, -20, -20, 10, 10, 5,
+        0, 0, 0, 0, 0, 0, 0, 0,
+    ),
+    chess.KNIGHT: (
+        -50, -40, -30, -30, -30, -30, -40, -50,
+        -40, -20, 0, 0, 0, 0, -20, -40,
+        -30, 0, 10, 15, 15, 10, 0, -30,
+        -30, 5, 15, 20, 20, 15, 5, -30,
+        -30, 0, 15, 20, 20, 15, 0, -30,
+        -30, 5, 10, 15, 15, 10, 5, -30,
+        -40, -20, 0, 5, 5, 0, -20, -40,
+        -50, -40, -30, -30, -30, -30, -40, -50,
+    ),
+    chess.BISHOP: (
+        -20, -10, -10, -10, -10, -10, -10, -20,
+        -10, 0, 0, 0, 0, 0, 0, -10,
+        -10, 0, 5, 10, 10, 5, 0, -10,
+        -10, 5, 5, 10, 10, 5, 5, -10,
+        -10, 0, 10, 10, 10, 10, 0, -10,
+        -10, 10, 10, 10, 10, 10, 10, -10,
+        -10, 5, 0, 0, 0, 0, 5, -10,
+        -20, -10, -10, -10, -10, -10, -10, -20,
+    ),
+    chess.ROOK: (
+        0, 0, 0, 0, 0, 0, 0, 0,
+        5, 10, 10, 10, 10, 10, 10, 5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        0, 0, 0, 5, 5, 0, 0, 0,
+    ),
+    chess.QUEEN: (
+        -20, -10, -10, -5, -5, -10, -10, -20,
+        -10, 0, 0, 0, 0, 0, 0, -10,
+        -10, 0, 5, 5, 5, 5, 0, -10,
+        -5, 0, 5, 5, 5, 5, 0, -5,
+        0, 0, 5, 5, 5, 5, 0, -5,
+        -10, 5, 5, 5, 5, 5, 0, -10,
+        -10, 0, 5, 0, 0, 0, 0, -10,
+        -20, -10, -10, -5, -5, -10, -10, -20,
+    ),
+    chess.KING: (
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -20, -30, -30, -40, -40, -30, -30, -20,
+        -10, -20, -20, -20, -20, -20, -20, -10,
+        20, 20, 0, 0, 0, 0, 20, 20,
+        20, 30, 10, 0, 0, 10, 30, 20,
+    ),
+}
+
+# Итоговые оценки фигур по клеткам python-chess (a1 = 0) для каждого цвета
+_PIECE_SQUARE: Dict[Tuple[chess.Color, chess.PieceType], List[int]] = {}
+for _piece_type, _table in _PST_RAW.items():
+    _value = PIECE_VALUES[_piece_type]
+    _PIECE_SQUARE[(chess.WHITE, _piece_type)] = [
+        _value + _table[chess.square_mirror(sq)] for sq in chess.SQUARES
+    ]
+    _PIECE_SQUARE[(chess.BLACK, _piece_type)] = [
+        _value + _table[sq] for sq in chess.SQUARES
+    ]
+
+_EXACT, _LOWER, _UPPER = 0, 1, 2
+# Как часто (в узлах) проверять истечение времени
+_TIME_CHECK_INTERVAL = 256
+
+
+class SearchTimeout(Exception):
+    """Бюджет времени на поиск исчерпан."""
+
+
+def evaluate(board: chess.Board) -> int:
+    """Оценить позицию в сантипешках с точки зрения стороны, делающей ход."""
+    score = 0
+    for square, piece in board.piece_map().items():
+        value = _PIECE_SQUARE[(piece.color, piece.piece_type)][square]
+        score += value if piece.color == chess.WHITE else -value
+    return score if board.turn == chess.WHITE else -score
+
+
+def _capture_score(board: chess.Board, move: chess.Move) -> int:
+    """Оценить взятие по схеме MVV-LVA."""
+    if board.is_en_passant(move):
+        victim = chess.PAWN
+    else:
+        victim = board.piece_type_at(move.to_square) or chess.PAWN
+    attacker = board.piece_type_at(move.from_square) or chess.PAWN
+    return PIECE_VALUES[victim] * 10 - PIECE_VALUES[attacker]
+
+
+class _Search:
+    """Состояние одного поиска: счётчик узлов и крайний срок."""
+
+    def __init__(self, engine: "Engine", deadline: float) -> None:
+        self.engine = engine
+        self.deadline = deadline
+        self.nodes = 0
+
+    def _tick(self) -> None:
+        self.nodes += 1
+        if (
+            self.nodes % _TIME_CHECK_INTERVAL == 0
+            and time.perf_counter() >= self.deadline
+        ):
+            raise SearchTimeout
+
+    def order_moves(
+        self,
+        board: chess.Board,
+        moves: Sequence[chess.Move],
+        tt_move: Optional[chess.Move],
+    ) -> List[chess.Move]:
+        """Упорядочить ходы: ход из таблицы, взятия, превращения, прочие."""
+
+        def key(move: chess.Move) -> int:
+            if move == tt_move:
+                return -1_000_000
+            score = 0
+            if board.is_capture(move):
+                score -= 10_000 + _capture_score(board, move)
+            if move.promotion:
+                score -= PIECE_VALUES[move.promotion]
+            return score
+
+        return sorted(moves, key=key)
+
+    def quiescence(self, board: chess.Board, alpha: int, beta: int) -> int:
+        """Досчитать взятия, чтобы не оценивать позицию посреди размена."""
+        self._tick()
+        stand_pat = evaluate(board)
+        if stand_pat >= beta:
+            return stand_pat
+        alpha = max(alpha, stand_pat)
+        captures = self.order_moves(
+            board, list(board.generate_legal_captures()), None
+        )
+        for move in captures:
+            board.push(move)
+            score = -self.quiescence(board, -beta, -alpha)
+            board.pop()
+            if score >= beta:
+                return score
+            alpha = max(alpha, score)
+        return alpha
+
+    def negamax(
+        self,
+        board: chess.Board,
+        depth: int,
+        alpha: int,
+        beta: int,
+        ply: int,
+    ) -> int:
+        """Перебор альфа-бета с таблицей транспозиций."""
+        self._tick()
+        moves = list(board.legal_moves)
+        if not moves:
+            return -MATE_SCORE + ply if board.is_check() else 0
+        if board.is_insufficient_material() or board.halfmove_clock >= 100:
+            return 0
+        if depth <= 0:
+            return self.quiescence(board, alpha, beta)
+
+        key = chess.polyglot.zobrist_hash(board)
+        entry = self.engine.table.get(key)
+        tt_move = None
+        if entry is not None:
+            entry_depth, entry_value, entry_flag, tt_move = entry
+            if entry_depth >= depth and ply > 0:
+                if entry_flag == _EXACT:
+                    return entry_value
+                if entry_flag == _LOWER and entry_value >= beta:
+                    return entry_value
+                if entry_flag == _UPPER and entry_value <= alpha:
+                    return entry_value
+
+        original_alpha = alpha
+        best_value = -_INF
+        best_move = None
+        for move in self.order_moves(board, moves, tt_move):
+            board.push(move)
+            value = -self.negamax(board, depth - 1, -beta, -alpha, ply + 1)
+            board.pop()
+            if value > best_value:
+                best_value = value
+                best_move = move
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                break
+
+        if best_value <= original_alpha:
+            flag = _UPPER
+        elif best_value >= beta:
+            flag = _LOWER
+        else:
+            flag = _EXACT
+        self.engine.store(key, (depth, best_value, flag, best_move))
+        return best_value
+
+    def root(
+        self,
+        board: chess.Board,
+        depth: int,
+        moves: List[chess.Move],
+    ) -> Tuple[chess.Move, int]:
+        """Найти лучший ход корня на заданной глубине."""
+        best_move = moves[0]
+        best_value = -_INF
+        alpha = -_INF
+        for move in moves:
+            board.push(move)
+            value = -self.negamax(board, depth - 1, -_INF, -alpha, 1)
+            board.pop()
+            if value > best_value:
+                best_value = value
+                best_move = move
+            alpha = max(alpha, value)
+        return best_move, best_value
+
+
+class Engine:
+    """Движок с общей таблицей транспозиций ограниченного размера.
+
+    Таблица разделяется между вызовами :meth:`choose_move`, поэтому
+    повторные запросы похожих позиций считаются быстрее.
+    """
+
+    def __init__(self, table_size: int = 200_000) -> None:
+        self.table_size = table_size
+        self.table: Dict[int, tuple] = {}
+        self._lock = threading.Lock()
+
+    def store(self, key: int, entry: tuple) -> None:
+        """Записать результат в таблицу, очистив её при переполнении."""
+        if len(self.table) >= self.table_size:
+            with self._lock:
+                if len(self.table) >= self.table_size:
+                    self.table.clear()
+        self.table[key] = entry
+
+    def choose_move(
+        self,
+        board: chess.Board,
+        legal_moves: Optional[Sequence[str]] = None,
+        time_limit_ms: int = 200,
+        max_depth: int = 64,
+    ) -> Optional[str]:
+        """Выбрать ход для ``board`` за отведённое время.
+
+        Parameters
+        ----------
+        board: chess.Board
+            Позиция для поиска. Доска не изменяется.
+        legal_moves: Sequence[str], optional
+            Допустимые ходы в формате UCI. Если заданы, выбор ограничивается
+            ими.
+        time_limit_ms: int
+            Жёсткий бюджет времени на поиск в миллисекундах.
+        max_depth: int
+            Максимальная глубина итеративного углубления.
+
+        Returns
+        -------
+        str or None
+            Ход в формате UCI или ``None``, если подходящих ходов нет.
+        """
+        moves = list(board.legal_moves)
+        if legal_moves is not None:
+            allowed = set(legal_moves)
+            moves = [m for m in moves if m.uci() in allowed]
+        if not moves:
+            return None
+        if len(moves) == 1:
+            return moves[0].uci()
+
+        board = board.copy()
+        search = _Search(
+            self, time.perf_counter() + max(time_limit_ms, 1) / 1000
+        )
+        best_move = search.order_moves(board, moves, None)[0]
+        for depth in range(1, max_depth + 1):
+            # Лучший ход предыдущей итерации проверяется первым
+            ordered = search.order_moves(board, moves, best_move)
+            try:
+                best_move, value = search.root(board, depth, ordered)
+            except SearchTimeout:
+                break
+            if abs(value) >= MATE_SCORE - max_depth:
+                break
+        return best_move.uci()
+
+
+_default_engine: Optional[Engine] = None
+
+
+def choose_move(
+    board: chess.Board,
+    legal_moves: Optional[Sequence[str]] = None,
+    time_limit_ms: int = 200,
+    max_depth: int = 64,
+) -> Optional[str]:
+    """Выбрать ход общим экземпляром :class:`Engine`."""
+    global _default_engine
+    if _default_engine is None:
+        _default_engine = Engine()
+    return _default_engine.choose_move(
+        board, legal_moves, time_limit_ms, max_depth
+    )
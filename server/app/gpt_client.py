@@ -1,43 +1,595 @@
 """Клиент для обращения к OpenAI и получения хода ИИ."""
 
+import asyncio
+import contextvars
+import email.utils
+import functools
 import os
 import random
 import logging
-from typing import List, Optional
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Deque,
+    Dict,
+    List,
+    Optional,
+    Union,
+)
+
+from . import metrics
+from .admission import AdmissionGate
+from .move_cache import MoveCache, make_cache_key
+from .move_store import MoveStore
+from .singleflight import SingleFlight
+from .timing import span
 
-from openai import OpenAI
+if TYPE_CHECKING:  # pragma: no cover
+    import httpx
+    from openai import OpenAI
 
 logger = logging.getLogger(__name__)
 
 _MODEL = "gpt-4o-mini"
+_MAX_RETRIES = 2  # ограничение количества повторных запросов к GPT
+# Таймаут чтения ответа OpenAI в секундах
+_GPT_TIMEOUT = float(os.getenv("GPT_TIMEOUT", "10"))
+# Таймаут установки соединения с OpenAI в секундах
+_GPT_CONNECT_TIMEOUT = float(os.getenv("GPT_CONNECT_TIMEOUT", "2"))
+# Экспоненциальная задержка между повторами: база и потолок в секундах
+_GPT_BACKOFF_BASE = float(os.getenv("GPT_BACKOFF_BASE_MS", "200")) / 1000
+_GPT_BACKOFF_MAX = float(os.getenv("GPT_BACKOFF_MAX_MS", "5000")) / 1000
+# Максимальное число одновременных обращений к OpenAI из одного процесса
+_GPT_MAX_CONCURRENCY = int(os.getenv("GPT_MAX_CONCURRENCY", "64"))
+# Сколько запросов может ждать свободного места для обращения к OpenAI
+# (0 — без ограничения); при полной очереди запрос получает 429
+_GPT_QUEUE_MAX = int(os.getenv("GPT_QUEUE_MAX", "0"))
+# Значение Retry-After для отклонённых из-за очереди запросов в секундах
+_GPT_QUEUE_RETRY_AFTER = float(os.getenv("GPT_QUEUE_RETRY_AFTER", "1"))
+# Коды ответа, при которых повтор запроса имеет смысл
+_RETRYABLE_STATUSES = {408, 409, 429}
+
+
+def _create_client(
+    api_key: str, base_url: Optional[str] = None
+) -> "OpenAI":
+    """Создать клиент OpenAI с пулом keep-alive соединений.
+
+    Повторы выполняет :func:`query_model`, поэтому встроенные повторы
+    библиотеки отключены. ``base_url`` позволяет направить запросы на
+    совместимый сервер, например на ``benchmarks/fake_openai.py``.
+    """
+    import httpx
+    import openai
+
+    http_client = openai.DefaultHttpxClient(
+        limits=httpx.Limits(
+            max_connections=max(1, _GPT_MAX_CONCURRENCY) * 2,
+            max_keepalive_connections=max(1, _GPT_MAX_CONCURRENCY),
+            keepalive_expiry=30.0,
+        ),
+    )
+    return openai.OpenAI(
+        api_key=api_key,
+        base_url=base_url,
+        max_retries=0,
+        timeout=httpx.Timeout(_GPT_TIMEOUT, connect=_GPT_CONNECT_TIMEOUT),
+        http_client=http_client,
+    )
+
+
 _api_key = os.getenv("OPENAI_API_KEY")
-_client: Optional[OpenAI] = (
-    OpenAI(api_key=_api_key) if _api_key else None
+# Адрес совместимого с OpenAI API; локальному серверу ключ не нужен
+_base_url = os.getenv("OPENAI_BASE_URL") or None
+# Клиент создаётся при первом обращении (:func:`_get_client`): импорт
+# библиотеки openai занимает большую часть времени запуска воркера
+_client: Optional["OpenAI"] = None
+_client_lock = threading.Lock()
+# Создавать клиент в фоне сразу после запуска (0 — при первом запросе)
+_GPT_CLIENT_PRELOAD = os.getenv("GPT_CLIENT_PRELOAD", "1") == "1"
+_executor: Optional[ThreadPoolExecutor] = None
+_upstream_executor: Optional[ThreadPoolExecutor] = None
+
+# Страхующие (hedged) запросы: второй запрос к OpenAI запускается, если
+# первый не ответил за время, равное заданному перцентилю задержек.
+# GPT_HEDGE_PERCENTILE=0 отключает страхующие запросы.
+_GPT_HEDGE_PERCENTILE = float(os.getenv("GPT_HEDGE_PERCENTILE", "95"))
+# Задержка до страхующего запроса, пока статистики задержек недостаточно
+_GPT_HEDGE_DELAY_MS = int(os.getenv("GPT_HEDGE_DELAY_MS", "3000"))
+_HEDGE_MIN_SAMPLES = 20
+_latencies: Deque[float] = deque(maxlen=256)
+_latencies_lock = threading.Lock()
+
+# Кэш проверенных ответов GPT: при temperature=0 модель отвечает одинаково
+_move_cache = MoveCache(
+    max_entries=int(os.getenv("MOVE_CACHE_MAX_ENTRIES", "10000")),
+    max_bytes=int(os.getenv("MOVE_CACHE_MAX_BYTES", str(16 * 1024 * 1024))),
+    ttl=float(os.getenv("MOVE_CACHE_TTL", "3600")),
 )
-_MAX_RETRIES = 2  # ограничение количества повторных запросов к GPT
 
+# Постоянное хранилище ходов, общее для перезапусков и воркеров; без
+# MOVE_STORE_PATH используется файл общего состояния SHARED_STATE_PATH
+_store_path = os.getenv("MOVE_STORE_PATH") or os.getenv("SHARED_STATE_PATH")
+_move_store: Optional[MoveStore] = (
+    MoveStore(
+        _store_path,
+        max_entries=int(os.getenv("MOVE_STORE_MAX_ENTRIES", "100000")),
+    )
+    if _store_path
+    else None
+)
+_MOVE_STORE_WARMUP = int(os.getenv("MOVE_STORE_WARMUP", "0"))
+
+# Одинаковые одновременные запросы к модели объединяются в один
+_model_inflight: SingleFlight[Optional[str]] = SingleFlight()
+# Ограничение очереди обращений к модели (GPT_QUEUE_MAX)
+_gpt_gate: Optional[AdmissionGate] = (
+    AdmissionGate(_GPT_MAX_CONCURRENCY, _GPT_QUEUE_MAX, _GPT_QUEUE_RETRY_AFTER)
+    if _GPT_QUEUE_MAX > 0
+    else None
+)
+
+_GPT_REQUEST_DURATION = metrics.histogram(
+    "gpt_request_duration_seconds",
+    "Длительность запросов к OpenAI.",
+    ("outcome",),
+)
+_GPT_RETRIES = metrics.counter(
+    "gpt_retries_total", "Повторные запросы к OpenAI."
+)
+_GPT_HEDGED = metrics.counter(
+    "gpt_hedged_requests_total", "Страхующие запросы к OpenAI."
+)
 
-def get_ai_move(fen: str, legal_moves: List[str]) -> str:
-    """Вернуть ход ИИ для заданной позиции.
 
-    Parameters
-    ----------
-    fen: str
-        Состояние доски в нотации FEN.
-    legal_moves: List[str]
-        Список легальных ходов в формате UCI.
+class CircuitBreaker:
+    """Автоматический выключатель для запросов к OpenAI.
 
-    Функция обращается к OpenAI Responses API и проверяет, что полученный
-    ход присутствует в ``legal_moves``. Выполняется не более двух попыток.
-    При ошибке API или отсутствии корректного ответа выбирается случайный
-    ход.
+    В замкнутом состоянии (``closed``) запросы проходят, а их результаты
+    накапливаются в скользящем окне из ``window`` вызовов. Если доля
+    ошибок в окне достигает ``error_rate`` (при не менее чем ``min_calls``
+    вызовах), выключатель размыкается (``open``): запросы не выполняются
+    и сразу используется резервный ход. Через ``open_seconds`` секунд
+    выключатель переходит в полуоткрытое состояние (``half_open``) и
+    пропускает один пробный запрос: успех замыкает цепь, ошибка снова
+    размыкает её. Успешный вызов дольше ``slow_call_seconds`` считается
+    ошибкой.
     """
-    if not fen:
-        raise ValueError("FEN must be provided")
-    if not legal_moves:
-        raise ValueError("legal_moves must not be empty")
 
-    prompt = (
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        window: int = 20,
+        min_calls: int = 5,
+        error_rate: float = 0.5,
+        slow_call_seconds: float = 10.0,
+        open_seconds: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self._clock = clock
+        self._results: Deque[bool] = deque(maxlen=window)
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """Текущее состояние с учётом истечения времени размыкания."""
+        with self._lock:
+            if (
+                self._state == self.OPEN
+                and self._clock() - self._opened_at >= self.open_seconds
+            ):
+                return self.HALF_OPEN
+            return self._state
+
+    def allow_request(self) -> bool:
+        """Можно ли выполнить запрос к OpenAI."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if self._clock() - self._opened_at < self.open_seconds:
+                    return False
+                self._transition(self.HALF_OPEN)
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self, latency: float) -> None:
+        """Зафиксировать успешный вызов длительностью ``latency`` секунд."""
+        if latency > self.slow_call_seconds:
+            logger.warning("Медленный ответ OpenAI: %.2f с", latency)
+            self.record_failure()
+            return
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._results.clear()
+                self._transition(self.CLOSED)
+            self._probe_in_flight = False
+            self._results.append(True)
+
+    def record_failure(self) -> None:
+        """Зафиксировать ошибку вызова."""
+        with self._lock:
+            self._probe_in_flight = False
+            if self._state == self.HALF_OPEN:
+                self._trip()
+                return
+            self._results.append(False)
+            failures = self._results.count(False)
+            if (
+                self._state == self.CLOSED
+                and len(self._results) >= self.min_calls
+                and failures / len(self._results) >= self.error_rate
+            ):
+                self._trip()
+
+    def _trip(self) -> None:
+        self._opened_at = self._clock()
+        self._results.clear()
+        self._transition(self.OPEN)
+
+    def _transition(self, state: str) -> None:
+        if state != self._state:
+            logger.warning(
+                "Выключатель OpenAI: %s -> %s", self._state, state
+            )
+            self._state = state
+
+    def snapshot(self) -> Dict[str, Union[str, int]]:
+        """Вернуть состояние и число ошибок в текущем окне."""
+        state = self.state
+        with self._lock:
+            return {
+                "state": state,
+                "calls": len(self._results),
+                "failures": self._results.count(False),
+            }
+
+
+_breaker = CircuitBreaker(
+    window=int(os.getenv("GPT_BREAKER_WINDOW", "20")),
+    min_calls=int(os.getenv("GPT_BREAKER_MIN_CALLS", "5")),
+    error_rate=float(os.getenv("GPT_BREAKER_ERROR_RATE", "0.5")),
+    slow_call_seconds=float(os.getenv("GPT_BREAKER_SLOW_CALL", "8")),
+    open_seconds=float(os.getenv("GPT_BREAKER_OPEN_SECONDS", "30")),
+)
+
+
+def circuit_state() -> str:
+    """Вернуть состояние выключателя запросов к OpenAI."""
+    return _breaker.state
+
+
+def _collect_metrics() -> List[metrics.Family]:
+    """Собрать метрики кэша ходов и выключателя OpenAI."""
+    cache = _move_cache.stats()
+    state = _breaker.state
+    return [
+        (
+            "move_cache_requests_total",
+            "counter",
+            "Обращения к кэшу ходов по результату.",
+            [
+                ({"result": "hit"}, cache["hits"]),
+                ({"result": "miss"}, cache["misses"]),
+            ],
+        ),
+        (
+            "move_cache_evictions_total",
+            "counter",
+            "Вытеснения из кэша ходов.",
+            [({}, cache["evictions"])],
+        ),
+        (
+            "move_cache_entries",
+            "gauge",
+            "Число записей в кэше ходов.",
+            [({}, cache["entries"])],
+        ),
+        (
+            "move_cache_bytes",
+            "gauge",
+            "Объём кэша ходов в байтах.",
+            [({}, cache["bytes"])],
+        ),
+        (
+            "gpt_circuit_state",
+            "gauge",
+            "Состояние выключателя OpenAI (1 — текущее).",
+            [
+                ({"state": name}, 1 if name == state else 0)
+                for name in (
+                    CircuitBreaker.CLOSED,
+                    CircuitBreaker.OPEN,
+                    CircuitBreaker.HALF_OPEN,
+                )
+            ],
+        ),
+    ]
+
+
+metrics.REGISTRY.register_collector(_collect_metrics)
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Вернуть пул потоков для выбора хода, создав его при первом вызове.
+
+    Размер пула ограничивает количество одновременно обрабатываемых
+    позиций: остальные вызовы ждут в очереди пула, не блокируя цикл
+    событий.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=max(1, _GPT_MAX_CONCURRENCY),
+            thread_name_prefix="gpt",
+        )
+    return _executor
+
+
+def _get_upstream_executor() -> ThreadPoolExecutor:
+    """Вернуть пул потоков для самих HTTP-запросов к OpenAI.
+
+    Запросы, включая страхующие, выполняются в отдельном пуле, чтобы
+    поток, выбирающий ход, мог ждать первый из ответов с таймаутом.
+    """
+    global _upstream_executor
+    if _upstream_executor is None:
+        _upstream_executor = ThreadPoolExecutor(
+            max_workers=max(1, _GPT_MAX_CONCURRENCY),
+            thread_name_prefix="gpt-upstream",
+        )
+    return _upstream_executor
+
+
+def _get_client() -> Optional["OpenAI"]:
+    """Вернуть клиент OpenAI, создав его при первом обращении.
+
+    Возвращает ``None``, если не задан ни ``OPENAI_API_KEY``, ни
+    ``OPENAI_BASE_URL``.
+    """
+    global _client
+    if _client is None and (_api_key or _base_url):
+        with _client_lock:
+            if _client is None:
+                _client = _create_client(_api_key or "local", _base_url)
+    return _client
+
+
+def warm_up_client() -> None:
+    """Заранее создать клиент OpenAI, чтобы первый ход не ждал импорта.
+
+    Вызывается в фоне после запуска сервера, если ``GPT_CLIENT_PRELOAD``
+    не равен ``"0"``.
+    """
+    if not _GPT_CLIENT_PRELOAD or _client is not None:
+        return
+    started = time.monotonic()
+    try:
+        client = _get_client()
+    except Exception as exc:  # noqa: BLE001
+        logger.error("Не удалось создать клиент OpenAI: %s", exc)
+        return
+    if client is not None:
+        logger.info(
+            "Клиент OpenAI создан за %.2f с", time.monotonic() - started
+        )
+
+
+def _record_latency(latency: float) -> None:
+    """Запомнить задержку успешного запроса к OpenAI."""
+    with _latencies_lock:
+        _latencies.append(latency)
+
+
+def _hedge_delay() -> Optional[float]:
+    """Вернуть задержку до страхующего запроса в секундах.
+
+    Возвращает ``None``, если страхующие запросы отключены.
+    """
+    if _GPT_HEDGE_PERCENTILE <= 0:
+        return None
+    with _latencies_lock:
+        samples = sorted(_latencies)
+    if len(samples) < _HEDGE_MIN_SAMPLES:
+        return _GPT_HEDGE_DELAY_MS / 1000
+    index = int(len(samples) * min(_GPT_HEDGE_PERCENTILE, 100) / 100)
+    return samples[min(index, len(samples) - 1)]
+
+
+def warm_up_move_cache() -> int:
+    """Загрузить в кэш памяти недавние ходы из постоянного хранилища.
+
+    Количество загружаемых записей задаётся ``MOVE_STORE_WARMUP``.
+    Возвращает число загруженных записей.
+    """
+    if _move_store is None or _MOVE_STORE_WARMUP <= 0:
+        return 0
+    try:
+        loaded = _move_store.warm_up(_move_cache, _MOVE_STORE_WARMUP)
+    except sqlite3.Error as exc:
+        logger.error("Ошибка прогрева кэша ходов: %s", exc)
+        return 0
+    logger.info("Кэш ходов прогрет, загружено записей: %s", loaded)
+    return loaded
+
+
+def _lookup_cached_move(cache_key: str) -> Optional[str]:
+    """Найти ход в кэше памяти, а затем в постоянном хранилище."""
+    cached = _move_cache.get(cache_key)
+    if cached is not None or _move_store is None:
+        return cached
+    try:
+        stored = _move_store.get(cache_key)
+    except sqlite3.Error as exc:
+        logger.error("Ошибка чтения хранилища ходов: %s", exc)
+        return None
+    if stored is not None:
+        _move_cache.put(cache_key, stored)
+    return stored
+
+
+def _remember_move(cache_key: str, move: str) -> None:
+    """Сохранить проверенный ход в кэш памяти и постоянное хранилище."""
+    _move_cache.put(cache_key, move)
+    if _move_store is None:
+        return
+    try:
+        _move_store.put(cache_key, move)
+    except sqlite3.Error as exc:
+        logger.error("Ошибка записи в хранилище ходов: %s", exc)
+
+
+def _parse_retry_after(headers: "httpx.Headers") -> Optional[float]:
+    """Вернуть задержку из заголовков ``retry-after-ms``/``Retry-After``."""
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+    return max(retry_at.timestamp() - time.time(), 0.0)
+
+
+def _retry_delay(attempt: int, exc: Exception) -> Optional[float]:
+    """Вернуть паузу перед повтором или ``None``, если повторять нельзя.
+
+    Ошибки клиента (4xx, кроме 408, 409 и 429) не повторяются. Для 429
+    учитывается заголовок ``Retry-After``, но не дольше
+    ``GPT_BACKOFF_MAX_MS``: поток пула не должен спать столько, сколько
+    потребует сервер. В остальных случаях пауза выбирается случайно из
+    ``[0, min(max, base * 2**attempt)]``.
+    """
+    # Модуль уже загружен вместе с клиентом, импорт здесь ничего не стоит
+    import openai
+
+    if isinstance(exc, openai.APIStatusError):
+        status = exc.status_code
+        if 400 <= status < 500 and status not in _RETRYABLE_STATUSES:
+            return None
+        if status == 429:
+            retry_after = _parse_retry_after(exc.response.headers)
+            if retry_after is not None:
+                return min(retry_after, _GPT_BACKOFF_MAX)
+    ceiling = min(_GPT_BACKOFF_MAX, _GPT_BACKOFF_BASE * 2 ** attempt)
+    return random.uniform(0, ceiling)
+
+
+def _timeout(read: float) -> "httpx.Timeout":
+    """Таймаут запроса: чтение ``read`` секунд и ``GPT_CONNECT_TIMEOUT``."""
+    # httpx загружается вместе с клиентом OpenAI
+    import httpx
+
+    return httpx.Timeout(read, connect=_GPT_CONNECT_TIMEOUT)
+
+
+def _request_move(prompt: str, timeout: float) -> str:
+    """Выполнить один запрос к OpenAI и вернуть текст ответа.
+
+    Результат вызова учитывается выключателем и статистикой задержек.
+    """
+    started = time.monotonic()
+    try:
+        response = _get_client().responses.create(
+            model=_MODEL,
+            input=prompt,
+            temperature=0,
+            top_p=1,
+            max_output_tokens=3,
+            timeout=_timeout(timeout),
+        )
+        ai_move = response.output[0].content[0].text.strip()
+    except Exception:
+        _breaker.record_failure()
+        _GPT_REQUEST_DURATION.labels("error").observe(
+            time.monotonic() - started
+        )
+        raise
+    latency = time.monotonic() - started
+    _breaker.record_success(latency)
+    _record_latency(latency)
+    _GPT_REQUEST_DURATION.labels("success").observe(latency)
+    return ai_move
+
+
+def _request_move_hedged(
+    prompt: str, legal_moves: List[str], deadline: Optional[float]
+) -> str:
+    """Запросить ход у OpenAI со страхующим повторным запросом.
+
+    Если первый запрос не ответил за :func:`_hedge_delay`, запускается
+    второй, и используется первый легальный ответ. При истечении
+    ``deadline`` (по ``time.monotonic``) выбрасывается ``TimeoutError``.
+    """
+
+    def remaining() -> Optional[float]:
+        if deadline is None:
+            return None
+        return max(deadline - time.monotonic(), 0.0)
+
+    left = remaining()
+    timeout = _GPT_TIMEOUT if left is None else min(_GPT_TIMEOUT, left)
+    pool = _get_upstream_executor()
+    futures = [pool.submit(_request_move, prompt, timeout)]
+
+    delay = _hedge_delay()
+    if delay is not None and _breaker.state == CircuitBreaker.CLOSED:
+        left = remaining()
+        if left is not None:
+            delay = min(delay, left)
+        done, _ = wait(futures, timeout=delay)
+        left = remaining()
+        if not done and (left is None or left > 0):
+            logger.info("Запущен страхующий запрос к OpenAI")
+            _GPT_HEDGED.inc()
+            futures.append(pool.submit(_request_move, prompt, timeout))
+
+    ai_move: Optional[str] = None
+    error: Optional[Exception] = None
+    for future in as_completed(futures, timeout=remaining()):
+        try:
+            ai_move = future.result()
+        except Exception as exc:  # noqa: BLE001
+            error = exc
+            continue
+        if ai_move in legal_moves:
+            return ai_move
+    if ai_move is not None:
+        return ai_move
+    assert error is not None
+    raise error
+
+
+def _build_prompt(fen: str, legal_moves: List[str]) -> str:
+    """Составить запрос к модели для позиции и списка легальных ходов."""
+    return (
         "You are a chess engine. Evaluate the given position and choose the"
         " best move from the list of legal moves. Return only that move in"
         " UCI format.\n"
@@ -45,30 +597,108 @@ def get_ai_move(fen: str, legal_moves: List[str]) -> str:
         f"Legal moves: {', '.join(legal_moves)}"
     )
 
-    if _client is None:
-        move = random.choice(legal_moves)
-        logger.info(
-            "Клиент OpenAI не настроен, выбран случайный ход: %s",
-            move,
-        )
-        return move
 
-    for _ in range(_MAX_RETRIES):
+def lookup_move(fen: str, legal_moves: List[str]) -> Optional[str]:
+    """Вернуть ранее проверенный ответ модели для позиции или ``None``."""
+    return _lookup_cached_move(make_cache_key(fen, legal_moves))
+
+
+async def lookup_move_async(
+    fen: str, legal_moves: List[str]
+) -> Optional[str]:
+    """Асинхронно выполнить :func:`lookup_move`.
+
+    Без постоянного хранилища поиск идёт только в кэше памяти и
+    выполняется сразу; обращение к SQLite выполняется в пуле потоков.
+    """
+    if _move_store is None:
+        return lookup_move(fen, legal_moves)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_executor(), lookup_move, fen, legal_moves
+    )
+
+
+def query_model(
+    fen: str, legal_moves: List[str], deadline: Optional[float] = None
+) -> Optional[str]:
+    """Запросить ход у модели без резервного выбора.
+
+    Выполняется не более ``_MAX_RETRIES`` попыток с паузами между ними,
+    с учётом выключателя и крайнего срока ``deadline`` (по
+    ``time.monotonic``). Легальный ответ сохраняется в кэш и возвращается.
+    Если модель отвечала только нелегальными ходами, возвращается
+    последний ответ; если ответа нет вовсе — ``None``.
+    """
+    if _get_client() is None:
+        return None
+    prompt = _build_prompt(fen, legal_moves)
+    answer: Optional[str] = None
+    for attempt in range(_MAX_RETRIES):
+        if deadline is not None and time.monotonic() >= deadline:
+            logger.info("Бюджет времени на запрос к OpenAI исчерпан")
+            break
+        if not _breaker.allow_request():
+            logger.info("Выключатель OpenAI разомкнут")
+            break
         try:
-            response = _client.responses.create(
-                model=_MODEL,
-                input=prompt,
-                temperature=0,
-                top_p=1,
-                max_output_tokens=3,
-            )
-            ai_move = response.output[0].content[0].text.strip()
+            with span("gpt-call"):
+                ai_move = _request_move_hedged(prompt, legal_moves, deadline)
+        except TimeoutError:
+            logger.info("Бюджет времени на запрос к OpenAI исчерпан")
+            break
         except Exception as exc:  # noqa: BLE001
             logger.error("Ошибка OpenAI API: %s", exc)
+            delay = _retry_delay(attempt, exc)
+            if delay is None:
+                logger.info("Ошибка OpenAI не подлежит повтору")
+                break
+            if attempt + 1 < _MAX_RETRIES:
+                if (
+                    deadline is not None
+                    and time.monotonic() + delay >= deadline
+                ):
+                    break
+                with span("gpt-backoff"):
+                    time.sleep(delay)
+                _GPT_RETRIES.inc()
             continue
         logger.info("Ответ GPT: %s", ai_move)
         if ai_move in legal_moves:
+            _remember_move(make_cache_key(fen, legal_moves), ai_move)
             return ai_move
-    move = random.choice(legal_moves)
-    logger.info("Превышен лимит повторов, выбран случайный ход: %s", move)
-    return move
+        answer = ai_move
+    return answer
+
+
+async def query_model_async(
+    fen: str, legal_moves: List[str], deadline: Optional[float] = None
+) -> Optional[str]:
+    """Асинхронно выполнить :func:`query_model` в пуле потоков.
+
+    Одновременные запросы для одной позиции ожидают единственный вызов
+    модели. Отмена ожидания не прерывает общий вызов. Вызов выполняется
+    в контексте запроса, запустившего его, поэтому замеры этапов
+    (:func:`span`) попадают только в его ``Server-Timing``; остальные
+    ожидающие запросы видят лишь время ожидания.
+
+    При заданном ``GPT_QUEUE_MAX`` число ожидающих вызовов ограничено;
+    при полной очереди выбрасывается :class:`admission.Overloaded`.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    call = functools.partial(
+        query_model, fen, legal_moves, deadline=deadline
+    )
+
+    async def run() -> Optional[str]:
+        if _gpt_gate is None:
+            return await loop.run_in_executor(
+                get_executor(), context.run, call
+            )
+        async with _gpt_gate.slot():
+            return await loop.run_in_executor(
+                get_executor(), context.run, call
+            )
+
+    return await _model_inflight.do(make_cache_key(fen, legal_moves), run)
@@ -1,13 +1,19 @@
 """Приложение FastAPI с эндпоинтом проверки состояния."""
 
+import asyncio
 import os
+import shutil
 import sys
+import tempfile
+from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import AsyncIterator
 
 from dotenv import load_dotenv
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
 
 load_dotenv(Path(__file__).resolve().parent.parent / ".env")
 
@@ -15,11 +21,67 @@ load_dotenv(Path(__file__).resolve().parent.parent / ".env")
 sys.path.append(str(Path(__file__).resolve().parents[2]))
 from logging_config import setup_logging  # noqa: E402
 
+from . import metrics  # noqa: E402
+from .shared_state import SharedMetrics, reset_run_state  # noqa: E402
+from .timing import ServerTimingMiddleware  # noqa: E402
+from .gpt_client import (  # noqa: E402
+    circuit_state,
+    warm_up_client,
+    warm_up_move_cache,
+)
 from .routes import router  # noqa: E402
 
 setup_logging()
 
-app = FastAPI()
+# Период измерения задержки цикла событий в миллисекундах (0 — отключить)
+_LOOP_LAG_INTERVAL_MS = int(os.getenv("METRICS_LOOP_LAG_INTERVAL_MS", "500"))
+# Число процессов сервера при запуске через ``python -m server.app.main``
+_SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "1"))
+# Период публикации метрик воркера в общее хранилище в миллисекундах
+_METRICS_PUBLISH_INTERVAL_MS = int(
+    os.getenv("METRICS_PUBLISH_INTERVAL_MS", "5000")
+)
+
+_shared_state_path = os.getenv("SHARED_STATE_PATH")
+if _shared_state_path:
+    metrics.REGISTRY.share(
+        SharedMetrics(
+            _shared_state_path,
+            stale_after=3 * _METRICS_PUBLISH_INTERVAL_MS / 1000,
+        )
+    )
+
+
+def _warm_up() -> None:
+    """Прогреть кэш ходов и создать клиент OpenAI."""
+    warm_up_move_cache()
+    warm_up_client()
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    """Подготовить сервер к приёму запросов.
+
+    Прогрев кэша и создание клиента OpenAI выполняются в фоне, чтобы не
+    задерживать первый ответ нового воркера.
+    """
+    warm_up = asyncio.ensure_future(asyncio.to_thread(_warm_up))
+    monitor = metrics.start_event_loop_monitor(_LOOP_LAG_INTERVAL_MS / 1000)
+    publisher = None
+    if _shared_state_path and _METRICS_PUBLISH_INTERVAL_MS > 0:
+        publisher = asyncio.ensure_future(
+            metrics.publish_periodically(_METRICS_PUBLISH_INTERVAL_MS / 1000)
+        )
+    yield
+    warm_up.cancel()
+    if monitor is not None:
+        monitor.cancel()
+    if publisher is not None:
+        publisher.cancel()
+        metrics.REGISTRY.publish()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Список разрешённых источников можно задать через CORS_ALLOW_ORIGINS
 _origins_env = os.getenv("CORS_ALLOW_ORIGINS")
@@ -34,16 +96,65 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if os.getenv("SERVER_TIMING", "1") != "0":
+    app.add_middleware(
+        ServerTimingMiddleware, log=os.getenv("TIMING_LOG") == "1"
+    )
+app.add_middleware(metrics.MetricsMiddleware)
 app.include_router(router)
 
 
 @app.get("/health")
 async def health() -> dict[str, str]:
-    """Вернуть статус работоспособности сервиса."""
-    return {"status": "ok"}
+    """Вернуть статус работоспособности сервиса.
 
+    Поле ``gpt_circuit`` содержит состояние выключателя запросов к OpenAI:
+    ``closed``, ``open`` или ``half_open``.
+    """
+    return {"status": "ok", "gpt_circuit": circuit_state()}
 
-if __name__ == "__main__":
+
+@app.get("/metrics")
+async def metrics_endpoint() -> Response:
+    """Вернуть метрики сервера в текстовом формате Prometheus.
+
+    С общим состоянием снимки воркеров читаются из SQLite в пуле потоков.
+    """
+    if _shared_state_path:
+        body = await asyncio.to_thread(metrics.REGISTRY.render)
+    else:
+        body = metrics.REGISTRY.render()
+    return Response(body, media_type=metrics.CONTENT_TYPE)
+
+
+def serve() -> None:
+    """Запустить сервер в ``SERVER_WORKERS`` процессах.
+
+    При нескольких воркерах им нужно общее состояние: если
+    ``SHARED_STATE_PATH`` не задан, файл создаётся в отдельном временном
+    каталоге этого запуска и удаляется после остановки. Лимиты, сессии,
+    индекс позиций и снимки метрик прошлого запуска удаляются.
+    """
     import uvicorn
 
-    uvicorn.run("server.app.main:app", host="0.0.0.0", port=8000)
+    workers = max(1, _SERVER_WORKERS)
+    run_dir = None
+    if workers > 1 and not os.getenv("SHARED_STATE_PATH"):
+        run_dir = tempfile.mkdtemp(prefix="minigptchess-")
+        os.environ["SHARED_STATE_PATH"] = str(
+            Path(run_dir) / "state.sqlite3"
+        )
+    path = os.getenv("SHARED_STATE_PATH")
+    if path:
+        reset_run_state(path)
+    try:
+        uvicorn.run(
+            "server.app.main:app", host="0.0.0.0", port=8000, workers=workers
+        )
+    finally:
+        if run_dir is not None:
+            shutil.rmtree(run_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,449 @@
+"""Метрики сервера в текстовом формате Prometheus.
+
+Модуль не зависит от ``prometheus_client``: счётчики, индикаторы и
+гистограммы хранятся в памяти процесса и обновляются под короткой
+блокировкой, поэтому их можно изменять из пула потоков. Значения,
+которые уже считаются в других объектах (кэш ходов, выключатель OpenAI),
+собираются в момент выдачи функциями-сборщиками
+(:meth:`Registry.register_collector`).
+
+При нескольких воркерах каждый процесс публикует снимок своих метрик в
+общее хранилище (:meth:`Registry.share`), а ``/metrics`` любого воркера
+выдаёт их сумму: счётчики и гистограммы складываются, а индикаторы
+выдаются по отдельности с меткой ``worker``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+import threading
+import time
+from bisect import bisect_left
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+
+# Семейство метрик от сборщика: имя, тип, описание и пары (метки, значение)
+Family = Tuple[str, str, str, Sequence[Tuple[Mapping[str, str], float]]]
+# Отсчёт метрики: имя ряда (с суффиксом ``_bucket`` и т. п.), метки, значение
+Sample = Tuple[str, Mapping[str, str], float]
+# Семейство с отсчётами: имя, тип, описание и отсчёты
+SampleFamily = Tuple[str, str, str, List[Sample]]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    """Сформировать блок меток ``{name="value",...}``."""
+    if not names:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(
+            name,
+            str(value)
+            .replace("\\", "\\\\")
+            .replace('"', '\\"')
+            .replace("\n", "\\n"),
+        )
+        for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric(ABC):
+    """Метрика с набором меток; значения хранятся по кортежу меток."""
+
+    kind = ""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def labels(self, *values: str):
+        """Вернуть дочернюю метрику для значений меток."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError("Incorrect label count")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    @abstractmethod
+    def _new_child(self):
+        """Создать значение для нового набора меток."""
+
+    @abstractmethod
+    def samples(self) -> List[Sample]:
+        """Вернуть текущие отсчёты всех наборов меток."""
+
+    def collect(self) -> SampleFamily:
+        """Вернуть семейство с текущими отсчётами."""
+        return (self.name, self.kind, self.documentation, self.samples())
+
+
+class _Value:
+    """Числовое значение под блокировкой."""
+
+    __slots__ = ("value", "_lock")
+
+    def __init__(self) -> None:
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(_Metric):
+    """Монотонно растущий счётчик."""
+
+    kind = "counter"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Увеличить счётчик без меток."""
+        self.labels().inc(amount)
+
+    def samples(self) -> List[Sample]:
+        return [
+            (self.name, dict(zip(self.labelnames, values)), child.value)
+            for values, child in list(self._children.items())
+        ]
+
+
+class Gauge(Counter):
+    """Значение, которое может как расти, так и уменьшаться."""
+
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0) -> None:
+        """Уменьшить индикатор без меток."""
+        self.labels().dec(amount)
+
+    def set(self, value: float) -> None:
+        """Установить значение индикатора без меток."""
+        self.labels().set(value)
+
+
+class _HistogramValue:
+    """Счётчики корзин гистограммы, сумма и число наблюдений."""
+
+    __slots__ = ("bounds", "counts", "sum", "_lock")
+
+    def __init__(self, bounds: Tuple[float, ...]) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class Histogram(_Metric):
+    """Распределение значений по корзинам с верхними границами ``buckets``."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        """Учесть наблюдение гистограммы без меток."""
+        self.labels().observe(value)
+
+    def samples(self) -> List[Sample]:
+        samples: List[Sample] = []
+        for values, child in list(self._children.items()):
+            with child._lock:
+                counts = list(child.counts)
+                total = child.sum
+            labels = dict(zip(self.labelnames, values))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                samples.append(
+                    (
+                        f"{self.name}_bucket",
+                        {**labels, "le": _format_value(bound)},
+                        cumulative,
+                    )
+                )
+            samples.append((f"{self.name}_sum", labels, total))
+            samples.append((f"{self.name}_count", labels, cumulative))
+        return samples
+
+
+def render_families(families: Iterable[SampleFamily]) -> str:
+    """Вернуть семейства в текстовом формате Prometheus."""
+    lines: List[str] = []
+    for name, kind, documentation, samples in families:
+        lines.append(f"# HELP {name} {documentation}")
+        lines.append(f"# TYPE {name} {kind}")
+        for sample_name, labels, value in samples:
+            label_block = _format_labels(
+                tuple(labels), tuple(labels.values())
+            )
+            lines.append(f"{sample_name}{label_block} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def merge_families(
+    snapshots: Iterable[Tuple[str, List[SampleFamily]]],
+) -> List[SampleFamily]:
+    """Объединить снимки метрик нескольких воркеров.
+
+    Parameters
+    ----------
+    snapshots: iterable
+        Пары ``(воркер, семейства)``.
+
+    Returns
+    -------
+    list
+        Семейства, в которых отсчёты счётчиков и гистограмм с одинаковыми
+        метками сложены, а к отсчётам индикаторов добавлена метка
+        ``worker``.
+    """
+    merged: Dict[str, Tuple[str, str, Dict[tuple, List]]] = {}
+    for worker, families in snapshots:
+        for name, kind, documentation, samples in families:
+            _, _, rows = merged.setdefault(name, (kind, documentation, {}))
+            for sample_name, labels, value in samples:
+                if kind == "gauge":
+                    labels = {**labels, "worker": worker}
+                key = (sample_name, tuple(labels.items()))
+                row = rows.get(key)
+                if row is None:
+                    rows[key] = [sample_name, dict(labels), value]
+                else:
+                    row[2] += value
+    return [
+        (name, kind, documentation, [tuple(row) for row in rows.values()])
+        for name, (kind, documentation, rows) in merged.items()
+    ]
+
+
+class Registry:
+    """Набор метрик и сборщиков, выдаваемых эндпоинтом ``/metrics``."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[Family]]] = []
+        self._shared = None
+
+    def register(self, metric: _Metric) -> _Metric:
+        """Зарегистрировать метрику; повторная регистрация имени запрещена."""
+        if metric.name in self._metrics:
+            raise ValueError(f"Duplicate metric: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def register_collector(
+        self, collector: Callable[[], Iterable[Family]]
+    ) -> None:
+        """Добавить функцию, возвращающую семейства при каждой выдаче."""
+        self._collectors.append(collector)
+
+    def share(self, store) -> None:
+        """Выдавать метрики всех воркеров через общее хранилище.
+
+        ``store`` должен предоставлять ``publish(families)`` и
+        ``snapshots()`` (см. :class:`server.app.shared_state.SharedMetrics`).
+        """
+        self._shared = store
+
+    def publish(self) -> None:
+        """Записать снимок метрик процесса в общее хранилище."""
+        if self._shared is not None:
+            self._shared.publish(self.collect())
+
+    def collect(self) -> List[SampleFamily]:
+        """Вернуть семейства метрик процесса с текущими отсчётами."""
+        families = [metric.collect() for metric in self._metrics.values()]
+        for collector in self._collectors:
+            try:
+                collected = list(collector())
+            except Exception:  # noqa: BLE001
+                logger.exception("Ошибка сборщика метрик")
+                continue
+            for name, kind, documentation, samples in collected:
+                families.append(
+                    (
+                        name,
+                        kind,
+                        documentation,
+                        [(name, labels, value) for labels, value in samples],
+                    )
+                )
+        return families
+
+    def render(self) -> str:
+        """Вернуть все метрики в текстовом формате Prometheus."""
+        if self._shared is None:
+            return render_families(self.collect())
+        try:
+            self.publish()
+            return render_families(merge_families(self._shared.snapshots()))
+        except Exception:  # noqa: BLE001
+            logger.exception("Ошибка общего хранилища метрик")
+            return render_families(self.collect())
+
+
+REGISTRY = Registry()
+
+
+def counter(
+    name: str, documentation: str, labelnames: Sequence[str] = ()
+) -> Counter:
+    """Создать и зарегистрировать счётчик."""
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(
+    name: str, documentation: str, labelnames: Sequence[str] = ()
+) -> Gauge:
+    """Создать и зарегистрировать индикатор."""
+    return REGISTRY.register(Gauge(name, documentation, labelnames))
+
+
+def histogram(
+    name: str,
+    documentation: str,
+    labelnames: Sequence[str] = (),
+    buckets: Sequence[float] = DEFAULT_BUCKETS,
+) -> Histogram:
+    """Создать и зарегистрировать гистограмму."""
+    return REGISTRY.register(
+        Histogram(name, documentation, labelnames, buckets)
+    )
+
+
+HTTP_REQUEST_DURATION = histogram(
+    "http_request_duration_seconds",
+    "Длительность обработки HTTP-запросов.",
+    ("method", "route", "status"),
+)
+HTTP_REQUESTS_IN_FLIGHT = gauge(
+    "http_requests_in_flight",
+    "Число HTTP-запросов, обрабатываемых в данный момент.",
+)
+EVENT_LOOP_LAG = histogram(
+    "event_loop_lag_seconds",
+    "Задержка цикла событий относительно запланированного пробуждения.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+
+
+class MetricsMiddleware:
+    """ASGI-прослойка: длительность HTTP-запросов и число обрабатываемых.
+
+    Маршрут берётся из шаблона пути (``/move``), а не из фактического
+    URL, чтобы число рядов метрики оставалось ограниченным.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = "500"
+
+        async def send_with_status(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        started = time.perf_counter()
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.labels(
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                status,
+            ).observe(time.perf_counter() - started)
+
+
+async def monitor_event_loop_lag(interval: float = 0.5) -> None:
+    """Периодически измерять задержку пробуждения цикла событий."""
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(loop.time() - expected, 0.0))
+
+
+def start_event_loop_monitor(interval: float) -> Optional["asyncio.Task"]:
+    """Запустить :func:`monitor_event_loop_lag`; ``interval <= 0`` — нет."""
+    if interval <= 0:
+        return None
+    return asyncio.ensure_future(monitor_event_loop_lag(interval))
+
+
+async def publish_periodically(interval: float) -> None:
+    """Периодически записывать снимок метрик в общее хранилище."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(REGISTRY.publish)
+        except Exception:  # noqa: BLE001
+            logger.exception("Ошибка публикации метрик")
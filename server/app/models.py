@@ -8,6 +8,11 @@ from pydantic import BaseModel, Field
 # Максимальные допустимые длины входных строк
 FEN_MAX_LENGTH = 100
 MOVE_MAX_LENGTH = 8
+GAME_ID_MAX_LENGTH = 64
+# Хэш позиции: 64-битный ключ Zobrist в шестнадцатеричной записи
+POSITION_HASH_PATTERN = r"^[0-9a-f]{16}$"
+# Максимальное количество позиций в одном пакетном запросе
+BATCH_MAX_ITEMS = 256
 
 
 class ErrorCode(str, Enum):
@@ -18,6 +23,10 @@ class ErrorCode(str, Enum):
     INVALID_FEN = "invalid_fen"
     SIDE_TO_MOVE_MISMATCH = "side_to_move_mismatch"
     GPT_INVALID_MOVE = "gpt_invalid_move"
+    INVALID_MESSAGE = "invalid_message"
+    RATE_LIMITED = "rate_limited"
+    SERVER_BUSY = "server_busy"
+    RESYNC_REQUIRED = "resync_required"
     SERVER_ERROR = "server_error"
 
 
@@ -35,6 +44,15 @@ class MoveRequest(BaseModel):
         description="Ход игрока в формате UCI",
         max_length=MOVE_MAX_LENGTH,
     )
+    game_id: Optional[str] = Field(
+        None,
+        description="Идентификатор игровой сессии, выданный /new",
+        max_length=GAME_ID_MAX_LENGTH,
+    )
+    delta: bool = Field(
+        False,
+        description="Вернуть хэш новой позиции для запросов /move/delta",
+    )
 
 
 class Flags(BaseModel):
@@ -57,3 +75,102 @@ class MoveResponse(BaseModel):
     new_fen: str
     flags: Flags
     errors: List[ErrorCode] = Field(default_factory=list)
+    game_id: Optional[str] = None
+    hash: Optional[str] = Field(
+        None, description="Хэш позиции new_fen для запросов /move/delta"
+    )
+
+
+class DeltaMoveRequest(BaseModel):
+    """Запрос хода в компактном режиме: хэш позиции вместо FEN.
+
+    Хэш не учитывает счётчики ходов, поэтому клиент передаёт их вместе с
+    ним.
+    """
+
+    hash: str = Field(
+        ...,
+        description="Хэш позиции из предыдущего ответа сервера",
+        pattern=POSITION_HASH_PATTERN,
+    )
+    halfmove_clock: int = Field(
+        ...,
+        ge=0,
+        description="Полуходы после последнего взятия или хода пешкой",
+    )
+    fullmove_number: int = Field(..., ge=1, description="Номер хода")
+    client_move: Optional[str] = Field(
+        None,
+        description="Ход игрока в формате UCI",
+        max_length=MOVE_MAX_LENGTH,
+    )
+
+
+class DeltaMoveResponse(BaseModel):
+    """Ответ в компактном режиме: ход ИИ и хэш позиции без FEN."""
+
+    status: str = "ok"
+    applied_client_move: bool
+    ai_move: Optional[str]
+    hash: Optional[str]
+    flags: Flags
+    errors: List[ErrorCode] = Field(default_factory=list)
+
+
+class MoveBatchRequest(BaseModel):
+    """Пакетный запрос ходов для нескольких позиций."""
+
+    items: List[MoveRequest] = Field(
+        ...,
+        description="Запросы ходов, обрабатываемые независимо",
+        min_length=1,
+        max_length=BATCH_MAX_ITEMS,
+    )
+
+
+class MoveBatchResponse(BaseModel):
+    """Ответы на пакетный запрос в порядке элементов запроса."""
+
+    results: List[MoveResponse]
+
+
+class SessionMessage(BaseModel):
+    """Сообщение клиента в игровой сессии WebSocket."""
+
+    type: Literal["new", "move", "sync"]
+    fen: Optional[str] = Field(
+        None,
+        description="Начальная позиция для новой партии",
+        max_length=FEN_MAX_LENGTH,
+    )
+    move: Optional[str] = Field(
+        None,
+        description="Ход игрока в формате UCI",
+        max_length=MOVE_MAX_LENGTH,
+    )
+
+
+class SessionState(BaseModel):
+    """Текущая позиция игровой сессии."""
+
+    type: Literal["state"] = "state"
+    fen: str
+    flags: Flags
+
+
+class SessionMoveResponse(BaseModel):
+    """Ответ сессии на ход: ход ИИ и флаги без передачи FEN."""
+
+    type: Literal["move"] = "move"
+    status: str = "ok"
+    applied_client_move: bool
+    ai_move: Optional[str]
+    flags: Flags
+    errors: List[ErrorCode] = Field(default_factory=list)
+
+
+class SessionError(BaseModel):
+    """Ошибка обработки сообщения игровой сессии."""
+
+    type: Literal["error"] = "error"
+    errors: List[ErrorCode]
@@ -0,0 +1,118 @@
+"""Кэш ходов ИИ в памяти процесса с вытеснением по LRU и TTL."""
+
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+
+def normalize_fen(fen: str) -> str:
+    """Вернуть FEN без счётчиков полуходов и номера хода.
+
+    Счётчики не влияют на выбор хода, поэтому позиции, отличающиеся только
+    ими, должны попадать в одну запись кэша.
+    """
+    return " ".join(fen.split()[:4])
+
+
+def make_cache_key(fen: str, legal_moves: Iterable[str]) -> str:
+    """Построить ключ кэша из нормализованного FEN и набора легальных ходов."""
+    return normalize_fen(fen) + "|" + ",".join(sorted(legal_moves))
+
+
+class MoveCache:
+    """Ограниченный потокобезопасный кэш «позиция → ход».
+
+    Записи вытесняются в порядке LRU при превышении лимита по количеству
+    (``max_entries``) или по занимаемой памяти (``max_bytes``), а также
+    по истечении времени жизни ``ttl`` (в секундах). ``max_entries=0``
+    отключает кэш.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10_000,
+        max_bytes: int = 16 * 1024 * 1024,
+        ttl: float = 3600.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._clock = clock
+        self._data: "OrderedDict[str, Tuple[str, float, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _entry_size(key: str, move: str) -> int:
+        """Оценить объём памяти, занимаемый записью."""
+        return sys.getsizeof(key) + sys.getsizeof(move)
+
+    def get(self, key: str) -> Optional[str]:
+        """Вернуть ход из кэша или ``None`` при отсутствии или устаревании."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            move, expires_at, size = entry
+            if expires_at <= self._clock():
+                del self._data[key]
+                self._bytes -= size
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return move
+
+    def put(self, key: str, move: str) -> None:
+        """Сохранить ход и вытеснить старые записи при превышении лимитов."""
+        if self.max_entries <= 0:
+            return
+        size = self._entry_size(key, move)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._data[key] = (move, self._clock() + self.ttl, size)
+            self._bytes += size
+            while (
+                len(self._data) > self.max_entries
+                or self._bytes > self.max_bytes
+            ):
+                _, (_, _, evicted_size) = self._data.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Удалить все записи и обнулить счётчики."""
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Вернуть размер кэша и счётчики попаданий и промахов."""
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def __len__(self) -> int:
+        return len(self._data)
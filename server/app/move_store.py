@@ -0,0 +1,167 @@
+"""Постоянное хранилище ходов ИИ на основе SQLite.
+
+Хранилище переживает перезапуск сервера и может использоваться
+одновременно несколькими воркерами: база открывается в режиме WAL,
+поэтому чтение не блокируется записью.
+"""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from .move_cache import MoveCache
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS {table} (
+    key TEXT PRIMARY KEY,
+    move TEXT NOT NULL,
+    used_at REAL NOT NULL
+)
+"""
+
+
+class MoveStore:
+    """Таблица «позиция → ход» в файле SQLite с ограничением размера.
+
+    Parameters
+    ----------
+    path: str
+        Путь к файлу базы данных.
+    max_entries: int
+        Максимальное число записей. При превышении лимита более чем на
+        ``compact_slack`` (доля от лимита) выполняется уплотнение: удаляются
+        давно не использованные записи.
+    compact_slack: float
+        Допустимое превышение лимита до запуска уплотнения.
+    table: str
+        Имя таблицы; позволяет держать в одном файле несколько хранилищ.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = 100_000,
+        compact_slack: float = 0.1,
+        table: str = "moves",
+    ) -> None:
+        self.path = path
+        self.table = table
+        self.max_entries = max_entries
+        self.compact_slack = compact_slack
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, timeout=5.0, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(_SCHEMA.format(table=table))
+        self._conn.execute(
+            f"CREATE INDEX IF NOT EXISTS {table}_used_at "
+            f"ON {table} (used_at)"
+        )
+        self._count = self._conn.execute(
+            f"SELECT COUNT(*) FROM {table}"
+        ).fetchone()[0]
+
+    def get(self, key: str) -> Optional[str]:
+        """Вернуть сохранённый ход или ``None`` и отметить время обращения."""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT move FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                f"UPDATE {self.table} SET used_at = ? WHERE key = ?",
+                (time.time(), key),
+            )
+            return row[0]
+
+    def put(self, key: str, move: str) -> None:
+        """Сохранить ход и при необходимости уплотнить хранилище."""
+        with self._lock:
+            now = time.time()
+            inserted = self._conn.execute(
+                f"INSERT OR IGNORE INTO {self.table} (key, move, used_at) "
+                "VALUES (?, ?, ?)",
+                (key, move, now),
+            ).rowcount
+            if inserted:
+                self._count += 1
+            else:
+                self._conn.execute(
+                    f"UPDATE {self.table} SET move = ?, used_at = ? "
+                    "WHERE key = ?",
+                    (move, now, key),
+                )
+            limit = self.max_entries * (1 + self.compact_slack)
+            needs_compaction = self._count > limit
+        if needs_compaction:
+            self.compact()
+
+    def compact(self) -> int:
+        """Удалить лишние давно не использованные записи.
+
+        Returns
+        -------
+        int
+            Количество удалённых записей.
+        """
+        with self._lock:
+            total = self._conn.execute(
+                f"SELECT COUNT(*) FROM {self.table}"
+            ).fetchone()[0]
+            excess = total - self.max_entries
+            removed = 0
+            if excess > 0:
+                removed = self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN ("
+                    f"SELECT key FROM {self.table} ORDER BY used_at LIMIT ?)",
+                    (excess,),
+                ).rowcount
+                self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self._count = total - removed
+        if removed:
+            logger.info("Хранилище ходов уплотнено, удалено: %s", removed)
+        return removed
+
+    def warm_up(self, cache: MoveCache, limit: int) -> int:
+        """Загрузить в ``cache`` до ``limit`` недавно использованных ходов.
+
+        Returns
+        -------
+        int
+            Количество загруженных записей.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT key, move FROM {self.table} "
+                "ORDER BY used_at DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        # Самые свежие записи кладём последними, чтобы они вытеснялись позже
+        for key, move in reversed(rows):
+            cache.put(key, move)
+        return len(rows)
+
+    def clear(self) -> None:
+        """Удалить все записи."""
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def close(self) -> None:
+        """Закрыть соединение с базой данных."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,444 @@
+"""Цепочка источников хода ИИ с бюджетами времени и статистикой.
+
+Ход выбирается последовательным опросом источников (:class:`MoveProvider`)
+в порядке, заданном ``MOVE_PROVIDERS``, например
+``cache,book,gpt,engine,random``. Первый легальный ход становится ответом.
+Каждому этапу выделяется бюджет времени (``MOVE_PROVIDER_BUDGETS``), а его
+задержка и число попаданий учитываются в :class:`ProviderStats`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import random
+import time
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass
+from typing import (
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+import chess
+import chess.polyglot
+
+from . import engine, gpt_client, metrics
+from .admission import Overloaded
+from .timing import span
+
+logger = logging.getLogger(__name__)
+
+# Запас времени для этапов, которые сами следят за своим бюджетом
+_TIMEOUT_GRACE = 0.05
+# Время поиска встроенного движка по умолчанию в миллисекундах
+_ENGINE_TIME_LIMIT_MS = int(os.getenv("ENGINE_TIME_LIMIT_MS", "200"))
+
+_PROVIDER_DURATION = metrics.histogram(
+    "move_provider_duration_seconds",
+    "Длительность этапов цепочки источников хода.",
+    ("provider",),
+)
+
+
+class MoveQuery(NamedTuple):
+    """Позиция, для которой выбирается ход.
+
+    Доска передаётся только для чтения: источники не должны её изменять.
+    ``deadline`` — крайний срок этапа по ``time.monotonic`` или ``None``.
+    """
+
+    board: chess.Board
+    fen: str
+    legal_moves: List[str]
+    deadline: Optional[float]
+
+    def remaining(self) -> Optional[float]:
+        """Вернуть оставшееся до крайнего срока время в секундах."""
+        if self.deadline is None:
+            return None
+        return max(self.deadline - time.monotonic(), 0.0)
+
+
+class MoveProvider(ABC):
+    """Источник хода ИИ.
+
+    Наследники задают ``name`` и реализуют :meth:`propose`.
+    """
+
+    name = ""
+
+    @abstractmethod
+    async def propose(self, query: MoveQuery) -> Optional[str]:
+        """Вернуть ход в формате UCI или ``None``, если хода нет."""
+
+
+def _run_blocking(func: Callable[..., Optional[str]], *args) -> Awaitable:
+    """Выполнить блокирующую функцию в пуле потоков клиента OpenAI."""
+    loop = asyncio.get_running_loop()
+    return loop.run_in_executor(gpt_client.get_executor(), func, *args)
+
+
+class CacheProvider(MoveProvider):
+    """Проверенные ответы модели из кэша памяти и хранилища ходов."""
+
+    name = "cache"
+
+    async def propose(self, query: MoveQuery) -> Optional[str]:
+        return await gpt_client.lookup_move_async(
+            query.fen, query.legal_moves
+        )
+
+
+class BookProvider(MoveProvider):
+    """Дебютная книга в формате Polyglot.
+
+    Из записей книги для позиции выбирается ход с наибольшим весом.
+    Файл открывается при создании источника, поэтому недоступная книга
+    обнаруживается один раз при сборке цепочки (``OSError`` или
+    ``ValueError``), а не в каждом запросе.
+    """
+
+    name = "book"
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._reader = chess.polyglot.open_reader(path)
+
+    async def propose(self, query: MoveQuery) -> Optional[str]:
+        allowed = set(query.legal_moves)
+        best: Optional[chess.polyglot.Entry] = None
+        for entry in self._reader.find_all(query.board):
+            if entry.move.uci() not in allowed:
+                continue
+            if best is None or entry.weight > best.weight:
+                best = entry
+        return None if best is None else best.move.uci()
+
+
+class GptProvider(MoveProvider):
+    """Ход, предложенный моделью OpenAI (см. :func:`query_model`)."""
+
+    name = "gpt"
+
+    async def propose(self, query: MoveQuery) -> Optional[str]:
+        return await gpt_client.query_model_async(
+            query.fen, query.legal_moves, query.deadline
+        )
+
+
+class EngineProvider(MoveProvider):
+    """Встроенный движок; время поиска ограничено бюджетом этапа."""
+
+    name = "engine"
+
+    def __init__(self, time_limit_ms: int) -> None:
+        self.time_limit_ms = time_limit_ms
+
+    async def propose(self, query: MoveQuery) -> Optional[str]:
+        time_limit_ms = self.time_limit_ms
+        remaining = query.remaining()
+        if remaining is not None:
+            time_limit_ms = min(time_limit_ms, int(remaining * 1000))
+        return await _run_blocking(
+            engine.choose_move,
+            query.board,
+            query.legal_moves,
+            max(time_limit_ms, 1),
+        )
+
+
+class RandomProvider(MoveProvider):
+    """Случайный легальный ход."""
+
+    name = "random"
+
+    async def propose(self, query: MoveQuery) -> Optional[str]:
+        return random.choice(query.legal_moves)
+
+
+@dataclass
+class ProviderStats:
+    """Счётчики одного этапа цепочки.
+
+    ``hits`` — легальные ходы, ``misses`` — отказы источника,
+    ``invalid`` — нелегальные ходы, ``errors`` и ``timeouts`` — ошибки
+    и превышения бюджета. ``seconds_total`` и ``seconds_max`` — суммарная
+    и наибольшая задержка этапа.
+    """
+
+    calls: int = 0
+    hits: int = 0
+    misses: int = 0
+    invalid: int = 0
+    errors: int = 0
+    timeouts: int = 0
+    seconds_total: float = 0.0
+    seconds_max: float = 0.0
+
+    def observe(self, seconds: float) -> None:
+        """Учесть вызов этапа длительностью ``seconds``."""
+        self.calls += 1
+        self.seconds_total += seconds
+        self.seconds_max = max(self.seconds_max, seconds)
+
+
+class PipelineResult(NamedTuple):
+    """Выбранный ход, его источник и этапы, ответившие нелегальным ходом."""
+
+    move: str
+    provider: str
+    invalid: Tuple[str, ...]
+
+
+class MovePipeline:
+    """Опрашивать источники по порядку до первого легального хода.
+
+    Parameters
+    ----------
+    stages: Sequence[Tuple[MoveProvider, Optional[float]]]
+        Источники и их бюджеты времени в секундах (``None`` — без
+        собственного бюджета).
+
+    Бюджеты последующих этапов резервируются из общего крайнего срока,
+    поэтому медленный этап не лишает времени более быстрые резервные.
+    """
+
+    def __init__(
+        self, stages: Sequence[Tuple[MoveProvider, Optional[float]]]
+    ) -> None:
+        self.stages = list(stages)
+        self._stats: Dict[str, ProviderStats] = {
+            provider.name: ProviderStats() for provider, _ in self.stages
+        }
+
+    @property
+    def names(self) -> List[str]:
+        """Имена этапов в порядке опроса."""
+        return [provider.name for provider, _ in self.stages]
+
+    def _stage_deadline(
+        self, index: int, deadline: Optional[float]
+    ) -> Optional[float]:
+        """Вычислить крайний срок этапа ``index``."""
+        budget = self.stages[index][1]
+        stage_deadline = deadline
+        if deadline is not None:
+            reserve = sum(b or 0.0 for _, b in self.stages[index + 1:])
+            stage_deadline = deadline - reserve
+        if budget is not None:
+            own = time.monotonic() + budget
+            stage_deadline = (
+                own if stage_deadline is None else min(own, stage_deadline)
+            )
+        return stage_deadline
+
+    async def select_move(
+        self,
+        board: chess.Board,
+        fen: str,
+        legal_moves: List[str],
+        deadline: Optional[float] = None,
+    ) -> PipelineResult:
+        """Выбрать ход для позиции ``board``.
+
+        Если ни один этап не дал легального хода, выбирается случайный.
+        Отказ этапа из-за перегрузки (:class:`Overloaded`) передаётся
+        вызывающему, чтобы сервер мог ответить 429.
+        """
+        invalid: List[str] = []
+        for index, (provider, _) in enumerate(self.stages):
+            stage_deadline = self._stage_deadline(index, deadline)
+            query = MoveQuery(board, fen, legal_moves, stage_deadline)
+            stats = self._stats[provider.name]
+            started = time.monotonic()
+            try:
+                timeout = query.remaining()
+                with span(f"ai-{provider.name}"):
+                    if timeout is None:
+                        move = await provider.propose(query)
+                    else:
+                        move = await asyncio.wait_for(
+                            provider.propose(query), timeout + _TIMEOUT_GRACE
+                        )
+            except Overloaded:
+                stats.errors += 1
+                raise
+            except asyncio.TimeoutError:
+                stats.timeouts += 1
+                logger.info("Источник %s не уложился в бюджет", provider.name)
+                continue
+            except Exception:  # noqa: BLE001
+                stats.errors += 1
+                logger.exception("Ошибка источника хода %s", provider.name)
+                continue
+            finally:
+                elapsed = time.monotonic() - started
+                stats.observe(elapsed)
+                _PROVIDER_DURATION.labels(provider.name).observe(elapsed)
+            if move is None:
+                stats.misses += 1
+                continue
+            if move not in legal_moves:
+                stats.invalid += 1
+                invalid.append(provider.name)
+                logger.warning(
+                    "Источник %s предложил нелегальный ход: %s",
+                    provider.name,
+                    move,
+                )
+                continue
+            stats.hits += 1
+            logger.info("Ход выбран источником %s: %s", provider.name, move)
+            return PipelineResult(move, provider.name, tuple(invalid))
+        move = random.choice(legal_moves)
+        logger.info("Ни один источник не выбрал ход, случайный ход: %s", move)
+        return PipelineResult(move, "random", tuple(invalid))
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Вернуть счётчики каждого этапа."""
+        return {name: asdict(stats) for name, stats in self._stats.items()}
+
+
+def _default_providers() -> str:
+    """Цепочка по умолчанию с учётом ``AI_PROVIDER`` и ``AI_FALLBACK``."""
+    if os.getenv("AI_PROVIDER", "gpt") == "engine":
+        return "engine,random"
+    fallback = (
+        "engine,random"
+        if os.getenv("AI_FALLBACK", "engine") == "engine"
+        else "random"
+    )
+    return f"cache,book,gpt,{fallback}"
+
+
+def _parse_budgets(spec: str) -> Dict[str, float]:
+    """Разобрать ``MOVE_PROVIDER_BUDGETS`` вида ``gpt:15000,engine:200``."""
+    budgets: Dict[str, float] = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, value = item.partition(":")
+        try:
+            budgets[name.strip()] = float(value) / 1000
+        except ValueError:
+            logger.warning("Некорректный бюджет источника хода: %s", item)
+    return budgets
+
+
+def build_pipeline(
+    providers: Optional[str] = None, budgets: Optional[str] = None
+) -> MovePipeline:
+    """Собрать цепочку из строк конфигурации.
+
+    Parameters
+    ----------
+    providers: str, optional
+        Имена этапов через запятую; по умолчанию ``MOVE_PROVIDERS``.
+    budgets: str, optional
+        Бюджеты этапов в миллисекундах вида ``имя:мс`` через запятую
+        (0 — без бюджета); по умолчанию ``MOVE_PROVIDER_BUDGETS``.
+
+    Неизвестные имена пропускаются с предупреждением. Этап ``book``
+    пропускается, если ``OPENING_BOOK_PATH`` не задан или файл книги не
+    удалось открыть.
+    """
+    if providers is None:
+        providers = os.getenv("MOVE_PROVIDERS") or _default_providers()
+    if budgets is None:
+        budgets = os.getenv("MOVE_PROVIDER_BUDGETS", "")
+    engine_ms = _ENGINE_TIME_LIMIT_MS
+    limits: Dict[str, float] = {
+        "cache": 0.1,
+        "book": 0.1,
+        "engine": engine_ms / 1000,
+    }
+    limits.update(_parse_budgets(budgets))
+
+    stages: List[Tuple[MoveProvider, Optional[float]]] = []
+    for name in filter(None, (part.strip() for part in providers.split(","))):
+        provider: MoveProvider
+        if name == "cache":
+            provider = CacheProvider()
+        elif name == "book":
+            path = os.getenv("OPENING_BOOK_PATH")
+            if not path:
+                logger.debug("Дебютная книга не задана, этап book пропущен")
+                continue
+            try:
+                provider = BookProvider(path)
+            except (OSError, ValueError) as exc:
+                logger.warning(
+                    "Не удалось открыть дебютную книгу %s, этап book "
+                    "пропущен: %s",
+                    path,
+                    exc,
+                )
+                continue
+        elif name == "gpt":
+            provider = GptProvider()
+        elif name == "engine":
+            budget = limits.get("engine")
+            provider = EngineProvider(
+                int(budget * 1000) if budget else engine_ms
+            )
+        elif name == "random":
+            provider = RandomProvider()
+        else:
+            logger.warning("Неизвестный источник хода: %s", name)
+            continue
+        stages.append((provider, limits.get(name) or None))
+    logger.info(
+        "Цепочка источников хода: %s",
+        ",".join(provider.name for provider, _ in stages),
+    )
+    return MovePipeline(stages)
+
+
+_pipeline: Optional[MovePipeline] = None
+
+
+def get_pipeline() -> MovePipeline:
+    """Вернуть цепочку, собранную из переменных окружения."""
+    global _pipeline
+    if _pipeline is None:
+        _pipeline = build_pipeline()
+    return _pipeline
+
+
+def _collect_metrics() -> List[metrics.Family]:
+    """Собрать счётчики результатов этапов цепочки."""
+    if _pipeline is None:
+        return []
+    samples = []
+    for name, stats in _pipeline.stats().items():
+        for result in ("hits", "misses", "invalid", "errors", "timeouts"):
+            samples.append(
+                ({"provider": name, "result": result}, stats[result])
+            )
+    return [
+        (
+            "move_provider_results_total",
+            "counter",
+            "Результаты этапов цепочки источников хода.",
+            samples,
+        )
+    ]
+
+
+metrics.REGISTRY.register_collector(_collect_metrics)
+
+
+async def select_ai_move(
+    board: chess.Board,
+    fen: str,
+    legal_moves: List[str],
+    deadline: Optional[float] = None,
+) -> PipelineResult:
+    """Выбрать ход ИИ цепочкой :func:`get_pipeline`."""
+    return await get_pipeline().select_move(board, fen, legal_moves, deadline)
@@ -1,128 +1,712 @@
 """Маршруты API для сервера MiniGPTChess."""
 
-from fastapi import APIRouter
-import chess
+import asyncio
 import logging
+import math
+import os
+import time
+from typing import AsyncIterator, List, NamedTuple, Optional, Tuple, Union
+
+from fastapi import (
+    APIRouter,
+    Request,
+    Response,
+    WebSocket,
+    WebSocketDisconnect,
+)
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import ValidationError
+import chess
 
-from shared.chess import compute_game_flags, validate_and_apply_move
-from .models import ErrorCode, Flags, MoveRequest, MoveResponse
-from .gpt_client import get_ai_move
+from logging_config import Lazy
+from shared.chess import (
+    analyze_position,
+    compute_game_flags,
+    position_hash,
+    validate_and_apply_move,
+)
+from .models import (
+    DeltaMoveRequest,
+    DeltaMoveResponse,
+    ErrorCode,
+    Flags,
+    MoveBatchRequest,
+    MoveBatchResponse,
+    MoveRequest,
+    MoveResponse,
+    SessionError,
+    SessionMessage,
+    SessionMoveResponse,
+    SessionState,
+)
+from . import metrics
+from .admission import Overloaded, RateLimiter
+from .move_cache import MoveCache
+from .move_store import MoveStore
+from .timing import span
+from .providers import select_ai_move
+from .serialization import NegotiatingRoute, dumps_json, encode
+from .sessions import GameSession, SessionStore
+from .shared_state import SharedRateLimiter, SharedSessionStore
 
 logger = logging.getLogger(__name__)
-router = APIRouter()
+router = APIRouter(route_class=NegotiatingRoute)
+
+# Флаги для ответов, где позицию разобрать не удалось
+_EMPTY_FLAGS = Flags.model_construct(**compute_game_flags(chess.Board()))
+# Сколько позиций пакетного запроса обрабатывается одновременно
+_BATCH_MAX_PARALLELISM = int(os.getenv("BATCH_MAX_PARALLELISM", "8"))
+_NDJSON = "application/x-ndjson"
+# Общий бюджет времени на обработку хода в миллисекундах (0 — без ограничения)
+_MOVE_DEADLINE_MS = int(os.getenv("MOVE_DEADLINE_MS", "20000"))
+
+_MOVES = metrics.counter(
+    "move_requests_total", "Обработанные запросы хода по статусу.", ("status",)
+)
+_AI_MOVES = metrics.counter(
+    "ai_moves_total", "Ходы ИИ по выбравшему их источнику.", ("provider",)
+)
+_GPT_INVALID_MOVES = metrics.counter(
+    "gpt_invalid_moves_total", "Ответы ИИ с нелегальным ходом."
+)
+
+_SESSION_CONFLICTS = metrics.counter(
+    "game_session_conflicts_total",
+    "Ходы, не записанные в сессию из-за параллельного запроса той же игры.",
+)
+
+_REJECTIONS = metrics.counter(
+    "admission_rejections_total",
+    "Запросы, отклонённые контролем допуска.",
+    ("reason",),
+)
+
+# Файл состояния, общего для воркеров (SERVER_WORKERS > 1): лимиты,
+# сессии и индекс позиций хранятся в нём, а не в памяти процесса
+_SHARED_STATE_PATH = os.getenv("SHARED_STATE_PATH")
+
+# Лимит частоты запросов хода на клиента (RATE_LIMIT_RPS=0 — отключён)
+_RATE_LIMIT_RPS = float(os.getenv("RATE_LIMIT_RPS", "0"))
+_RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "10"))
+_RATE_LIMIT_MAX_CLIENTS = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "10000"))
+_rate_limiter: Optional[Union[RateLimiter, SharedRateLimiter]] = None
+if _RATE_LIMIT_RPS > 0 and _SHARED_STATE_PATH:
+    _rate_limiter = SharedRateLimiter(
+        _SHARED_STATE_PATH,
+        rate=_RATE_LIMIT_RPS,
+        burst=_RATE_LIMIT_BURST,
+        max_clients=_RATE_LIMIT_MAX_CLIENTS,
+    )
+elif _RATE_LIMIT_RPS > 0:
+    _rate_limiter = RateLimiter(
+        rate=_RATE_LIMIT_RPS,
+        burst=_RATE_LIMIT_BURST,
+        max_clients=_RATE_LIMIT_MAX_CLIENTS,
+    )
+_API_KEY_HEADER = "x-api-key"
+# Ключи X-API-Key, получающие собственный лимит; остальные клиенты
+# различаются по IP, иначе новый ключ в каждом запросе обходил бы лимит
+_RATE_LIMIT_API_KEYS = frozenset(
+    key.strip()
+    for key in os.getenv("RATE_LIMIT_API_KEYS", "").split(",")
+    if key.strip()
+)
+
+# Хранилища в файле SQLite: обращения к ним выполняются в пуле потоков
+_SHARED_STORES = (MoveStore, SharedRateLimiter, SharedSessionStore)
+
+# Индекс позиций для /move/delta: хэш позиции -> FEN
+# (POSITION_INDEX_MAX_ENTRIES=0 — компактный режим отключён)
+_POSITION_INDEX_MAX_ENTRIES = int(
+    os.getenv("POSITION_INDEX_MAX_ENTRIES", "10000")
+)
+_position_index: Optional[Union[MoveCache, MoveStore]] = None
+if _POSITION_INDEX_MAX_ENTRIES > 0 and _SHARED_STATE_PATH:
+    _position_index = MoveStore(
+        _SHARED_STATE_PATH,
+        max_entries=_POSITION_INDEX_MAX_ENTRIES,
+        table="positions",
+    )
+elif _POSITION_INDEX_MAX_ENTRIES > 0:
+    _position_index = MoveCache(
+        max_entries=_POSITION_INDEX_MAX_ENTRIES,
+        # Хэш и FEN занимают около 200 байт, оставляем запас
+        max_bytes=_POSITION_INDEX_MAX_ENTRIES * 512,
+        ttl=float(os.getenv("POSITION_INDEX_TTL", "3600")),
+    )
+
+# Необязательное хранилище игровых сессий (SESSIONS_ENABLED=1)
+_SESSION_MAX = int(os.getenv("SESSION_MAX", "10000"))
+_SESSION_IDLE_TIMEOUT = float(os.getenv("SESSION_IDLE_TIMEOUT", "3600"))
+_session_store: Optional[Union[SessionStore, SharedSessionStore]] = None
+if os.getenv("SESSIONS_ENABLED") == "1" and _SHARED_STATE_PATH:
+    _session_store = SharedSessionStore(
+        _SHARED_STATE_PATH,
+        max_sessions=_SESSION_MAX,
+        idle_timeout=_SESSION_IDLE_TIMEOUT,
+    )
+elif os.getenv("SESSIONS_ENABLED") == "1":
+    _session_store = SessionStore(
+        max_sessions=_SESSION_MAX,
+        idle_timeout=_SESSION_IDLE_TIMEOUT,
+        max_bytes=int(os.getenv("SESSION_MAX_BYTES", str(64 * 1024 * 1024))),
+    )
+
+
+def _collect_session_metrics() -> List[metrics.Family]:
+    """Собрать метрики хранилища игровых сессий."""
+    if _session_store is None:
+        return []
+    stats = _session_store.stats()
+    return [
+        (
+            "game_sessions",
+            "gauge",
+            "Число игровых сессий.",
+            [({}, stats["sessions"])],
+        ),
+        (
+            "game_sessions_bytes",
+            "gauge",
+            "Память игровых сессий в байтах.",
+            [({}, stats["bytes"])],
+        ),
+        (
+            "game_session_evictions_total",
+            "counter",
+            "Вытеснения игровых сессий.",
+            [({}, stats["evictions"])],
+        ),
+    ]
+
+
+metrics.REGISTRY.register_collector(_collect_session_metrics)
 
 
 @router.post("/new")
 async def new_game() -> dict[str, str]:
-    """Создать новую игру и вернуть стартовый FEN."""
+    """Создать новую игру и вернуть стартовый FEN.
+
+    Если включено хранилище сессий, в ответ добавляется ``game_id``.
+    """
     logger.info("Создана новая игра")
-    return {"fen": chess.STARTING_FEN, "side": "w"}
+    if _session_store is None:
+        return {"fen": chess.STARTING_FEN, "side": "w"}
+    game_id = await _state_call(_session_store.create)
+    return {"fen": chess.STARTING_FEN, "side": "w", "game_id": game_id}
 
 
 @router.post("/move", response_model=MoveResponse)
-async def move(request: MoveRequest) -> MoveResponse:
-    """Обработать ход клиента и вернуть ответ ИИ."""
+async def move(request: MoveRequest, http_request: Request) -> Response:
+    """Обработать ход клиента и вернуть ответ ИИ.
+
+    Ответ кодируется в JSON или, если клиент указал
+    ``Accept: application/msgpack``, в MessagePack. При превышении лимита
+    частоты или переполнении очереди к GPT возвращается 429 с заголовком
+    ``Retry-After``.
+    """
+    rejected = await _check_rate_limit(http_request)
+    if rejected is not None:
+        return rejected
+    try:
+        return encode(await _process_move(request), http_request)
+    except Overloaded as exc:
+        return _too_many_requests(ErrorCode.SERVER_BUSY, exc.retry_after)
+
+
+def _client_key(headers, client) -> str:
+    """Ключ клиента для лимита: известный ключ API или IP-адрес.
+
+    Ключ из заголовка ``X-API-Key`` учитывается, только если он указан в
+    ``RATE_LIMIT_API_KEYS``.
+    """
+    api_key = headers.get(_API_KEY_HEADER)
+    if api_key and api_key in _RATE_LIMIT_API_KEYS:
+        return "key:" + api_key
+    return "ip:" + (client.host if client is not None else "unknown")
+
+
+def _too_many_requests(code: ErrorCode, retry_after: float) -> JSONResponse:
+    """Сформировать ответ 429 с заголовком ``Retry-After``."""
+    _REJECTIONS.labels(code.value).inc()
+    return JSONResponse(
+        status_code=429,
+        content={"status": "error", "errors": [code.value]},
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+async def _check_rate_limit(
+    http_request: Request, cost: int = 1
+) -> Optional[JSONResponse]:
+    """Вернуть ответ 429, если клиент превысил лимит частоты."""
+    if _rate_limiter is None:
+        return None
+    key = _client_key(http_request.headers, http_request.client)
+    retry_after = await _state_call(_rate_limiter.check, key, cost)
+    if retry_after is None:
+        return None
+    logger.warning("Превышен лимит частоты запросов: %s", key)
+    return _too_many_requests(ErrorCode.RATE_LIMITED, retry_after)
+
+
+@router.post("/move/batch", response_model=MoveBatchResponse)
+async def move_batch(
+    batch: MoveBatchRequest, http_request: Request
+) -> Response:
+    """Обработать пакет запросов ходов.
+
+    Позиции обрабатываются параллельно, не более ``BATCH_MAX_PARALLELISM``
+    одновременно. По умолчанию ответы возвращаются одним JSON в порядке
+    запроса. Если клиент передал ``Accept: application/x-ndjson``, ответы
+    отправляются построчно по мере готовности в виде
+    ``{"index": <номер>, "result": <MoveResponse>}``.
+
+    Каждая позиция пакета расходует одну единицу лимита частоты.
+    """
+    rejected = await _check_rate_limit(http_request, len(batch.items))
+    if rejected is not None:
+        return rejected
+    semaphore = asyncio.Semaphore(max(1, _BATCH_MAX_PARALLELISM))
+
+    async def run(index: int, item: MoveRequest) -> Tuple[int, MoveResponse]:
+        async with semaphore:
+            return index, await _process_batch_item(item)
+
+    tasks = [
+        asyncio.ensure_future(run(index, item))
+        for index, item in enumerate(batch.items)
+    ]
+    logger.info("Получен пакет ходов: %s позиций", len(tasks))
+
+    if _NDJSON in http_request.headers.get("accept", ""):
+
+        async def stream() -> AsyncIterator[bytes]:
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    index, result = await next_done
+                    line = {
+                        "index": index,
+                        "result": result.model_dump(mode="json"),
+                    }
+                    yield dumps_json(line) + b"\n"
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+        return StreamingResponse(stream(), media_type=_NDJSON)
+
+    results = await asyncio.gather(*tasks)
+    return encode(
+        MoveBatchResponse.model_construct(
+            results=[result for _, result in results]
+        ),
+        http_request,
+    )
+
+
+async def _process_batch_item(request: MoveRequest) -> MoveResponse:
+    """Обработать элемент пакета, не прерывая обработку остальных."""
+    try:
+        return await _process_move(request)
+    except Overloaded:
+        _REJECTIONS.labels(ErrorCode.SERVER_BUSY.value).inc()
+        error = ErrorCode.SERVER_BUSY
+    except Exception:  # noqa: BLE001
+        logger.exception("Ошибка обработки элемента пакета")
+        error = ErrorCode.SERVER_ERROR
+    return MoveResponse.model_construct(
+        status="error",
+        applied_client_move=False,
+        ai_move=None,
+        new_fen=request.fen,
+        flags=_EMPTY_FLAGS,
+        errors=[error],
+    )
+
+
+def _move_deadline() -> Optional[float]:
+    """Вернуть крайний срок обработки хода по ``time.monotonic``."""
+    if _MOVE_DEADLINE_MS <= 0:
+        return None
+    return time.monotonic() + _MOVE_DEADLINE_MS / 1000
+
+
+async def _process_move(request: MoveRequest) -> MoveResponse:
+    """Применить ход клиента к позиции запроса и получить ответ ИИ."""
+    deadline = _move_deadline()
     logger.info(
         "Получен ход: fen=%s side=%s move=%s",
         request.fen,
         request.side,
         request.client_move,
     )
-    try:
-        board = chess.Board(request.fen)
-    except ValueError:
-        logger.warning("Некорректный FEN: %s", request.fen)
-        empty_flags = Flags(**compute_game_flags(chess.Board()))
-        return MoveResponse(
-            status="error",
-            applied_client_move=False,
-            ai_move=None,
-            new_fen=request.fen,
-            flags=empty_flags,
-            errors=[ErrorCode.INVALID_FEN],
-        )
+    with span("session"):
+        session = await _get_session(request.game_id)
+        board = _session_board(session, request.fen)
+    if board is None:
+        try:
+            with span("fen"):
+                board = chess.Board(request.fen)
+        except ValueError:
+            logger.warning("Некорректный FEN: %s", request.fen)
+            return MoveResponse.model_construct(
+                status="error",
+                applied_client_move=False,
+                ai_move=None,
+                new_fen=request.fen,
+                flags=_EMPTY_FLAGS,
+                errors=[ErrorCode.INVALID_FEN],
+                game_id=request.game_id,
+            )
+        if session is not None:
+            session.reset(request.fen)
 
     expected_turn = chess.WHITE if request.side == "w" else chess.BLACK
     if board.turn != expected_turn:
         logger.warning(
             "Несовпадение стороны хода: ожидалось %s", request.side
         )
-        return MoveResponse(
+        return MoveResponse.model_construct(
             status="error",
             applied_client_move=False,
             ai_move=None,
-            new_fen=board.fen(),
-            flags=Flags(**compute_game_flags(board)),
+            new_fen=request.fen,
+            flags=Flags.model_construct(**compute_game_flags(board)),
             errors=[ErrorCode.SIDE_TO_MOVE_MISMATCH],
+            game_id=request.game_id,
         )
 
-    applied_client_move = False
-    if request.client_move:
-        new_board, errors = validate_and_apply_move(
-            request.fen, request.client_move
+    outcome = await _advance(
+        board, request.client_move, request.fen, deadline
+    )
+    # Позиция не изменилась: возвращаем FEN запроса без сериализации доски
+    changed = outcome.applied_client_move or outcome.ai_move is not None
+    new_fen = board.fen() if changed else request.fen
+    if session is not None:
+        session.sync(board)
+        if not await _state_call(
+            _session_store.put, request.game_id, session
+        ):
+            logger.warning(
+                "Сессия %s изменена параллельным запросом, ход не записан "
+                "в историю",
+                request.game_id,
+            )
+            _SESSION_CONFLICTS.inc()
+    logger.info("FEN после хода: %s", new_fen)
+    _MOVES.labels(outcome.status).inc()
+    return MoveResponse.model_construct(
+        status=outcome.status,
+        applied_client_move=outcome.applied_client_move,
+        ai_move=outcome.ai_move,
+        new_fen=new_fen,
+        flags=outcome.flags,
+        errors=outcome.errors,
+        game_id=request.game_id,
+        hash=(
+            await _index_position(board, new_fen) if request.delta else None
+        ),
+    )
+
+
+@router.post("/move/delta", response_model=DeltaMoveResponse)
+async def move_delta(
+    request: DeltaMoveRequest, http_request: Request
+) -> Response:
+    """Обработать ход в компактном режиме без передачи FEN.
+
+    Клиент присылает хэш позиции из предыдущего ответа ``/move`` или
+    ``/move/delta`` и свой ход; в ответ приходят ход ИИ и хэш новой
+    позиции. Если сервер не знает хэш (позиция вытеснена из индекса или
+    не передавалась), возвращается ошибка ``resync_required``, и клиент
+    должен отправить полный FEN через ``/move``.
+    """
+    rejected = await _check_rate_limit(http_request)
+    if rejected is not None:
+        return rejected
+    deadline = _move_deadline()
+    position = await _lookup_position(request.hash)
+    if position is None:
+        logger.info(
+            "Неизвестный хэш позиции %s, нужна синхронизация", request.hash
         )
+        _MOVES.labels("error").inc()
+        return encode(
+            DeltaMoveResponse.model_construct(
+                status="error",
+                applied_client_move=False,
+                ai_move=None,
+                hash=None,
+                flags=_EMPTY_FLAGS,
+                errors=[ErrorCode.RESYNC_REQUIRED],
+            ),
+            http_request,
+        )
+    fen = f"{position} {request.halfmove_clock} {request.fullmove_number}"
+    board = chess.Board(fen)
+    try:
+        outcome = await _advance(board, request.client_move, fen, deadline)
+    except Overloaded as exc:
+        return _too_many_requests(ErrorCode.SERVER_BUSY, exc.retry_after)
+    changed = outcome.applied_client_move or outcome.ai_move is not None
+    new_hash = (
+        await _index_position(board, board.fen())
+        if changed
+        else request.hash
+    )
+    _MOVES.labels(outcome.status).inc()
+    return encode(
+        DeltaMoveResponse.model_construct(
+            status=outcome.status,
+            applied_client_move=outcome.applied_client_move,
+            ai_move=outcome.ai_move,
+            hash=new_hash,
+            flags=outcome.flags,
+            errors=outcome.errors,
+        ),
+        http_request,
+    )
+
+
+async def _state_call(method, *args):
+    """Вызвать метод хранилища состояния, не блокируя цикл событий.
+
+    Методы хранилищ в файле SQLite (``SHARED_STATE_PATH``) ждут
+    блокировку базы и выполняются в пуле потоков, хранилища в памяти
+    вызываются напрямую.
+    """
+    if isinstance(method.__self__, _SHARED_STORES):
+        return await asyncio.to_thread(method, *args)
+    return method(*args)
+
+
+async def _lookup_position(key: str) -> Optional[str]:
+    """Найти позицию по её хэшу в индексе (FEN без счётчиков ходов)."""
+    if _position_index is None:
+        return None
+    return await _state_call(_position_index.get, key)
+
+
+async def _index_position(board: chess.Board, fen: str) -> Optional[str]:
+    """Запомнить позицию по её хэшу и вернуть хэш.
+
+    Хранятся только поля FEN, входящие в хэш: расстановка, очередь хода,
+    рокировки и взятие на проходе. Счётчики ходов у партий с одинаковой
+    позицией различаются, поэтому клиент присылает их в ``/move/delta``.
+    """
+    if _position_index is None:
+        return None
+    key = position_hash(board)
+    await _state_call(_position_index.put, key, " ".join(fen.split()[:4]))
+    return key
+
+
+async def _get_session(game_id: Optional[str]) -> Optional[GameSession]:
+    """Найти сессию по ``game_id`` или создать её, если она была вытеснена."""
+    if _session_store is None or not game_id:
+        return None
+    session = await _state_call(_session_store.get, game_id)
+    if session is None:
+        logger.info("Сессия %s не найдена, история начнётся заново", game_id)
+        session = GameSession(chess.STARTING_FEN, 0.0)
+    return session
+
+
+def _session_board(
+    session: Optional[GameSession], fen: str
+) -> Optional[chess.Board]:
+    """Восстановить доску сессии, если она совпадает с позицией клиента.
+
+    Возвращает ``None``, если сессии нет или клиент прислал другую
+    позицию; тогда доска строится из FEN запроса.
+    """
+    if session is None or not session.moves:
+        return None
+    board = session.board()
+    if board.fen() != fen:
+        logger.warning("Позиция клиента расходится с историей сессии")
+        return None
+    return board
+
+
+class _Outcome(NamedTuple):
+    """Результат применения хода клиента и ответа ИИ к доске."""
+
+    status: str
+    applied_client_move: bool
+    ai_move: Optional[str]
+    flags: Flags
+    errors: List[ErrorCode]
+
+
+async def _advance(
+    board: chess.Board,
+    client_move: Optional[str],
+    fen: Optional[str] = None,
+    deadline: Optional[float] = None,
+) -> _Outcome:
+    """Применить к ``board`` ход клиента (если есть) и ответный ход ИИ.
+
+    Доска изменяется на месте. ``fen`` — уже известная строка FEN доски;
+    она используется для запроса к ИИ, если ход клиента не применялся.
+    ``deadline`` — крайний срок получения хода ИИ по ``time.monotonic``.
+    """
+    applied_client_move = False
+    if client_move:
+        with span("validate"):
+            _, errors = validate_and_apply_move(board, client_move)
         errors_enum = [ErrorCode(err) for err in errors]
         if errors_enum:
             logger.warning(
                 "Ход клиента отклонён: %s, ошибки: %s",
-                request.client_move,
+                client_move,
                 errors_enum,
             )
-            return MoveResponse(
+            return _Outcome(
                 status="error",
                 applied_client_move=False,
                 ai_move=None,
-                new_fen=board.fen(),
-                flags=Flags(**compute_game_flags(board)),
+                flags=Flags.model_construct(**compute_game_flags(board)),
                 errors=errors_enum,
             )
-        board = new_board
         applied_client_move = True
-        logger.info(
-            "Применён ход клиента: %s, новый FEN: %s",
-            request.client_move,
-            board.fen(),
+        fen = None
+        logger.info("Применён ход клиента: %s", client_move)
+
+    with span("analyze"):
+        analysis = analyze_position(board)
+    if applied_client_move and analysis.is_game_over:
+        logger.info("Игра завершена после хода клиента")
+        return _Outcome(
+            status="ok",
+            applied_client_move=True,
+            ai_move=None,
+            flags=Flags.model_construct(**analysis.flags),
+            errors=[],
         )
-        if board.is_game_over():
-            logger.info("Игра завершена после хода клиента")
-            return MoveResponse(
-                status="ok",
-                applied_client_move=True,
-                ai_move=None,
-                new_fen=board.fen(),
-                flags=Flags(**compute_game_flags(board)),
-                errors=[],
-            )
 
-    flags_before_ai = Flags(**compute_game_flags(board))
-    legal_moves = [m.uci() for m in board.legal_moves]
+    legal_moves = analysis.legal_moves
     if not legal_moves:
         logger.info("Нет легальных ходов для текущей позиции")
-        return MoveResponse(
+        return _Outcome(
             status="error",
             applied_client_move=applied_client_move,
             ai_move=None,
-            new_fen=board.fen(),
-            flags=flags_before_ai,
+            flags=Flags.model_construct(**analysis.flags),
             errors=[ErrorCode.NO_LEGAL_MOVES],
         )
 
-    ai_move_uci = get_ai_move(board.fen(), legal_moves)
-    status = "ok"
-    errors = []
-    if ai_move_uci not in legal_moves:
-        ai_move_uci = legal_moves[0]
-        status = "error"
-        errors = [ErrorCode.GPT_INVALID_MOVE]
-    ai_move = chess.Move.from_uci(ai_move_uci)
-    board.push(ai_move)
+    if fen is None:
+        fen = board.fen()
+    with span("ai"):
+        result = await select_ai_move(board, fen, legal_moves, deadline)
+    ai_move_uci = result.move
+    _AI_MOVES.labels(result.provider).inc()
+    gpt_invalid = result.invalid.count("gpt")
+    if gpt_invalid:
+        # Нелегальный ответ заменён ходом следующего источника, поэтому
+        # клиент получает обычный ответ, а ошибка видна только в метрике.
+        # Нелегальные ходы остальных источников учитываются в
+        # move_provider_results_total
+        _GPT_INVALID_MOVES.inc(gpt_invalid)
+    board.push_uci(ai_move_uci)
     logger.info("Ход ИИ: %s", ai_move_uci)
-    logger.info("FEN после хода ИИ: %s", board.fen())
-    return MoveResponse(
-        status=status,
+    with span("flags"):
+        flags = Flags.model_construct(**analyze_position(board).flags)
+    return _Outcome(
+        status="ok",
         applied_client_move=applied_client_move,
         ai_move=ai_move_uci,
-        new_fen=board.fen(),
-        flags=Flags(**compute_game_flags(board)),
-        errors=errors,
+        flags=flags,
+        errors=[],
     )
+
+
+@router.websocket("/ws/game")
+async def game_session(websocket: WebSocket) -> None:
+    """Игровая сессия по WebSocket с доской, хранящейся на сервере.
+
+    Клиент отправляет JSON-сообщения :class:`SessionMessage`:
+
+    - ``{"type": "new", "fen": <FEN, необязательно>}`` — начать партию;
+    - ``{"type": "move", "move": <UCI>}`` — сделать ход и получить ответ ИИ
+      (без ``move`` ходит только ИИ);
+    - ``{"type": "sync"}`` — запросить текущую позицию.
+
+    На ход сервер отвечает :class:`SessionMoveResponse` без FEN, на
+    ``new`` и ``sync`` — :class:`SessionState`. Доска хранит историю
+    ходов, поэтому флаг ``fivefold_repetition`` вычисляется корректно.
+    """
+    await websocket.accept()
+    board = chess.Board()
+    logger.info("Открыта игровая сессия WebSocket")
+    try:
+        while True:
+            raw = await websocket.receive_text()
+            try:
+                message = SessionMessage.model_validate_json(raw)
+            except ValidationError:
+                await websocket.send_text(
+                    SessionError(
+                        errors=[ErrorCode.INVALID_MESSAGE]
+                    ).model_dump_json()
+                )
+                continue
+
+            if message.type == "new":
+                try:
+                    board = chess.Board(message.fen or chess.STARTING_FEN)
+                except ValueError:
+                    await websocket.send_text(
+                        SessionError(
+                            errors=[ErrorCode.INVALID_FEN]
+                        ).model_dump_json()
+                    )
+                    continue
+            if message.type in ("new", "sync"):
+                state = SessionState(
+                    fen=board.fen(),
+                    flags=Flags.model_construct(**compute_game_flags(board)),
+                )
+                await websocket.send_text(state.model_dump_json())
+                continue
+
+            if (
+                _rate_limiter is not None
+                and await _state_call(
+                    _rate_limiter.check,
+                    _client_key(websocket.headers, websocket.client),
+                )
+                is not None
+            ):
+                _REJECTIONS.labels(ErrorCode.RATE_LIMITED.value).inc()
+                await websocket.send_text(
+                    SessionError(
+                        errors=[ErrorCode.RATE_LIMITED]
+                    ).model_dump_json()
+                )
+                continue
+            depth = len(board.move_stack)
+            try:
+                outcome = await _advance(
+                    board, message.move, deadline=_move_deadline()
+                )
+            except Overloaded:
+                # Откатываем ход клиента, чтобы его можно было повторить
+                while len(board.move_stack) > depth:
+                    board.pop()
+                _REJECTIONS.labels(ErrorCode.SERVER_BUSY.value).inc()
+                await websocket.send_text(
+                    SessionError(
+                        errors=[ErrorCode.SERVER_BUSY]
+                    ).model_dump_json()
+                )
+                continue
+            # FEN сериализуется, только если запись действительно выводится
+            logger.info("Позиция сессии: %s", Lazy(board.fen))
+            await websocket.send_text(
+                SessionMoveResponse(**outcome._asdict()).model_dump_json()
+            )
+    except WebSocketDisconnect:
+        logger.info("Игровая сессия WebSocket закрыта")
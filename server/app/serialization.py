@@ -0,0 +1,102 @@
+"""Быстрая сериализация ответов и поддержка MessagePack.
+
+Ответы, которые сервер строит сам, уже корректны, поэтому они создаются
+через ``model_construct`` и кодируются напрямую ``model_dump_json``,
+минуя повторную проверку ``response_model`` в FastAPI. Построчные ответы
+собираются из словарей и кодируются ``orjson``, если он установлен.
+Клиент может запросить ``application/msgpack`` заголовком ``Accept`` и
+отправлять тело в этом формате с ``Content-Type: application/msgpack``.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Callable, Coroutine
+
+import msgpack
+from fastapi import HTTPException, Request, Response
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+
+try:  # pragma: no cover - зависит от окружения
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+_MSGPACK_TYPES = (MSGPACK, "application/x-msgpack")
+
+
+def dumps_json(data: Any) -> bytes:
+    """Закодировать данные в JSON."""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(",", ":")).encode()
+
+
+def wants_msgpack(accept: str) -> bool:
+    """Проверить, запросил ли клиент MessagePack."""
+    return any(t in accept for t in _MSGPACK_TYPES)
+
+
+def encode(
+    model: BaseModel, request: Request, status_code: int = 200
+) -> Response:
+    """Вернуть модель в формате, выбранном по заголовку ``Accept``."""
+    if wants_msgpack(request.headers.get("accept", "")):
+        return Response(
+            msgpack.packb(model.model_dump(mode="json")),
+            status_code=status_code,
+            media_type=MSGPACK,
+        )
+    return Response(
+        model.model_dump_json(), status_code=status_code, media_type=JSON
+    )
+
+
+class MsgPackRequest(Request):
+    """Запрос с телом MessagePack.
+
+    FastAPI получает тело через :meth:`json`, поэтому проверка модели
+    запроса та же, что и для JSON.
+    """
+
+    async def json(self) -> Any:
+        try:
+            return msgpack.unpackb(await self.body())
+        except (ValueError, msgpack.UnpackException) as exc:
+            raise HTTPException(
+                status_code=400, detail="Invalid MessagePack body"
+            ) from exc
+
+
+class NegotiatingRoute(APIRoute):
+    """Маршрут, принимающий тело запроса в MessagePack.
+
+    Запрос с ``Content-Type: application/msgpack`` передаётся обработчику
+    FastAPI как :class:`MsgPackRequest` с типом содержимого JSON.
+    """
+
+    def get_route_handler(
+        self,
+    ) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+
+        async def route_handler(request: Request) -> Response:
+            content_type = request.headers.get("content-type", "")
+            if not content_type.startswith(_MSGPACK_TYPES):
+                return await handler(request)
+            headers = [
+                (name, value)
+                for name, value in request.scope["headers"]
+                if name != b"content-type"
+            ]
+            headers.append((b"content-type", JSON.encode()))
+            return await handler(
+                MsgPackRequest(
+                    {**request.scope, "headers": headers}, request.receive
+                )
+            )
+
+        return route_handler
@@ -0,0 +1,227 @@
+"""Хранилище игровых сессий с компактной историей ходов.
+
+История каждой партии хранится как массив 16-битных кодов ходов
+(:func:`encode_move`), а не как список объектов ``chess.Move``. Текущая
+доска восстанавливается проигрыванием ходов от начального FEN один раз,
+а затем обновляется ходами каждого запроса. Доска хранит ходы после
+последнего необратимого хода (взятия или хода пешкой): более ранние
+позиции не могут повториться, поэтому флаги повторения вычисляются так
+же, как по полной истории, а работа с доской не зависит от длины партии.
+
+Каждое сохранение увеличивает версию сессии. Хранилище принимает сессию,
+только если её версия совпадает с сохранённой, поэтому из двух
+одновременных запросов одной партии в историю попадает первый, а второй
+получает отказ вместо того, чтобы молча затереть его ходы.
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+import uuid
+from array import array
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+import chess
+
+# Оценка накладных расходов на объект сессии и запись в словаре
+_SESSION_OVERHEAD = 256
+# Оценка памяти доски python-chess и одного хода в её истории
+_BOARD_OVERHEAD = 512
+_PLY_BYTES = 600
+
+
+def encode_move(move: chess.Move) -> int:
+    """Закодировать ход в 15 бит: откуда, куда и фигура превращения."""
+    return (
+        move.from_square
+        | (move.to_square << 6)
+        | ((move.promotion or 0) << 12)
+    )
+
+
+def decode_move(code: int) -> chess.Move:
+    """Восстановить ход из кода :func:`encode_move`."""
+    promotion = code >> 12
+    return chess.Move(code & 0x3F, (code >> 6) & 0x3F, promotion or None)
+
+
+class GameSession:
+    """Партия: начальная позиция и закодированная история ходов.
+
+    ``version`` — номер последнего сохранения в хранилище (0 — сессия
+    ещё не сохранялась).
+    """
+
+    __slots__ = ("start_fen", "moves", "last_access", "version", "_board")
+
+    def __init__(self, start_fen: str, last_access: float) -> None:
+        self.start_fen = start_fen
+        self.moves = array("H")
+        self.last_access = last_access
+        self.version = 0
+        self._board: Optional[chess.Board] = None
+
+    def copy(self) -> "GameSession":
+        """Вернуть копию сессии, которую можно менять независимо.
+
+        Кэш доски не копируется: :meth:`sync` и :meth:`reset` заменяют
+        его, а не изменяют.
+        """
+        session = GameSession(self.start_fen, self.last_access)
+        session.moves = array("H", self.moves)
+        session.version = self.version
+        session._board = self._board
+        return session
+
+    def board(self) -> chess.Board:
+        """Вернуть копию текущей доски для применения новых ходов.
+
+        При первом обращении доска восстанавливается по истории ходов.
+        Копия содержит ходы после последнего необратимого хода, поэтому
+        её создание не зависит от длины партии.
+        """
+        if self._board is None:
+            board = chess.Board(self.start_fen)
+            for code in self.moves:
+                board.push(decode_move(code))
+            self._board = board.copy(stack=board.halfmove_clock)
+        return self._board.copy(stack=self._board.halfmove_clock)
+
+    def sync(self, board: chess.Board) -> None:
+        """Дописать в историю ходы, сделанные на копии из :meth:`board`."""
+        if self._board is None:
+            self.board()
+        added = board.ply() - self._board.ply()
+        if added <= 0:
+            return
+        for move in board.move_stack[-added:]:
+            self.moves.append(encode_move(move))
+        self._board = board.copy(stack=board.halfmove_clock)
+
+    def reset(self, fen: str) -> None:
+        """Начать историю заново с позиции ``fen``."""
+        self.start_fen = fen
+        self.moves = array("H")
+        self._board = chess.Board(fen)
+
+    @property
+    def nbytes(self) -> int:
+        """Приблизительный объём памяти, занимаемый сессией."""
+        size = (
+            _SESSION_OVERHEAD
+            + sys.getsizeof(self.start_fen)
+            + sys.getsizeof(self.moves)
+        )
+        if self._board is not None:
+            size += _BOARD_OVERHEAD + _PLY_BYTES * len(self._board.move_stack)
+        return size
+
+
+class SessionStore:
+    """Сессии по идентификатору игры с вытеснением по LRU и простою.
+
+    Parameters
+    ----------
+    max_sessions: int
+        Максимальное количество сессий.
+    idle_timeout: float
+        Время простоя в секундах, после которого сессия удаляется.
+    max_bytes: int
+        Потолок памяти для всех сессий; при превышении вытесняются давно
+        не использованные сессии.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 10_000,
+        idle_timeout: float = 3600.0,
+        max_bytes: int = 64 * 1024 * 1024,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._sessions: "OrderedDict[str, GameSession]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._bytes = 0
+        self.evictions = 0
+
+    def create(self, fen: str = chess.STARTING_FEN) -> str:
+        """Создать сессию и вернуть её идентификатор."""
+        game_id = uuid.uuid4().hex
+        self.put(game_id, GameSession(fen, self._clock()))
+        return game_id
+
+    def get(self, game_id: str) -> Optional[GameSession]:
+        """Вернуть копию сессии или ``None``, если её нет или она простаивала.
+
+        Изменения копии попадают в хранилище только через :meth:`put`.
+        """
+        self.evict_idle()
+        session = self._sessions.get(game_id)
+        if session is None:
+            return None
+        session.last_access = self._clock()
+        self._sessions.move_to_end(game_id)
+        return session.copy()
+
+    def put(self, game_id: str, session: GameSession) -> bool:
+        """Сохранить сессию и применить ограничения по числу и памяти.
+
+        Возвращает ``False`` и ничего не меняет, если после чтения сессии
+        её уже сохранил другой запрос (версии не совпадают).
+        """
+        stored = self._sessions.get(game_id)
+        if stored is not None and stored.version != session.version:
+            return False
+        session.version += 1
+        session.last_access = self._clock()
+        self._sessions[game_id] = session
+        self._sessions.move_to_end(game_id)
+        self.update_size(game_id)
+        return True
+
+    def update_size(self, game_id: str) -> None:
+        """Пересчитать размер сессии после изменения истории."""
+        session = self._sessions.get(game_id)
+        if session is None:
+            return
+        size = session.nbytes
+        self._bytes += size - self._sizes.get(game_id, 0)
+        self._sizes[game_id] = size
+        while self._sessions and (
+            len(self._sessions) > self.max_sessions
+            or self._bytes > self.max_bytes
+        ):
+            oldest = next(iter(self._sessions))
+            if oldest == game_id and len(self._sessions) == 1:
+                break
+            self._remove(oldest)
+
+    def evict_idle(self) -> None:
+        """Удалить сессии, простаивающие дольше ``idle_timeout``."""
+        deadline = self._clock() - self.idle_timeout
+        while self._sessions:
+            game_id, session = next(iter(self._sessions.items()))
+            if session.last_access > deadline:
+                break
+            self._remove(game_id)
+
+    def _remove(self, game_id: str) -> None:
+        del self._sessions[game_id]
+        self._bytes -= self._sizes.pop(game_id, 0)
+        self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        """Вернуть число сессий, занимаемую память и число вытеснений."""
+        return {
+            "sessions": len(self._sessions),
+            "bytes": self._bytes,
+            "evictions": self.evictions,
+        }
+
+    def __len__(self) -> int:
+        return len(self._sessions)
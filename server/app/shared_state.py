@@ -0,0 +1,380 @@
+"""Общее состояние воркеров сервера в файле SQLite.
+
+Когда сервер запущен в несколько процессов (``SERVER_WORKERS``), кэши,
+лимиты частоты, сессии и метрики в памяти одного воркера не видны
+остальным. Классы модуля хранят это состояние в одном файле
+``SHARED_STATE_PATH`` в режиме WAL: каждая операция — короткая
+транзакция, но она может ждать блокировку базы до ``timeout`` секунд,
+поэтому обработчики запросов вызывают методы классов в пуле потоков
+(``asyncio.to_thread``), а не в цикле событий.
+Интерфейсы совпадают с однопроцессными аналогами
+(:class:`~server.app.admission.RateLimiter`,
+:class:`~server.app.sessions.SessionStore`).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import chess
+
+from .admission import TokenBucket
+from .sessions import GameSession
+
+# Раз в сколько операций удалять устаревшие записи
+_CLEANUP_EVERY = 256
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """Открыть базу SQLite в режиме WAL для доступа из нескольких процессов."""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(
+        path, timeout=5.0, check_same_thread=False, isolation_level=None
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+# Таблицы состояния одного запуска сервера; кэш ответов GPT (``moves``)
+# переживает перезапуск и сюда не входит
+_RUN_TABLES = ("rate_buckets", "sessions", "positions", "worker_metrics")
+
+
+def reset_run_state(path: str) -> None:
+    """Удалить лимиты, сессии, индекс позиций и снимки метрик прошлого запуска.
+
+    Вызывается один раз перед запуском воркеров.
+    """
+    conn = connect(path)
+    try:
+        existing = {
+            row[0]
+            for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'"
+            )
+        }
+        for table in _RUN_TABLES:
+            if table in existing:
+                conn.execute(f"DELETE FROM {table}")
+    finally:
+        conn.close()
+
+
+class SharedRateLimiter:
+    """Лимит частоты запросов, общий для всех воркеров.
+
+    Вёдра токенов хранятся в таблице ``rate_buckets`` и изменяются в
+    транзакции ``BEGIN IMMEDIATE``, поэтому одновременные запросы одного
+    клиента к разным воркерам списывают токены из одного ведра. Ведро,
+    которое успело наполниться, ничем не отличается от нового, поэтому
+    такие записи периодически удаляются.
+
+    Parameters
+    ----------
+    path: str
+        Путь к файлу общего состояния.
+    rate, burst, max_clients
+        Как у :class:`~server.app.admission.RateLimiter`.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        rate: float,
+        burst: float,
+        max_clients: int = 10_000,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.max_clients = max_clients
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._checks = 0
+        self._conn = connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_buckets ("
+            "key TEXT PRIMARY KEY, tokens REAL NOT NULL, "
+            "updated REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS rate_buckets_updated "
+            "ON rate_buckets (updated)"
+        )
+
+    def check(self, key: str, cost: float = 1.0) -> Optional[float]:
+        """Списать ``cost`` запросов клиента ``key``.
+
+        Возвращает ``None``, если запрос допущен, иначе рекомендуемую
+        паузу в секундах для ``Retry-After``.
+        """
+        with self._lock:
+            now = self._clock()
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT tokens, updated FROM rate_buckets WHERE key = ?",
+                    (key,),
+                ).fetchone()
+                bucket = TokenBucket(self.rate, self.burst, now)
+                if row is not None:
+                    bucket.tokens, bucket.updated = row
+                delay = bucket.take(cost, now)
+                if delay is None:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO rate_buckets "
+                        "(key, tokens, updated) VALUES (?, ?, ?)",
+                        (key, bucket.tokens, bucket.updated),
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._checks += 1
+            if self._checks % _CLEANUP_EVERY == 0:
+                self._cleanup(now)
+        return delay
+
+    def _cleanup(self, now: float) -> None:
+        """Удалить наполнившиеся вёдра и лишние давно не обновлявшиеся."""
+        refill = self.burst / self.rate
+        self._conn.execute(
+            "DELETE FROM rate_buckets WHERE updated < ?", (now - refill,)
+        )
+        self._conn.execute(
+            "DELETE FROM rate_buckets WHERE key IN ("
+            "SELECT key FROM rate_buckets ORDER BY updated DESC "
+            "LIMIT -1 OFFSET ?)",
+            (self.max_clients,),
+        )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM rate_buckets"
+            ).fetchone()[0]
+
+
+class SharedSessionStore:
+    """Игровые сессии в общей таблице ``sessions``.
+
+    История ходов хранится тем же массивом 16-битных кодов, что и в
+    :class:`~server.app.sessions.GameSession`. Столбец ``version``
+    проверяется при сохранении в транзакции ``BEGIN IMMEDIATE``, поэтому
+    запрос другого воркера не затрёт ходы, записанные после чтения
+    сессии. Ограничение по памяти здесь не нужно: действуют лимит числа
+    сессий и время простоя.
+
+    Parameters
+    ----------
+    path: str
+        Путь к файлу общего состояния.
+    max_sessions, idle_timeout
+        Как у :class:`~server.app.sessions.SessionStore`.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_sessions: int = 10_000,
+        idle_timeout: float = 3600.0,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.evictions = 0
+        self._conn = connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "game_id TEXT PRIMARY KEY, start_fen TEXT NOT NULL, "
+            "moves BLOB NOT NULL, last_access REAL NOT NULL, "
+            "version INTEGER NOT NULL DEFAULT 0)"
+        )
+        columns = {
+            row[1]
+            for row in self._conn.execute("PRAGMA table_info(sessions)")
+        }
+        if "version" not in columns:
+            # Файл состояния создан до появления версий сессий
+            self._conn.execute(
+                "ALTER TABLE sessions "
+                "ADD COLUMN version INTEGER NOT NULL DEFAULT 0"
+            )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS sessions_last_access "
+            "ON sessions (last_access)"
+        )
+
+    def create(self, fen: str = chess.STARTING_FEN) -> str:
+        """Создать сессию и вернуть её идентификатор."""
+        game_id = uuid.uuid4().hex
+        self.put(game_id, GameSession(fen, self._clock()))
+        return game_id
+
+    def get(self, game_id: str) -> Optional[GameSession]:
+        """Вернуть сессию или ``None``, если её нет или она простаивала."""
+        with self._lock:
+            now = self._clock()
+            row = self._conn.execute(
+                "SELECT start_fen, moves, version FROM sessions "
+                "WHERE game_id = ? AND last_access > ?",
+                (game_id, now - self.idle_timeout),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE sessions SET last_access = ? WHERE game_id = ?",
+                (now, game_id),
+            )
+        session = GameSession(row[0], now)
+        session.moves.frombytes(row[1])
+        session.version = row[2]
+        return session
+
+    def put(self, game_id: str, session: GameSession) -> bool:
+        """Сохранить сессию и периодически применять ограничения.
+
+        Возвращает ``False`` и ничего не меняет, если после чтения сессии
+        её уже сохранил другой запрос (версии не совпадают).
+        """
+        with self._lock:
+            now = self._clock()
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT version FROM sessions "
+                    "WHERE game_id = ? AND last_access > ?",
+                    (game_id, now - self.idle_timeout),
+                ).fetchone()
+                saved = row is None or row[0] == session.version
+                if saved:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO sessions "
+                        "(game_id, start_fen, moves, last_access, version) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (
+                            game_id,
+                            session.start_fen,
+                            session.moves.tobytes(),
+                            now,
+                            session.version + 1,
+                        ),
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            if not saved:
+                return False
+            session.version += 1
+            session.last_access = now
+            self._writes += 1
+            if self._writes % _CLEANUP_EVERY == 0:
+                self._evict()
+        return True
+
+    def evict_idle(self) -> None:
+        """Удалить простаивающие и лишние давно не использованные сессии."""
+        with self._lock:
+            self._evict()
+
+    def _evict(self) -> None:
+        deadline = self._clock() - self.idle_timeout
+        removed = self._conn.execute(
+            "DELETE FROM sessions WHERE last_access <= ?", (deadline,)
+        ).rowcount
+        removed += self._conn.execute(
+            "DELETE FROM sessions WHERE game_id IN ("
+            "SELECT game_id FROM sessions ORDER BY last_access DESC "
+            "LIMIT -1 OFFSET ?)",
+            (self.max_sessions,),
+        ).rowcount
+        self.evictions += removed
+
+    def stats(self) -> Dict[str, int]:
+        """Вернуть число сессий, объём их данных и число вытеснений."""
+        with self._lock:
+            count, size = self._conn.execute(
+                "SELECT COUNT(*), "
+                "COALESCE(SUM(length(moves) + length(start_fen)), 0) "
+                "FROM sessions"
+            ).fetchone()
+        return {
+            "sessions": count,
+            "bytes": size,
+            "evictions": self.evictions,
+        }
+
+    def __len__(self) -> int:
+        return self.stats()["sessions"]
+
+
+class SharedMetrics:
+    """Снимки метрик воркеров в таблице ``worker_metrics``.
+
+    Каждый воркер периодически записывает снимок своих метрик
+    (:meth:`publish`), а ``/metrics`` объединяет снимки всех воркеров
+    (:func:`server.app.metrics.merge_families`). Счётчики завершившихся
+    воркеров продолжают учитываться, а их индикаторы отбрасываются, если
+    снимок не обновлялся дольше ``stale_after`` секунд.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        worker: Optional[str] = None,
+        stale_after: float = 30.0,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.worker = worker or str(os.getpid())
+        self.stale_after = stale_after
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS worker_metrics ("
+            "worker TEXT PRIMARY KEY, updated REAL NOT NULL, "
+            "families TEXT NOT NULL)"
+        )
+
+    def publish(self, families: list) -> None:
+        """Записать снимок метрик этого воркера."""
+        data = json.dumps(families, separators=(",", ":"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO worker_metrics "
+                "(worker, updated, families) VALUES (?, ?, ?)",
+                (self.worker, self._clock(), data),
+            )
+
+    def snapshots(self) -> List[Tuple[str, list]]:
+        """Вернуть пары ``(воркер, семейства)`` всех воркеров."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT worker, updated, families FROM worker_metrics "
+                "ORDER BY worker"
+            ).fetchall()
+        stale_before = self._clock() - self.stale_after
+        snapshots = []
+        for worker, updated, data in rows:
+            families = json.loads(data)
+            if updated < stale_before:
+                families = [f for f in families if f[1] != "gauge"]
+            snapshots.append((worker, families))
+        return snapshots
+
+    def reset(self) -> None:
+        """Удалить снимки прошлых запусков сервера."""
+        with self._lock:
+            self._conn.execute("DELETE FROM worker_metrics")
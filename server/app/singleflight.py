@@ -0,0 +1,44 @@
+"""Объединение одинаковых одновременных асинхронных вызовов."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[T]):
+    """Выполнять не более одного вызова на ключ в каждый момент времени.
+
+    Пока вызов для ключа выполняется, остальные вызывающие с тем же ключом
+    ожидают его результат вместо запуска собственного. Вызов выполняется
+    в отдельной задаче, поэтому отмена одного из ожидающих не прерывает
+    его для остальных.
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[str, "asyncio.Task[T]"] = {}
+        self.shared = 0
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[T]]) -> T:
+        """Вернуть результат ``factory()``, объединяя вызовы по ``key``."""
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: "asyncio.Task[T]") -> None:
+        """Удалить завершённый вызов из таблицы выполняющихся."""
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Помечаем исключение как полученное, даже если ждать было некому
+            task.exception()
+
+    def __len__(self) -> int:
+        return len(self._calls)
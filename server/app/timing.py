@@ -0,0 +1,112 @@
+"""Замеры длительности этапов обработки запроса и заголовок Server-Timing.
+
+Этапы отмечаются контекстным менеджером :func:`span`. Замеры копятся в
+списке, привязанном к текущему запросу через ``contextvars``, поэтому
+вне запроса (и при выключенном сборе) :func:`span` ничего не делает.
+:class:`ServerTimingMiddleware` заводит список для каждого HTTP-запроса
+и добавляет к ответу заголовок ``Server-Timing``, например
+``fen;dur=0.1, ai;dur=812.4, respond;dur=0.3, total;dur=813.9``.
+
+Одинаковые одновременные запросы к модели объединяются
+(:func:`~server.app.gpt_client.query_model_async`), и общий вызов
+выполняется в контексте запроса, который его начал. Поэтому этапы внутри
+вызова (``gpt-call``, ``gpt-backoff``) попадают только в его
+``Server-Timing``. У остальных запросов время ожидания общего вызова
+видно как этап ``ai-gpt``.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import json
+import logging
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Замер: имя этапа, начало и конец по time.perf_counter
+Span = Tuple[str, float, float]
+
+_spans: contextvars.ContextVar[Optional[List[Span]]] = contextvars.ContextVar(
+    "server_timing_spans", default=None
+)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Замерить длительность блока как этапа ``name``."""
+    spans = _spans.get()
+    if spans is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        spans.append((name, started, time.perf_counter()))
+
+
+def format_header(spans: List[Span], total: Optional[float] = None) -> str:
+    """Сформировать значение ``Server-Timing`` с длительностями в мс."""
+    parts = [
+        f"{name};dur={(end - start) * 1000:.1f}" for name, start, end in spans
+    ]
+    if total is not None:
+        parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+class ServerTimingMiddleware:
+    """ASGI-прослойка, добавляющая заголовок ``Server-Timing``.
+
+    Помимо отмеченных этапов в заголовок входят ``respond`` — время от
+    конца последнего этапа до отправки заголовков ответа (сериализация)
+    и ``total`` — полное время до отправки заголовков. При ``log=True``
+    замеры дополнительно пишутся в лог одной строкой JSON.
+    """
+
+    def __init__(self, app, log: bool = False) -> None:
+        self.app = app
+        self.log = log
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        spans: List[Span] = []
+        token = _spans.set(spans)
+        started = time.perf_counter()
+
+        async def send_with_timing(message) -> None:
+            if message["type"] == "http.response.start":
+                now = time.perf_counter()
+                if spans:
+                    last = max(end for _, _, end in spans)
+                    spans.append(("respond", last, now))
+                header = format_header(spans, now - started)
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", header.encode("latin-1"))
+                ]
+                if self.log:
+                    logger.info(
+                        "Тайминги запроса: %s",
+                        json.dumps(
+                            {
+                                "method": scope["method"],
+                                "path": scope["path"],
+                                "total_ms": round((now - started) * 1000, 1),
+                                "spans": [
+                                    [name, round((end - start) * 1000, 1)]
+                                    for name, start, end in spans
+                                ],
+                            }
+                        ),
+                    )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _spans.reset(token)
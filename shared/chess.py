@@ -2,20 +2,90 @@
 
 from __future__ import annotations
 
-from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple, Union
 
 import chess
+import chess.polyglot
+
+
+@dataclass(frozen=True)
+class PositionAnalysis:
+    """Результат однократного анализа позиции.
+
+    Attributes
+    ----------
+    legal_moves: List[str]
+        Легальные ходы в формате UCI.
+    check, checkmate, stalemate, insufficient_material, seventyfive_moves,
+    fivefold_repetition: bool
+        Флаги состояния игры, совпадающие с ``compute_game_flags``.
+    """
+
+    legal_moves: List[str]
+    check: bool
+    checkmate: bool
+    stalemate: bool
+    insufficient_material: bool
+    seventyfive_moves: bool
+    fivefold_repetition: bool
+
+    @property
+    def is_game_over(self) -> bool:
+        """Завершена ли игра (аналог ``chess.Board.is_game_over()``)."""
+        return (
+            self.checkmate
+            or self.stalemate
+            or self.insufficient_material
+            or self.seventyfive_moves
+            or self.fivefold_repetition
+        )
+
+    @property
+    def flags(self) -> Dict[str, bool]:
+        """Словарь флагов состояния игры."""
+        return {
+            "check": self.check,
+            "checkmate": self.checkmate,
+            "stalemate": self.stalemate,
+            "insufficient_material": self.insufficient_material,
+            "seventyfive_moves": self.seventyfive_moves,
+            "fivefold_repetition": self.fivefold_repetition,
+        }
+
+
+def analyze_position(board: chess.Board) -> PositionAnalysis:
+    """Проанализировать позицию ``board`` за одну генерацию легальных ходов.
+
+    Отдельные проверки ``python-chess`` (``is_checkmate``, ``is_stalemate``,
+    ``is_seventyfive_moves`` и др.) каждый раз заново генерируют легальные
+    ходы. Здесь ходы генерируются один раз, а все флаги выводятся из них.
+    """
+    legal_moves = [move.uci() for move in board.generate_legal_moves()]
+    check = board.is_check()
+    has_moves = bool(legal_moves)
+    return PositionAnalysis(
+        legal_moves=legal_moves,
+        check=check,
+        checkmate=check and not has_moves,
+        stalemate=not check and not has_moves,
+        insufficient_material=board.is_insufficient_material(),
+        seventyfive_moves=board.halfmove_clock >= 150 and has_moves,
+        fivefold_repetition=board.is_fivefold_repetition(),
+    )
 
 
 def validate_and_apply_move(
-    fen: str, move: str
+    fen: Union[str, chess.Board], move: str
 ) -> Tuple[Optional[chess.Board], List[str]]:
     """Проверить ход в формате UCI и применить его к позиции ``fen``.
 
     Parameters
     ----------
-    fen: str
-        Текущее состояние игры в нотации FEN.
+    fen: str or chess.Board
+        Текущее состояние игры в нотации FEN или уже разобранная доска.
+        Доска не копируется: при успехе ход применяется к ней же, при
+        ошибке она остаётся без изменений.
     move: str
         Ход в формате UCI (например, ``"e2e4"``).
 
@@ -27,21 +97,23 @@ def validate_and_apply_move(
     """
     errors: List[str] = []
 
-    try:
-        board = chess.Board(fen)
-    except ValueError:
-        return None, ["invalid_fen"]
+    if isinstance(fen, chess.Board):
+        board = fen
+    else:
+        try:
+            board = chess.Board(fen)
+        except ValueError:
+            return None, ["invalid_fen"]
 
     try:
         uci_move = chess.Move.from_uci(move)
     except ValueError:
         return None, ["illegal_client_move"]
 
-    if uci_move not in board.legal_moves:
+    if not board.is_legal(uci_move):
         return None, ["illegal_client_move"]
 
     board.push(uci_move)
-    board.fen()
 
     return board, errors
 
@@ -49,11 +121,13 @@ def validate_and_apply_move(
 def compute_game_flags(board: chess.Board) -> Dict[str, bool]:
     """Получить словарь флагов состояния игры для позиции ``board``."""
 
-    return {
-        "check": board.is_check(),
-        "checkmate": board.is_checkmate(),
-        "stalemate": board.is_stalemate(),
-        "insufficient_material": board.is_insufficient_material(),
-        "seventyfive_moves": board.is_seventyfive_moves(),
-        "fivefold_repetition": board.is_fivefold_repetition(),
-    }
+    return analyze_position(board).flags
+
+
+def position_hash(board: chess.Board) -> str:
+    """Вернуть 64-битный хэш Zobrist (Polyglot) позиции в виде 16 hex-цифр.
+
+    Хэш учитывает расстановку, очередь хода, права на рокировку и взятие
+    на проходе, но не счётчики ходов.
+    """
+    return format(chess.polyglot.zobrist_hash(board), "016x")
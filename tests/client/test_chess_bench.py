@@ -0,0 +1,41 @@
+"""Тесты микробенчмарков шахматной логики."""
+
+from benchmarks import chess_bench
+
+
+def _result(calibration, **results):
+    return {"calibration_ns": calibration, "results": results}
+
+
+def test_compare_reports_regressions_above_threshold():
+    """Регрессией считается рост нормированного времени выше порога."""
+    baseline = _result(100.0, fast=1000.0, slow=1000.0)
+    current = _result(100.0, fast=1100.0, slow=2000.0, new=50.0)
+
+    regressions = chess_bench.compare(current, baseline, threshold=1.5)
+
+    assert regressions == [("slow", 2.0)]
+
+
+def test_compare_normalizes_by_calibration():
+    """На вдвое более медленной машине время делится на эталон."""
+    baseline = _result(100.0, case=1000.0)
+    current = _result(200.0, case=2000.0)
+
+    assert chess_bench.compare(current, baseline) == []
+
+
+def test_measure_returns_time_per_call():
+    """Замер возвращает положительное время для каждой функции."""
+    results = chess_bench.measure({"noop": lambda: None}, repeat=1)
+
+    assert set(results) == {"noop"}
+    assert results["noop"] > 0
+
+
+def test_baseline_covers_all_cases():
+    """Сохранённая база содержит все замеряемые случаи."""
+    baseline = chess_bench.load_baseline(chess_bench.BASELINE_PATH)
+
+    assert baseline is not None
+    assert set(baseline["results"]) == set(chess_bench._cases())
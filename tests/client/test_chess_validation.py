@@ -2,7 +2,7 @@
 
 import chess
 
-from client.chess_validation import validate_and_apply_move
+from client.chess_validation import analyze_position, validate_and_apply_move
 
 
 def test_validate_and_apply_move_success() -> None:
@@ -27,3 +27,12 @@ def test_validate_and_apply_move_invalid_fen() -> None:
     board, errors = validate_and_apply_move("invalid", "e2e4")
     assert board is None
     assert errors
+
+
+def test_analyze_position_after_move() -> None:
+    """Анализ позиции после хода возвращает ходы соперника и флаги."""
+    board, _ = validate_and_apply_move(chess.STARTING_FEN, "e2e4")
+    analysis = analyze_position(board)
+    assert len(analysis.legal_moves) == 20
+    assert not analysis.is_game_over
+    assert not any(analysis.flags.values())
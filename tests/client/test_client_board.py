@@ -17,10 +17,13 @@ from client.main import (  # noqa: E402
     coords_to_uci,
     uci_to_coords,
     draw_board,
+    draw_timings,
+    format_timings,
     get_piece_color,
     can_select_square,
     deselect_on_right,
     needs_promotion,
+    parse_server_timing,
     promotion_dialog,
     WHITE,
     BROWN,
@@ -212,3 +215,42 @@ def test_promotion_dialog_choice() -> None:
     assert result == "q"
     pygame.display.quit()
     pygame.quit()
+
+
+def test_parse_server_timing():
+    """Заголовок Server-Timing разбирается в длительности этапов."""
+    header = (
+        "fen;dur=0.1, gpt-call;dur=400, gpt-call;dur=350.5, "
+        'cache;desc="miss", total;dur="812.4"'
+    )
+    assert parse_server_timing(header) == {
+        "fen": 0.1,
+        "gpt-call": 750.5,
+        "total": 812.4,
+    }
+    assert parse_server_timing("") == {}
+
+
+def test_format_timings_orders_stages():
+    """Панель начинается с total, этапы идут по убыванию длительности."""
+    timings = {"fen": 0.1, "total": 813.9, "ai": 812.4, "respond": 0.3}
+    assert format_timings(timings) == [
+        "total: 813.9 мс",
+        "ai: 812.4 мс",
+        "respond: 0.3 мс",
+        "fen: 0.1 мс",
+    ]
+    assert format_timings({}) == []
+
+
+def test_draw_timings_overlays_board() -> None:
+    """Панель таймингов затемняет левый верхний угол доски."""
+    pygame.init()
+    screen = pygame.Surface((WINDOW_SIZE, WINDOW_SIZE))
+    screen.fill(WHITE)
+    draw_timings(screen, [])
+    assert screen.get_at((1, 1))[:3] == WHITE
+    draw_timings(screen, ["total: 1.0 мс"])
+    assert screen.get_at((1, 1))[:3] != WHITE
+    assert screen.get_at((WINDOW_SIZE - 1, WINDOW_SIZE - 1))[:3] == WHITE
+    pygame.quit()
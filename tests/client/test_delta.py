@@ -0,0 +1,114 @@
+"""Тесты клиента компактного протокола ходов."""
+
+import json
+
+import chess
+import httpx
+
+from client.chess_validation import position_hash
+from client.delta import DeltaMoveClient
+
+
+class FakeServer:
+    """Сервер ``/move`` и ``/move/delta`` поверх ``httpx.MockTransport``.
+
+    ИИ всегда отвечает первым легальным ходом, а индекс позиций можно
+    очистить, чтобы проверить ответ ``resync_required``.
+    """
+
+    def __init__(self) -> None:
+        self.positions: dict[str, str] = {}
+        self.requests: list[tuple[str, dict]] = []
+
+    def client(self) -> httpx.Client:
+        return httpx.Client(
+            transport=httpx.MockTransport(self.handle),
+            base_url="http://testserver",
+        )
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content)
+        self.requests.append((request.url.path, payload))
+        if request.url.path == "/move":
+            board = chess.Board(payload["fen"])
+        elif payload["hash"] in self.positions:
+            board = chess.Board(
+                f"{self.positions[payload['hash']]} "
+                f"{payload['halfmove_clock']} {payload['fullmove_number']}"
+            )
+        else:
+            return httpx.Response(
+                200, json={"status": "error", "errors": ["resync_required"]}
+            )
+        board.push_uci(payload["client_move"])
+        ai_move = next(iter(board.legal_moves)).uci()
+        board.push_uci(ai_move)
+        data = {
+            "status": "ok",
+            "applied_client_move": True,
+            "ai_move": ai_move,
+            "errors": [],
+            "hash": None,
+        }
+        if request.url.path == "/move/delta" or payload.get("delta"):
+            data["hash"] = position_hash(board)
+            self.positions[data["hash"]] = board.epd()
+        if request.url.path == "/move":
+            data["new_fen"] = board.fen()
+        return httpx.Response(200, json=data)
+
+
+def test_delta_client_switches_to_hash_and_resyncs():
+    """Клиент отправляет хэш вместо FEN и повторяет ход полным FEN."""
+    server = FakeServer()
+    move_client = DeltaMoveClient(server.client())
+
+    first = move_client.send_move(chess.STARTING_FEN, "w", "e2e4")
+    second = move_client.send_move(first["new_fen"], "w", "d2d4")
+
+    assert [path for path, _ in server.requests] == ["/move", "/move/delta"]
+    assert server.requests[0][1]["delta"] is True
+    assert "fen" not in server.requests[1][1]
+    board = chess.Board(first["new_fen"])
+    assert server.requests[1][1]["halfmove_clock"] == board.halfmove_clock
+    assert server.requests[1][1]["fullmove_number"] == board.fullmove_number
+    board = chess.Board(first["new_fen"])
+    board.push_uci("d2d4")
+    board.push_uci(second["ai_move"])
+    assert second["new_fen"] == board.fen()
+
+    server.positions.clear()
+    third = move_client.send_move(second["new_fen"], "w", "g1f3")
+
+    paths = [path for path, _ in server.requests[2:]]
+    assert paths == ["/move/delta", "/move"]
+    assert third["applied_client_move"]
+
+
+def test_delta_client_disables_on_404():
+    """Без поддержки /move/delta клиент перестаёт запрашивать хэш."""
+    paths = []
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        paths.append(request.url.path)
+        if request.url.path == "/move/delta":
+            return httpx.Response(404)
+        payload = json.loads(request.content)
+        board = chess.Board(payload["fen"])
+        board.push_uci(payload["client_move"])
+        return httpx.Response(
+            200, json={"new_fen": board.fen(), "hash": "0" * 16}
+        )
+
+    move_client = DeltaMoveClient(
+        httpx.Client(
+            transport=httpx.MockTransport(handle),
+            base_url="http://testserver",
+        )
+    )
+
+    first = move_client.send_move(chess.STARTING_FEN, "w", "e2e4")
+    move_client.send_move(first["new_fen"], "b", "e7e5")
+
+    assert paths == ["/move", "/move/delta", "/move"]
+    assert not move_client.enabled
@@ -12,3 +12,14 @@ def client():
     except Exception:  # pragma: no cover
         pytest.skip("server.app.main.app недоступно")
     return TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def reset_gpt_state(monkeypatch):
+    """Очищать кэш ходов ИИ и выключатель OpenAI между тестами."""
+    from server.app import gpt_client
+
+    gpt_client._move_cache.clear()
+    monkeypatch.setattr(gpt_client, "_breaker", gpt_client.CircuitBreaker())
+    yield
+    gpt_client._move_cache.clear()
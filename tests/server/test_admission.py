@@ -0,0 +1,102 @@
+"""Тесты лимита частоты запросов и очереди к GPT."""
+
+import asyncio
+
+import pytest
+
+from server.app import admission, gpt_client, routes
+
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+
+def test_token_bucket_refills_over_time():
+    """Ведро пропускает всплеск и пополняется со временем."""
+    now = [0.0]
+    limiter = admission.RateLimiter(
+        rate=2.0, burst=2, clock=lambda: now[0]
+    )
+
+    assert limiter.check("a") is None
+    assert limiter.check("a") is None
+    assert limiter.check("a") == pytest.approx(0.5)
+    assert limiter.check("b") is None
+
+    now[0] = 0.5
+    assert limiter.check("a") is None
+
+
+def test_rate_limiter_evicts_old_clients():
+    """Число хранимых вёдер ограничено."""
+    limiter = admission.RateLimiter(rate=1.0, burst=1, max_clients=2)
+    for key in ("a", "b", "c"):
+        limiter.check(key)
+    assert len(limiter) == 2
+
+
+def test_move_returns_429_when_rate_limited(client, monkeypatch):
+    """При превышении лимита /move отвечает 429 с Retry-After."""
+    monkeypatch.setattr(
+        "server.app.gpt_client.query_model", lambda _fen, legal, **_: legal[0]
+    )
+    monkeypatch.setattr(
+        routes, "_rate_limiter", admission.RateLimiter(rate=0.5, burst=1)
+    )
+    payload = {"fen": START_FEN, "side": "w", "client_move": "e2e4"}
+
+    assert client.post("/move", json=payload).status_code == 200
+    response = client.post("/move", json=payload)
+
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "2"
+    assert response.json()["errors"] == ["rate_limited"]
+    # Неизвестный ключ не даёт нового ведра: клиент определяется по IP
+    unknown = client.post(
+        "/move", json=payload, headers={"X-API-Key": "unknown"}
+    )
+    assert unknown.status_code == 429
+    monkeypatch.setattr(routes, "_RATE_LIMIT_API_KEYS", frozenset({"known"}))
+    known = client.post(
+        "/move", json=payload, headers={"X-API-Key": "known"}
+    )
+    assert known.status_code == 200
+
+
+def test_gate_rejects_when_queue_is_full():
+    """При занятых местах и полной очереди вызов сразу отклоняется."""
+
+    async def scenario():
+        gate = admission.AdmissionGate(1, 1, retry_after=3)
+        release = asyncio.Event()
+
+        async def hold():
+            async with gate.slot():
+                await release.wait()
+
+        running = asyncio.ensure_future(hold())
+        queued = asyncio.ensure_future(hold())
+        await asyncio.sleep(0)
+        with pytest.raises(admission.Overloaded) as exc:
+            async with gate.slot():
+                pass
+        release.set()
+        await asyncio.gather(running, queued)
+        return exc.value.retry_after, gate.rejected
+
+    assert asyncio.run(scenario()) == (3, 1)
+
+
+def test_move_returns_429_when_gpt_queue_is_full(client, monkeypatch):
+    """Переполнение очереди к GPT даёт быстрый ответ 429."""
+
+    class FullGate:
+        def slot(self):
+            raise admission.Overloaded(2.5)
+
+    monkeypatch.setattr(gpt_client, "_gpt_gate", FullGate())
+    payload = {"fen": START_FEN, "side": "w", "client_move": "e2e4"}
+
+    response = client.post("/move", json=payload)
+
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "3"
+    assert response.json()["errors"] == ["server_busy"]
@@ -14,17 +14,25 @@ EXPECTED_FLAGS = {
 }
 
 
+def _invalid_moves(client):
+    """Значение счётчика нелегальных ответов ИИ из ``/metrics``."""
+    for line in client.get("/metrics").text.splitlines():
+        if line.startswith("gpt_invalid_moves_total "):
+            return float(line.split()[1])
+    return 0.0
+
+
 def test_ai_move_fallback(monkeypatch):
-    """При неверном ходе GPT сервер выбирает легальный ход."""
+    """Неверный ход GPT заменяется легальным без ошибки в ответе."""
 
     def fake_gpt(*args, **kwargs):  # pragma: no cover
         return "zzzz"
 
-    monkeypatch.setattr("server.app.gpt_client.get_ai_move", fake_gpt)
-    monkeypatch.setattr("server.app.routes.get_ai_move", fake_gpt)
+    monkeypatch.setattr("server.app.gpt_client.query_model", fake_gpt)
     from server.app.main import app
 
     client = TestClient(app)
+    invalid_before = _invalid_moves(client)
     payload = {
         "fen": "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
         "side": "w",
@@ -37,6 +45,25 @@ def test_ai_move_fallback(monkeypatch):
     board.push_uci("e2e4")
     assert chess.Move.from_uci(data["ai_move"]) in board.legal_moves
     assert data["ai_move"] != "zzzz"
-    assert data["status"] == "error"
-    assert data["errors"] == ["gpt_invalid_move"]
+    assert data["status"] == "ok"
+    assert data["errors"] == []
     assert data["flags"] == EXPECTED_FLAGS
+    assert _invalid_moves(client) == invalid_before + 1
+
+
+def test_invalid_moves_of_other_providers_are_not_counted(monkeypatch):
+    """Нелегальные ходы кэша и книги не попадают в счётчик GPT."""
+    from server.app import routes
+    from server.app.main import app
+    from server.app.providers import PipelineResult
+
+    async def fake_select(board, fen, legal_moves, deadline=None):
+        return PipelineResult(legal_moves[0], "engine", ("cache", "book"))
+
+    monkeypatch.setattr(routes, "select_ai_move", fake_select)
+    client = TestClient(app)
+    invalid_before = _invalid_moves(client)
+    payload = {"fen": chess.STARTING_FEN, "side": "w", "client_move": "e2e4"}
+
+    assert client.post("/move", json=payload).json()["status"] == "ok"
+    assert _invalid_moves(client) == invalid_before
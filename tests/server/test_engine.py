@@ -0,0 +1,59 @@
+"""Тесты встроенного шахматного движка."""
+
+import asyncio
+import time
+
+import chess
+
+import server.app.gpt_client as gpt_client
+from server.app import providers
+from server.app.engine import Engine, evaluate
+
+
+def test_evaluate_is_symmetric():
+    """Стартовая позиция оценивается как равная."""
+    assert evaluate(chess.Board()) == 0
+
+
+def test_finds_mate_in_one():
+    """Движок находит мат в один ход."""
+    board = chess.Board("6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1")
+    assert Engine().choose_move(board, time_limit_ms=500) == "d1d8"
+
+
+def test_captures_hanging_queen():
+    """Движок забирает незащищённого ферзя."""
+    board = chess.Board("4k3/8/8/3q4/8/8/3R4/4K3 w - - 0 1")
+    assert Engine().choose_move(board, time_limit_ms=300) == "d2d5"
+
+
+def test_respects_time_budget():
+    """Поиск укладывается в бюджет времени и возвращает легальный ход."""
+    board = chess.Board()
+    start = time.perf_counter()
+    move = Engine().choose_move(board, time_limit_ms=50)
+    elapsed = time.perf_counter() - start
+    assert chess.Move.from_uci(move) in board.legal_moves
+    assert elapsed < 0.5
+
+
+def test_choice_limited_to_legal_moves():
+    """Выбор ограничивается переданным списком ходов."""
+    board = chess.Board("6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1")
+    move = Engine().choose_move(board, ["h2h3", "g2g3"], time_limit_ms=100)
+    assert move in {"h2h3", "g2g3"}
+    assert Engine().choose_move(board, ["a1a2"], time_limit_ms=100) is None
+
+
+def test_fallback_uses_engine(monkeypatch):
+    """Без клиента OpenAI ход выбирает встроенный движок."""
+    monkeypatch.setattr(gpt_client, "_client", None)
+    monkeypatch.setattr(gpt_client, "_base_url", None)
+    monkeypatch.setattr(gpt_client, "_api_key", None)
+    pipeline = providers.build_pipeline("gpt,engine,random", "")
+    board = chess.Board("6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1")
+    legal_moves = [m.uci() for m in board.legal_moves]
+    result = asyncio.run(
+        pipeline.select_move(board, board.fen(), legal_moves)
+    )
+    assert result == ("d1d8", "engine", ())
@@ -0,0 +1,111 @@
+"""Тесты клиента GPT против локальной замены Responses API."""
+
+import asyncio
+
+import chess
+import httpx
+import pytest
+
+import server.app.gpt_client as gpt_client
+from server.app import providers
+from benchmarks.fake_openai import FakeResponsesServer, Scenario, parse_latency
+
+FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+LEGAL_MOVES = ["e2e4", "d2d4", "g1f3"]
+
+
+@pytest.fixture
+def fake_api(monkeypatch):
+    """Запустить поддельный API и направить на него клиент OpenAI."""
+    with FakeResponsesServer(seed=1) as server:
+        client = gpt_client._create_client("test", server.base_url)
+        monkeypatch.setattr(gpt_client, "_client", client)
+        yield server
+        client.close()
+
+
+def _select():
+    """Выбрать ход цепочкой из модели и случайного хода."""
+    board = chess.Board(FEN)
+    pipeline = providers.build_pipeline("gpt,random", "")
+    return asyncio.run(pipeline.select_move(board, FEN, LEGAL_MOVES))
+
+
+def test_parse_latency():
+    """Поддерживаются постоянная и случайные задержки."""
+    assert parse_latency("150") == ("fixed", 150.0, 0.0)
+    assert parse_latency("uniform:10:20") == ("uniform", 10.0, 20.0)
+    assert parse_latency("lognormal:200:0.5") == ("lognormal", 200.0, 0.5)
+    with pytest.raises(ValueError):
+        Scenario(latency="gauss:1")
+
+
+def test_returns_legal_move(fake_api):
+    """Обычный ответ содержит легальный ход и попадает в кэш."""
+    move = gpt_client.query_model(FEN, LEGAL_MOVES)
+
+    assert move in LEGAL_MOVES
+    assert gpt_client.lookup_move(FEN, LEGAL_MOVES) == move
+    assert fake_api.stats["ok"] == 1
+
+
+def test_rate_limit_is_retried_after_delay(fake_api, monkeypatch):
+    """Ответ 429 повторяется через паузу из ``Retry-After``."""
+    sleeps = []
+    monkeypatch.setattr(gpt_client.time, "sleep", sleeps.append)
+    fake_api.scenario = Scenario(rate_limit_rate=1.0, retry_after=0.5)
+    monkeypatch.setattr(gpt_client, "_MAX_RETRIES", 2)
+
+    assert gpt_client.query_model(FEN, LEGAL_MOVES) is None
+    assert sleeps == [0.5]
+    assert fake_api.stats["rate_limited"] == 2
+
+
+def test_server_errors_fall_back(fake_api, monkeypatch):
+    """Постоянные ошибки 500 приводят к ходу резервного источника."""
+    monkeypatch.setattr(gpt_client.time, "sleep", lambda _: None)
+    fake_api.scenario = Scenario(error_rate=1.0)
+
+    result = _select()
+
+    assert result.move in LEGAL_MOVES
+    assert result.provider == "random"
+    assert fake_api.stats["error"] == gpt_client._MAX_RETRIES
+
+
+@pytest.mark.parametrize(
+    "scenario", [Scenario(truncate_rate=1.0), Scenario(illegal_rate=1.0)]
+)
+def test_bad_answers_are_rejected(fake_api, monkeypatch, scenario):
+    """Обрезанный или нелегальный ответ не принимается и не кэшируется."""
+    monkeypatch.setattr(gpt_client, "_MAX_RETRIES", 1)
+    fake_api.scenario = scenario
+
+    answer = gpt_client.query_model(FEN, LEGAL_MOVES)
+
+    assert answer is not None and answer not in LEGAL_MOVES
+    assert gpt_client.lookup_move(FEN, LEGAL_MOVES) is None
+    assert _select().invalid == ("gpt",)
+
+
+def test_latency_exhausts_deadline(fake_api):
+    """Медленный API не задерживает ответ дольше крайнего срока."""
+    fake_api.scenario = Scenario(latency="500")
+    deadline = gpt_client.time.monotonic() + 0.1
+
+    answer = gpt_client.query_model(FEN, LEGAL_MOVES, deadline=deadline)
+
+    assert answer is None
+    assert gpt_client.time.monotonic() < deadline + 0.3
+
+
+def test_scenario_can_be_changed_over_http(fake_api):
+    """Сценарий меняется запросом ``PUT /_scenario``."""
+    root = fake_api.base_url.rsplit("/v1", 1)[0]
+    response = httpx.put(f"{root}/_scenario", json={"illegal_rate": 1.0})
+
+    assert response.status_code == 200
+    assert fake_api.scenario.illegal_rate == 1.0
+    assert httpx.get(f"{root}/_stats").json() == {}
+    bad = httpx.put(f"{root}/_scenario", json={"unknown": 1})
+    assert bad.status_code == 400
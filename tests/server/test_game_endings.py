@@ -9,8 +9,7 @@ def test_checkmate_detection(monkeypatch):
     def fake_gpt(*args, **kwargs):  # pragma: no cover
         return "d8h4"
 
-    monkeypatch.setattr("server.app.gpt_client.get_ai_move", fake_gpt)
-    monkeypatch.setattr("server.app.routes.get_ai_move", fake_gpt)
+    monkeypatch.setattr("server.app.gpt_client.query_model", fake_gpt)
     from server.app.main import app
 
     client = TestClient(app)
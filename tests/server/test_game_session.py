@@ -0,0 +1,70 @@
+"""Тесты игровой сессии по WebSocket."""
+
+from fastapi.testclient import TestClient
+
+
+def _fake_ai(_fen, legal, **_):
+    return legal[0]
+
+
+def test_session_plays_moves_without_fen(monkeypatch):
+    """Клиент отправляет только ходы, сервер хранит позицию."""
+    monkeypatch.setattr("server.app.gpt_client.query_model", _fake_ai)
+    from server.app.main import app
+
+    client = TestClient(app)
+    with client.websocket_connect("/ws/game") as ws:
+        ws.send_json({"type": "new"})
+        state = ws.receive_json()
+        assert state["type"] == "state"
+        assert state["fen"].startswith("rnbqkbnr/pppppppp")
+
+        ws.send_json({"type": "move", "move": "e2e4"})
+        reply = ws.receive_json()
+        assert reply["type"] == "move"
+        assert reply["status"] == "ok"
+        assert reply["applied_client_move"] is True
+        assert reply["ai_move"]
+        assert "new_fen" not in reply
+
+        ws.send_json({"type": "move", "move": "e2e4"})
+        reply = ws.receive_json()
+        assert reply["errors"] == ["illegal_client_move"]
+
+        ws.send_json({"type": "sync"})
+        state = ws.receive_json()
+        assert " w " in state["fen"]
+
+
+def test_session_detects_fivefold_repetition(monkeypatch):
+    """История ходов сессии позволяет зафиксировать пятикратный повтор."""
+    replies = {"g1f3": "g8f6", "f3g1": "f6g8"}
+
+    def fake_ai(fen, legal, **_):
+        return next(m for m in legal if m in replies.values())
+
+    monkeypatch.setattr("server.app.gpt_client.query_model", fake_ai)
+    from server.app.main import app
+
+    client = TestClient(app)
+    with client.websocket_connect("/ws/game") as ws:
+        ws.send_json({"type": "new"})
+        ws.receive_json()
+        flags = None
+        for _ in range(4):
+            for move in ("g1f3", "f3g1"):
+                ws.send_json({"type": "move", "move": move})
+                flags = ws.receive_json()["flags"]
+        assert flags["fivefold_repetition"] is True
+
+
+def test_session_rejects_invalid_message(client):
+    """Некорректное сообщение возвращает ошибку без закрытия сессии."""
+    with client.websocket_connect("/ws/game") as ws:
+        ws.send_text("not json")
+        assert ws.receive_json() == {
+            "type": "error",
+            "errors": ["invalid_message"],
+        }
+        ws.send_json({"type": "new", "fen": "invalid"})
+        assert ws.receive_json()["errors"] == ["invalid_fen"]
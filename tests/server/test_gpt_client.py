@@ -1,12 +1,23 @@
 """Тесты для клиента GPT."""
 
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
 from types import SimpleNamespace
 
+import chess
+import httpx
+import openai
+
 import server.app.gpt_client as gpt_client
+from server.app import providers
 
 
-def test_invalid_response_falls_back(monkeypatch, caplog):
-    """Проверить, что при превышении попыток используется резервный ход."""
+def test_invalid_response_falls_back(monkeypatch):
+    """Нелегальный ответ модели заменяется ходом следующего источника."""
 
     class DummyResponse:
         def __init__(self, text: str):
@@ -24,16 +35,18 @@ def test_invalid_response_falls_back(monkeypatch, caplog):
 
     monkeypatch.setattr(gpt_client, "_client", DummyClient())
     monkeypatch.setattr(gpt_client, "_MAX_RETRIES", 1)
-    monkeypatch.setattr(gpt_client.random, "choice", lambda seq: seq[0])
 
-    legal_moves = ["a2a3", "b2b3"]
-    with caplog.at_level("INFO"):
-        move = gpt_client.get_ai_move(
-            "8/8/8/8/8/8/8/8 w - - 0 1", legal_moves
-        )
+    board = chess.Board()
+    legal_moves = [move.uci() for move in board.legal_moves]
+    assert gpt_client.query_model(board.fen(), legal_moves) == "h7h5"
 
-    assert move in legal_moves
-    assert "Превышен лимит повторов" in caplog.text
+    pipeline = providers.build_pipeline("gpt,random", "")
+    result = asyncio.run(
+        pipeline.select_move(board, board.fen(), legal_moves)
+    )
+    assert result.move in legal_moves
+    assert result.provider == "random"
+    assert result.invalid == ("gpt",)
 
 
 def test_retries_on_exception(monkeypatch):
@@ -63,7 +76,326 @@ def test_retries_on_exception(monkeypatch):
     monkeypatch.setattr(gpt_client, "_MAX_RETRIES", 2)
 
     legal_moves = ["a2a3", "b2b3"]
-    move = gpt_client.get_ai_move("8/8/8/8/8/8/8/8 w - - 0 1", legal_moves)
+    move = gpt_client.query_model("8/8/8/8/8/8/8/8 w - - 0 1", legal_moves)
 
     assert move == "a2a3"
     assert dummy.calls == 2
+
+
+def test_async_move_does_not_block_event_loop(monkeypatch):
+    """Ожидание ответа GPT не должно блокировать цикл событий."""
+    def slow_ai(_fen, legal, **_):
+        time.sleep(0.2)
+        return legal[0]
+
+    monkeypatch.setattr(gpt_client, "query_model", slow_ai)
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        moves = await asyncio.gather(
+            *(
+                gpt_client.query_model_async(
+                    "8/8/8/8/8/8/8/8 w - - 0 1", ["a2a3"]
+                )
+                for _ in range(4)
+            )
+        )
+        task.cancel()
+        return moves, ticks
+
+    moves, ticks = asyncio.run(scenario())
+    assert moves == ["a2a3"] * 4
+    assert ticks >= 5
+
+
+def test_concurrent_identical_requests_are_coalesced(monkeypatch):
+    """Одновременные запросы одной позиции вызывают модель один раз."""
+    calls = []
+
+    def slow_ai(_fen, legal, **_):
+        calls.append(1)
+        time.sleep(0.1)
+        return legal[-1]
+
+    monkeypatch.setattr(gpt_client, "query_model", slow_ai)
+    fen = "8/8/8/8/8/8/8/8 w - - 0 1"
+
+    async def scenario():
+        same = [
+            gpt_client.query_model_async(fen, ["a2a3", "b2b3"])
+            for _ in range(5)
+        ]
+        other = gpt_client.query_model_async(fen, ["a2a3"])
+        return await asyncio.gather(*same, other)
+
+    moves = asyncio.run(scenario())
+    assert moves == ["b2b3"] * 5 + ["a2a3"]
+    assert len(calls) == 2
+    assert len(gpt_client._model_inflight) == 0
+
+
+def test_circuit_breaker_trips_and_recovers():
+    """Выключатель размыкается при ошибках и замыкается после пробы."""
+    now = [0.0]
+    breaker = gpt_client.CircuitBreaker(
+        window=4, min_calls=4, error_rate=0.5, open_seconds=5,
+        clock=lambda: now[0],
+    )
+    for ok in (True, False, True, False):
+        assert breaker.allow_request()
+        if ok:
+            breaker.record_success(0.1)
+        else:
+            breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow_request()
+
+    now[0] = 6.0
+    assert breaker.state == "half_open"
+    assert breaker.allow_request()
+    assert not breaker.allow_request()  # одновременно только одна проба
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    now[0] = 12.0
+    assert breaker.allow_request()
+    breaker.record_success(0.1)
+    assert breaker.state == "closed"
+
+
+def test_slow_calls_count_as_failures():
+    """Слишком медленные ответы размыкают выключатель."""
+    breaker = gpt_client.CircuitBreaker(
+        window=2, min_calls=2, slow_call_seconds=1.0
+    )
+    breaker.record_success(2.0)
+    breaker.record_success(3.0)
+    assert breaker.state == "open"
+
+
+def test_open_breaker_skips_openai(monkeypatch):
+    """При разомкнутом выключателе OpenAI не вызывается."""
+
+    def create(**_):  # pragma: no cover
+        raise AssertionError("OpenAI не должен вызываться")
+
+    monkeypatch.setattr(
+        gpt_client,
+        "_client",
+        SimpleNamespace(responses=SimpleNamespace(create=create)),
+    )
+    breaker = gpt_client.CircuitBreaker(min_calls=1)
+    breaker.record_failure()
+    monkeypatch.setattr(gpt_client, "_breaker", breaker)
+
+    move = gpt_client.query_model("8/8/8/8/8/8/8/8 w - - 0 1", ["a2a3"])
+    assert move is None
+    assert gpt_client.circuit_state() == "open"
+
+
+class _SlowFirstClient:
+    """Клиент, первый запрос к которому отвечает медленно."""
+
+    def __init__(self, first_delay: float):
+        self.first_delay = first_delay
+        self.calls = 0
+        self.responses = SimpleNamespace(create=self._create)
+
+    def _create(self, **_):
+        self.calls += 1
+        if self.calls == 1:
+            time.sleep(self.first_delay)
+            text = "a2a3"
+        else:
+            text = "b2b3"
+        return SimpleNamespace(
+            output=[SimpleNamespace(content=[SimpleNamespace(text=text)])]
+        )
+
+
+def test_hedged_request_wins(monkeypatch):
+    """Медленный первый запрос дублируется, побеждает быстрый ответ."""
+    dummy = _SlowFirstClient(first_delay=0.5)
+    monkeypatch.setattr(gpt_client, "_client", dummy)
+    monkeypatch.setattr(gpt_client, "_GPT_HEDGE_DELAY_MS", 50)
+
+    start = time.monotonic()
+    move = gpt_client.query_model(
+        "8/8/8/8/8/8/8/8 w - - 0 1", ["a2a3", "b2b3"]
+    )
+    assert move == "b2b3"
+    assert dummy.calls == 2
+    assert time.monotonic() - start < 0.4
+
+
+def test_hedge_delay_uses_percentile(monkeypatch):
+    """Задержка страхующего запроса равна перцентилю задержек."""
+    latencies = gpt_client.deque([i / 100 for i in range(1, 101)])
+    monkeypatch.setattr(gpt_client, "_latencies", latencies)
+    monkeypatch.setattr(gpt_client, "_GPT_HEDGE_PERCENTILE", 90)
+    assert gpt_client._hedge_delay() == 0.91
+    monkeypatch.setattr(gpt_client, "_GPT_HEDGE_PERCENTILE", 0)
+    assert gpt_client._hedge_delay() is None
+
+
+def test_deadline_stops_waiting_for_model(monkeypatch):
+    """По истечении бюджета времени ответ модели не ожидается."""
+    dummy = _SlowFirstClient(first_delay=1.0)
+    monkeypatch.setattr(gpt_client, "_client", dummy)
+    monkeypatch.setattr(gpt_client, "_GPT_HEDGE_PERCENTILE", 0)
+
+    start = time.monotonic()
+    move = gpt_client.query_model(
+        "8/8/8/8/8/8/8/8 w - - 0 1",
+        ["a2a3", "c2c3"],
+        deadline=time.monotonic() + 0.1,
+    )
+    assert move is None
+    assert time.monotonic() - start < 0.5
+
+
+def test_pipeline_deadline_bounds_latency(monkeypatch):
+    """Цепочка укладывается в бюджет, даже если модель зависла."""
+
+    def stuck_ai(_fen, legal, **_):
+        time.sleep(1.0)
+        return legal[0]
+
+    monkeypatch.setattr(gpt_client, "query_model", stuck_ai)
+    monkeypatch.setattr(providers.random, "choice", lambda seq: seq[-1])
+    pipeline = providers.build_pipeline("gpt,random", "")
+    board = chess.Board()
+
+    async def scenario():
+        start = time.monotonic()
+        result = await pipeline.select_move(
+            board,
+            board.fen(),
+            ["a2a3", "c2c3"],
+            deadline=time.monotonic() + 0.2,
+        )
+        return result.move, time.monotonic() - start
+
+    move, elapsed = asyncio.run(scenario())
+    assert move == "c2c3"
+    assert elapsed < 0.5
+
+
+def _status_error(status: int, headers=None):
+    """Создать ошибку OpenAI с заданным кодом ответа."""
+    request = httpx.Request("POST", "https://api.openai.com/v1/responses")
+    response = httpx.Response(status, headers=headers or {}, request=request)
+    cls = openai.RateLimitError if status == 429 else openai.APIStatusError
+    return cls("error", response=response, body=None)
+
+
+def test_retry_delay_policy(monkeypatch):
+    """Пауза между повторами учитывает тип ошибки и Retry-After."""
+    monkeypatch.setattr(gpt_client, "_GPT_BACKOFF_BASE", 0.1)
+    monkeypatch.setattr(gpt_client, "_GPT_BACKOFF_MAX", 0.3)
+    assert gpt_client._retry_delay(0, _status_error(400)) is None
+    assert gpt_client._retry_delay(0, _status_error(401)) is None
+    assert gpt_client._retry_delay(
+        0, _status_error(429, {"retry-after": "0.2"})
+    ) == 0.2
+    assert gpt_client._retry_delay(
+        0, _status_error(429, {"retry-after-ms": "150"})
+    ) == 0.15
+    # Retry-After не может задержать поток дольше потолка паузы
+    assert gpt_client._retry_delay(
+        0, _status_error(429, {"retry-after": "3600"})
+    ) == 0.3
+    for attempt in range(5):
+        delay = gpt_client._retry_delay(attempt, _status_error(500))
+        assert 0 <= delay <= min(0.3, 0.1 * 2 ** attempt)
+    assert 0 <= gpt_client._retry_delay(0, RuntimeError("x")) <= 0.1
+
+
+def test_rate_limit_honors_retry_after(monkeypatch):
+    """После ответа 429 повтор выполняется через Retry-After."""
+    calls = []
+    sleeps = []
+
+    def create(**_):
+        calls.append(1)
+        if len(calls) == 1:
+            raise _status_error(429, {"retry-after": "0.25"})
+        return SimpleNamespace(
+            output=[SimpleNamespace(content=[SimpleNamespace(text="a2a3")])]
+        )
+
+    monkeypatch.setattr(
+        gpt_client,
+        "_client",
+        SimpleNamespace(responses=SimpleNamespace(create=create)),
+    )
+    monkeypatch.setattr(gpt_client.time, "sleep", sleeps.append)
+
+    move = gpt_client.query_model("8/8/8/8/8/8/8/8 w - - 0 1", ["a2a3"])
+    assert move == "a2a3"
+    assert sleeps == [0.25]
+
+
+def test_client_error_is_not_retried(monkeypatch):
+    """Ошибка запроса 400 не повторяется."""
+    calls = []
+
+    def create(**_):
+        calls.append(1)
+        raise _status_error(400)
+
+    monkeypatch.setattr(
+        gpt_client,
+        "_client",
+        SimpleNamespace(responses=SimpleNamespace(create=create)),
+    )
+    move = gpt_client.query_model("8/8/8/8/8/8/8/8 w - - 0 1", ["a2a3"])
+    assert move is None
+    assert len(calls) == 1
+
+
+def test_import_does_not_load_openai():
+    """Импорт приложения не загружает библиотеку openai."""
+    code = (
+        "import sys, server.app.main; "
+        "assert 'openai' not in sys.modules, 'openai imported'"
+    )
+    env = {**os.environ, "OPENAI_API_KEY": "sk-test"}
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=Path(__file__).resolve().parents[2],
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr
+
+
+def test_client_is_created_once_on_demand(monkeypatch):
+    """Клиент создаётся при первом обращении и переиспользуется."""
+    created = []
+
+    def create(api_key, base_url=None):
+        created.append((api_key, base_url))
+        return SimpleNamespace()
+
+    monkeypatch.setattr(gpt_client, "_client", None)
+    monkeypatch.setattr(gpt_client, "_api_key", None)
+    monkeypatch.setattr(gpt_client, "_base_url", "http://127.0.0.1:1/v1")
+    monkeypatch.setattr(gpt_client, "_create_client", create)
+
+    client = gpt_client._get_client()
+    assert gpt_client._get_client() is client
+    assert created == [("local", "http://127.0.0.1:1/v1")]
+
+    monkeypatch.setattr(gpt_client, "_client", None)
+    monkeypatch.setattr(gpt_client, "_base_url", None)
+    assert gpt_client._get_client() is None
@@ -2,7 +2,7 @@
 
 
 def test_health(client):
-    """Эндпоинт /health возвращает статус ok."""
+    """Эндпоинт /health возвращает статус ok и состояние выключателя."""
     response = client.get("/health")
     assert response.status_code == 200
-    assert response.json() == {"status": "ok"}
+    assert response.json() == {"status": "ok", "gpt_circuit": "closed"}
@@ -0,0 +1,63 @@
+"""Тесты нагрузочного теста с заглушкой модели."""
+
+import asyncio
+
+import chess
+
+from benchmarks import loadtest
+from server.app import gpt_client
+
+
+def test_percentile():
+    """Перцентиль берётся из отсортированной выборки."""
+    samples = [float(i) for i in range(1, 101)]
+    assert loadtest.percentile(samples, 50) == 51.0
+    assert loadtest.percentile(samples, 99) == 100.0
+    assert loadtest.percentile([], 95) == 0.0
+
+
+def test_load_games_replays_recorded_moves():
+    """Партии из PGN превращаются в пары FEN и записанный ход."""
+    games = loadtest.load_games()
+
+    assert len(games) > 1
+    for plies in games:
+        board = chess.Board(plies[0][0])
+        for fen, move in plies:
+            assert board.fen() == fen
+            board.push_uci(move)
+
+
+def test_stub_model_answers_from_book_and_restores():
+    """Заглушка отвечает записанным ходом и снимается функцией возврата."""
+    original = gpt_client.query_model
+    fen = chess.STARTING_FEN
+    restore = loadtest.install_stub_model(0, 0, 0, [[(fen, "g1f3")]])
+    try:
+        assert gpt_client.query_model(fen, ["e2e4", "g1f3"]) == "g1f3"
+    finally:
+        restore()
+
+    assert gpt_client.query_model is original
+
+
+def test_short_run_reports_throughput():
+    """Короткий прогон в процессе играет партии без ошибок."""
+    original = gpt_client.query_model
+    args = loadtest.parse_args(
+        [
+            "--concurrency", "2",
+            "--duration", "0.5",
+            "--stub-latency-ms", "1",
+            "--stub-jitter-ms", "0",
+        ]
+    )
+
+    report = asyncio.run(loadtest.run(args))
+
+    assert report["/new"]["requests"] >= 2
+    assert report["/move"]["requests"] > 0
+    assert report["/move"]["errors"] == 0
+    assert report["/move"]["p99_ms"] >= report["/move"]["p50_ms"]
+    assert "/move" in loadtest.format_report(report)
+    assert gpt_client.query_model is original
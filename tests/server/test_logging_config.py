@@ -0,0 +1,91 @@
+"""Тесты настройки логирования."""
+
+import json
+import logging
+import queue
+import sys
+
+import logging_config
+
+
+def _record(name="server.app.routes", level=logging.INFO, msg="ход %s"):
+    return logging.LogRecord(name, level, __file__, 1, msg, ("e2e4",), None)
+
+
+def test_json_formatter_outputs_single_line():
+    """Запись форматируется как одна строка JSON."""
+    line = logging_config.JsonFormatter().format(_record())
+
+    data = json.loads(line)
+    assert data["message"] == "ход e2e4"
+    assert data["logger"] == "server.app.routes"
+    assert data["level"] == "INFO"
+
+
+def test_sampling_filter_uses_longest_prefix():
+    """Выборка задаётся по самому длинному имени и не трогает ошибки."""
+    sampler = logging_config.SamplingFilter(
+        logging_config.parse_sampling("server.app=1,server.app.routes=0")
+    )
+
+    assert not sampler.filter(_record())
+    assert sampler.filter(_record(level=logging.WARNING))
+    assert sampler.filter(_record(name="server.app.gpt_client"))
+    assert sampler.filter(_record(name="client.main"))
+
+
+def test_lazy_argument_is_evaluated_only_when_emitted():
+    """Ленивый аргумент не вычисляется для отброшенной записи."""
+    calls = []
+
+    def expensive():
+        calls.append(1)
+        return "fen"
+
+    log_queue = queue.Queue()
+    handler = logging_config.NonBlockingQueueHandler(log_queue)
+    logger = logging.getLogger("tests.lazy")
+    logger.propagate = False
+    logger.addHandler(handler)
+    try:
+        logger.setLevel(logging.WARNING)
+        logger.info("FEN: %s", logging_config.Lazy(expensive))
+        assert calls == []
+
+        logger.setLevel(logging.INFO)
+        logger.info("FEN: %s", logging_config.Lazy(expensive))
+        assert calls == [1]
+        assert log_queue.get_nowait().getMessage() == "FEN: fen"
+    finally:
+        logger.removeHandler(handler)
+
+
+def test_full_queue_drops_records():
+    """При переполнении очереди запись отбрасывается без ожидания."""
+    handler = logging_config.NonBlockingQueueHandler(queue.Queue(maxsize=1))
+
+    handler.handle(_record())
+    handler.handle(_record())
+
+    assert handler.dropped == 1
+
+
+def test_queued_exception_keeps_traceback_field():
+    """Трассировка исключения из очереди попадает в поле ``exc_info``."""
+    log_queue = queue.Queue()
+    handler = logging_config.NonBlockingQueueHandler(log_queue)
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = logging.LogRecord(
+            "server.app", logging.ERROR, __file__, 1, "ошибка %s",
+            ("хода",), sys.exc_info(),
+        )
+    handler.handle(record)
+
+    queued = log_queue.get_nowait()
+    data = json.loads(logging_config.JsonFormatter().format(queued))
+    assert data["message"] == "ошибка хода"
+    assert "ValueError: boom" in data["exc_info"]
+    text = logging.Formatter("%(message)s").format(queued)
+    assert text.startswith("ошибка хода\nTraceback")
@@ -0,0 +1,86 @@
+"""Тесты метрик сервера."""
+
+import asyncio
+
+import pytest
+
+from server.app import metrics
+
+
+def test_registry_renders_exposition_format():
+    """Счётчики и гистограммы выводятся в текстовом формате Prometheus."""
+    registry = metrics.Registry()
+    requests = registry.register(
+        metrics.Counter("demo_total", "Демо.", ("status",))
+    )
+    latency = registry.register(
+        metrics.Histogram("demo_seconds", "Задержка.", buckets=(0.1, 1.0))
+    )
+    registry.register_collector(
+        lambda: [("demo_items", "gauge", "Записи.", [({}, 3)])]
+    )
+
+    requests.labels("ok").inc()
+    requests.labels("ok").inc(2)
+    latency.observe(0.05)
+    latency.observe(0.5)
+
+    text = registry.render()
+    assert "# TYPE demo_total counter" in text
+    assert 'demo_total{status="ok"} 3.0' in text
+    assert 'demo_seconds_bucket{le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{le="1.0"} 2' in text
+    assert 'demo_seconds_bucket{le="+Inf"} 2' in text
+    assert "demo_seconds_count 2" in text
+    assert "demo_items 3" in text
+
+
+def test_metric_must_implement_samples():
+    """Метрику без :meth:`samples` нельзя создать."""
+
+    class Incomplete(metrics._Metric):
+        def _new_child(self):
+            return metrics._Value()
+
+    with pytest.raises(TypeError):
+        Incomplete("incomplete", "I.")
+
+
+def test_metrics_endpoint_reports_move_requests(client, monkeypatch):
+    """После хода эндпоинт отдаёт задержку маршрута и счётчики ходов."""
+    monkeypatch.setattr(
+        "server.app.gpt_client.query_model", lambda _fen, legal, **_: legal[0]
+    )
+    payload = {
+        "fen": "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+        "side": "w",
+        "client_move": "e2e4",
+    }
+    assert client.post("/move", json=payload).status_code == 200
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert (
+        'http_request_duration_seconds_count{method="POST",route="/move",'
+        'status="200"}'
+    ) in text
+    assert 'move_requests_total{status="ok"}' in text
+    assert 'ai_moves_total{provider="gpt"}' in text
+    assert 'move_cache_requests_total{result="miss"}' in text
+    assert 'gpt_circuit_state{state="closed"} 1' in text
+
+
+def test_event_loop_monitor_observes_lag():
+    """Монитор цикла событий записывает задержку пробуждения."""
+    before = sum(metrics.EVENT_LOOP_LAG.labels().counts)
+
+    async def scenario():
+        task = metrics.start_event_loop_monitor(0.01)
+        await asyncio.sleep(0.05)
+        task.cancel()
+
+    asyncio.run(scenario())
+    assert sum(metrics.EVENT_LOOP_LAG.labels().counts) > before
@@ -0,0 +1,69 @@
+"""Тесты пакетного эндпоинта ходов."""
+
+import json
+
+import chess
+from fastapi.testclient import TestClient
+
+START = chess.STARTING_FEN
+
+
+def _fake_ai(_fen, legal, **_):
+    return legal[0]
+
+
+def test_batch_returns_results_in_order(monkeypatch):
+    """Ответы возвращаются в порядке элементов запроса."""
+    monkeypatch.setattr("server.app.gpt_client.query_model", _fake_ai)
+    from server.app.main import app
+
+    client = TestClient(app)
+    payload = {
+        "items": [
+            {"fen": START, "side": "w", "client_move": "e2e4"},
+            {"fen": "invalid", "side": "w"},
+            {"fen": START, "side": "w", "client_move": "e2e5"},
+        ]
+    }
+    response = client.post("/move/batch", json=payload)
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert len(results) == 3
+    assert results[0]["status"] == "ok"
+    assert results[0]["applied_client_move"] is True
+    assert results[1]["errors"] == ["invalid_fen"]
+    assert results[2]["errors"] == ["illegal_client_move"]
+
+
+def test_batch_streams_ndjson(monkeypatch):
+    """При запросе NDJSON каждый ответ приходит отдельной строкой."""
+    monkeypatch.setattr("server.app.gpt_client.query_model", _fake_ai)
+    from server.app.main import app
+
+    client = TestClient(app)
+    payload = {
+        "items": [
+            {"fen": START, "side": "w", "client_move": "d2d4"},
+            {"fen": START, "side": "b"},
+        ]
+    }
+    response = client.post(
+        "/move/batch",
+        json=payload,
+        headers={"Accept": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith(
+        "application/x-ndjson"
+    )
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    by_index = {line["index"]: line["result"] for line in lines}
+    assert set(by_index) == {0, 1}
+    assert by_index[0]["status"] == "ok"
+    assert by_index[1]["errors"] == ["side_to_move_mismatch"]
+
+
+def test_batch_rejects_empty_items(client):
+    """Пустой пакет отклоняется валидацией."""
+    response = client.post("/move/batch", json={"items": []})
+    assert response.status_code == 422
@@ -0,0 +1,80 @@
+"""Тесты кэша ходов ИИ."""
+
+from types import SimpleNamespace
+
+import server.app.gpt_client as gpt_client
+from server.app.move_cache import MoveCache, make_cache_key
+
+
+def test_cache_key_ignores_move_counters():
+    """Счётчики ходов и порядок легальных ходов не влияют на ключ."""
+    key1 = make_cache_key(
+        "8/8/8/8/8/8/8/K6k w - - 0 1", ["a1a2", "a1b1"]
+    )
+    key2 = make_cache_key(
+        "8/8/8/8/8/8/8/K6k w - - 12 40", ["a1b1", "a1a2"]
+    )
+    assert key1 == key2
+
+
+def test_lru_eviction_by_entries():
+    """При превышении лимита вытесняется давно неиспользуемая запись."""
+    cache = MoveCache(max_entries=2)
+    cache.put("a", "e2e4")
+    cache.put("b", "d2d4")
+    assert cache.get("a") == "e2e4"
+    cache.put("c", "c2c4")
+    assert cache.get("b") is None
+    assert cache.get("a") == "e2e4"
+    assert cache.get("c") == "c2c4"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_eviction_by_bytes():
+    """Лимит по памяти ограничивает число записей."""
+    entry_size = MoveCache._entry_size("k0", "e2e4")
+    cache = MoveCache(max_entries=100, max_bytes=entry_size * 2)
+    for i in range(3):
+        cache.put(f"k{i}", "e2e4")
+    assert len(cache) == 2
+    assert cache.stats()["bytes"] <= entry_size * 2
+
+
+def test_ttl_expiry():
+    """Устаревшая запись считается промахом и удаляется."""
+    now = [0.0]
+    cache = MoveCache(ttl=10.0, clock=lambda: now[0])
+    cache.put("a", "e2e4")
+    now[0] = 5.0
+    assert cache.get("a") == "e2e4"
+    now[0] = 11.0
+    assert cache.get("a") is None
+    assert len(cache) == 0
+    assert cache.stats() == {
+        "entries": 0,
+        "bytes": 0,
+        "hits": 1,
+        "misses": 1,
+        "evictions": 1,
+    }
+
+
+def test_query_model_uses_cache(monkeypatch):
+    """Повторный запрос той же позиции не обращается к OpenAI."""
+    calls = []
+
+    def create(**_):
+        calls.append(1)
+        return SimpleNamespace(
+            output=[SimpleNamespace(content=[SimpleNamespace(text="b2b3")])]
+        )
+
+    dummy = SimpleNamespace(responses=SimpleNamespace(create=create))
+    monkeypatch.setattr(gpt_client, "_client", dummy)
+
+    legal_moves = ["a2a3", "b2b3"]
+    fen = "8/8/8/8/8/8/8/8 w - - 0 1"
+    assert gpt_client.query_model(fen, legal_moves) == "b2b3"
+    assert gpt_client.lookup_move(fen, legal_moves) == "b2b3"
+    assert len(calls) == 1
+    assert gpt_client._move_cache.stats()["hits"] == 1
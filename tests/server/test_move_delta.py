@@ -0,0 +1,157 @@
+"""Тесты компактного протокола /move/delta."""
+
+import chess
+
+from client.delta import DeltaMoveClient
+from shared.chess import position_hash
+
+START_FEN = chess.STARTING_FEN
+
+
+def _fake_ai(monkeypatch):
+    monkeypatch.setattr(
+        "server.app.gpt_client.query_model", lambda _fen, legal, **_: legal[0]
+    )
+
+
+def test_move_returns_position_hash(client, monkeypatch):
+    """Ответ /move содержит хэш новой позиции, если клиент его запросил."""
+    _fake_ai(monkeypatch)
+    payload = {
+        "fen": START_FEN,
+        "side": "w",
+        "client_move": "e2e4",
+        "delta": True,
+    }
+
+    data = client.post("/move", json=payload).json()
+
+    assert data["hash"] == position_hash(chess.Board(data["new_fen"]))
+
+
+def test_move_skips_index_without_delta(client, monkeypatch):
+    """Без поля delta позиция не индексируется и хэш не возвращается."""
+    from server.app import routes
+
+    _fake_ai(monkeypatch)
+    routes._position_index.clear()
+    payload = {"fen": START_FEN, "side": "w", "client_move": "e2e4"}
+
+    data = client.post("/move", json=payload).json()
+
+    assert data["hash"] is None
+    assert len(routes._position_index) == 0
+
+
+def test_delta_move_continues_from_hash(client, monkeypatch):
+    """Ход по хэшу применяется к сохранённой позиции."""
+    _fake_ai(monkeypatch)
+    payload = {
+        "fen": START_FEN,
+        "side": "w",
+        "client_move": "e2e4",
+        "delta": True,
+    }
+    first = client.post("/move", json=payload).json()
+
+    response = client.post(
+        "/move/delta",
+        json={
+            "hash": first["hash"],
+            "client_move": "d2d4",
+            "halfmove_clock": 0,
+            "fullmove_number": 2,
+        },
+    )
+
+    data = response.json()
+    assert data["status"] == "ok"
+    assert "new_fen" not in data
+    board = chess.Board(first["new_fen"])
+    board.push_uci("d2d4")
+    board.push_uci(data["ai_move"])
+    assert data["hash"] == position_hash(board)
+
+
+def test_delta_uses_move_counters_of_request(client, monkeypatch):
+    """Партии с одной позицией и разными счётчиками не путаются."""
+    _fake_ai(monkeypatch)
+    hashes = []
+    for counters in ("0 1", "146 80"):
+        payload = {
+            "fen": f"4k3/8/8/8/8/8/8/R3K3 w - - {counters}",
+            "side": "w",
+            "client_move": "a1a2",
+            "delta": True,
+        }
+        hashes.append(client.post("/move", json=payload).json()["hash"])
+    assert hashes[0] == hashes[1]
+
+    def delta(halfmove_clock, fullmove_number):
+        return client.post(
+            "/move/delta",
+            json={
+                "hash": hashes[0],
+                "client_move": "a2a3",
+                "halfmove_clock": halfmove_clock,
+                "fullmove_number": fullmove_number,
+            },
+        ).json()
+
+    # Индекс хранит позицию второй партии, но счётчики берутся из запроса
+    assert delta(2, 2)["flags"]["seventyfive_moves"] is False
+    assert delta(148, 81)["flags"]["seventyfive_moves"] is True
+
+
+def test_unknown_hash_requires_resync(client):
+    """Неизвестный хэш требует полной синхронизации."""
+    response = client.post(
+        "/move/delta",
+        json={
+            "hash": "0" * 16,
+            "client_move": "e2e4",
+            "halfmove_clock": 0,
+            "fullmove_number": 1,
+        },
+    )
+
+    data = response.json()
+    assert data["status"] == "error"
+    assert data["errors"] == ["resync_required"]
+
+
+def test_invalid_hash_is_rejected(client):
+    """Хэш неверного формата отклоняется проверкой модели."""
+    response = client.post("/move/delta", json={"hash": "xyz"})
+    assert response.status_code == 422
+
+
+def test_delta_client_round_trip(client, monkeypatch):
+    """Клиент переходит на хэш и возвращается к FEN после сброса индекса."""
+    from server.app import routes
+
+    _fake_ai(monkeypatch)
+    paths = []
+    post = client.post
+
+    def tracking_post(url, **kwargs):
+        paths.append(url)
+        return post(url, **kwargs)
+
+    monkeypatch.setattr(client, "post", tracking_post)
+    move_client = DeltaMoveClient(client)
+
+    first = move_client.send_move(START_FEN, "w", "e2e4")
+    second = move_client.send_move(first["new_fen"], "w", "d2d4")
+
+    assert paths == ["/move", "/move/delta"]
+    board = chess.Board(first["new_fen"])
+    board.push_uci("d2d4")
+    board.push_uci(second["ai_move"])
+    assert second["new_fen"] == board.fen()
+
+    routes._position_index.clear()
+    third = move_client.send_move(second["new_fen"], "w", "g1f3")
+
+    assert paths[2:] == ["/move/delta", "/move"]
+    assert third["applied_client_move"]
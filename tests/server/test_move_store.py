@@ -0,0 +1,79 @@
+"""Тесты постоянного хранилища ходов ИИ."""
+
+import asyncio
+from types import SimpleNamespace
+
+import server.app.gpt_client as gpt_client
+from server.app.move_cache import MoveCache
+from server.app.move_store import MoveStore
+
+
+def test_store_survives_reopen(tmp_path):
+    """Записанный ход доступен после повторного открытия базы."""
+    path = str(tmp_path / "moves.sqlite")
+    store = MoveStore(path)
+    store.put("k", "e2e4")
+    store.close()
+
+    reopened = MoveStore(path)
+    assert reopened.get("k") == "e2e4"
+    assert reopened.get("missing") is None
+    assert len(reopened) == 1
+    reopened.close()
+
+
+def test_compaction_keeps_recent_entries(tmp_path):
+    """Уплотнение удаляет давно не использованные записи."""
+    store = MoveStore(
+        str(tmp_path / "moves.sqlite"), max_entries=2, compact_slack=0
+    )
+    store.put("a", "a2a3")
+    store.put("b", "b2b3")
+    store.get("a")
+    store.put("c", "c2c3")
+    assert len(store) == 2
+    assert store.get("b") is None
+    assert store.get("a") == "a2a3"
+    assert store.get("c") == "c2c3"
+    store.close()
+
+
+def test_warm_up_fills_cache(tmp_path):
+    """Прогрев загружает записи хранилища в кэш памяти."""
+    store = MoveStore(str(tmp_path / "moves.sqlite"))
+    store.put("a", "a2a3")
+    store.put("b", "b2b3")
+    cache = MoveCache()
+    assert store.warm_up(cache, limit=10) == 2
+    assert cache.get("a") == "a2a3"
+    assert cache.get("b") == "b2b3"
+    store.close()
+
+
+def test_lookup_move_reads_store(monkeypatch, tmp_path):
+    """Ход из хранилища используется без обращения к OpenAI."""
+    store = MoveStore(str(tmp_path / "moves.sqlite"))
+    monkeypatch.setattr(gpt_client, "_move_store", store)
+
+    def create(**_):
+        return SimpleNamespace(
+            output=[SimpleNamespace(content=[SimpleNamespace(text="b2b3")])]
+        )
+
+    monkeypatch.setattr(
+        gpt_client,
+        "_client",
+        SimpleNamespace(responses=SimpleNamespace(create=create)),
+    )
+    fen = "8/8/8/8/8/8/8/8 w - - 0 1"
+    legal_moves = ["a2a3", "b2b3"]
+    assert gpt_client.query_model(fen, legal_moves) == "b2b3"
+
+    # Новый процесс: пустой кэш памяти и недоступный OpenAI
+    gpt_client._move_cache.clear()
+    monkeypatch.setattr(gpt_client, "_client", None)
+    assert gpt_client.lookup_move(fen, legal_moves) == "b2b3"
+    assert (
+        asyncio.run(gpt_client.lookup_move_async(fen, legal_moves)) == "b2b3"
+    )
+    store.close()
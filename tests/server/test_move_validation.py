@@ -16,11 +16,10 @@ EXPECTED_FLAGS = {
 def test_legal_client_move(monkeypatch):
     """Легальный ход должен применяться без ошибок."""
 
-    def fake_ai(_fen, legal):  # pragma: no cover
+    def fake_ai(_fen, legal, **_):  # pragma: no cover
         return legal[0]
 
-    monkeypatch.setattr("server.app.gpt_client.get_ai_move", fake_ai)
-    monkeypatch.setattr("server.app.routes.get_ai_move", fake_ai)
+    monkeypatch.setattr("server.app.gpt_client.query_model", fake_ai)
     from server.app.main import app
 
     client = TestClient(app)
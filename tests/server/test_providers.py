@@ -0,0 +1,147 @@
+"""Тесты цепочки источников хода ИИ."""
+
+import asyncio
+import struct
+import time
+
+import chess
+import chess.polyglot
+import pytest
+
+from server.app import providers
+
+
+class _Fixed(providers.MoveProvider):
+    def __init__(self, name, move, delay=0.0):
+        self.name = name
+        self.move = move
+        self.delay = delay
+
+    async def propose(self, query):
+        await asyncio.sleep(self.delay)
+        return self.move
+
+
+def _select(pipeline, board=None, deadline=None):
+    board = board or chess.Board()
+    legal = [move.uci() for move in board.legal_moves]
+    return asyncio.run(
+        pipeline.select_move(board, board.fen(), legal, deadline)
+    )
+
+
+def test_first_legal_move_wins_and_stats_are_recorded():
+    """Этапы опрашиваются по порядку до первого легального хода."""
+    pipeline = providers.MovePipeline(
+        [
+            (_Fixed("cache", None), None),
+            (_Fixed("gpt", "zzzz"), None),
+            (_Fixed("engine", "e2e4"), None),
+            (_Fixed("random", "d2d4"), None),
+        ]
+    )
+
+    result = _select(pipeline)
+
+    assert result == ("e2e4", "engine", ("gpt",))
+    stats = pipeline.stats()
+    assert stats["cache"]["misses"] == 1
+    assert stats["gpt"]["invalid"] == 1
+    assert stats["engine"]["hits"] == 1
+    assert stats["random"]["calls"] == 0
+
+
+def test_stage_budget_moves_on_to_next_stage():
+    """Этап, превысивший бюджет, уступает следующему."""
+    pipeline = providers.MovePipeline(
+        [
+            (_Fixed("gpt", "e2e4", delay=1.0), 0.05),
+            (_Fixed("engine", "d2d4"), None),
+        ]
+    )
+
+    start = time.monotonic()
+    result = _select(pipeline)
+
+    assert result.move == "d2d4"
+    assert time.monotonic() - start < 0.5
+    assert pipeline.stats()["gpt"]["timeouts"] == 1
+
+
+def test_later_budgets_are_reserved_from_deadline():
+    """Бюджет последующих этапов вычитается из общего крайнего срока."""
+    pipeline = providers.MovePipeline(
+        [
+            (_Fixed("gpt", "e2e4", delay=1.0), None),
+            (_Fixed("engine", "d2d4"), 0.2),
+        ]
+    )
+
+    start = time.monotonic()
+    result = _select(pipeline, deadline=time.monotonic() + 0.3)
+
+    assert result.move == "d2d4"
+    assert time.monotonic() - start < 0.3
+
+
+def test_build_pipeline_from_config(monkeypatch):
+    """Порядок и бюджеты задаются строками конфигурации."""
+    monkeypatch.delenv("OPENING_BOOK_PATH", raising=False)
+
+    pipeline = providers.build_pipeline(
+        "gpt,book,unknown,engine", "gpt:1500,engine:300"
+    )
+
+    assert pipeline.names == ["gpt", "engine"]
+    assert pipeline.stages[0][1] == 1.5
+    assert pipeline.stages[1][0].time_limit_ms == 300
+
+
+def test_unreadable_book_is_skipped_once(tmp_path, monkeypatch, caplog):
+    """Недоступная книга пропускается при сборке цепочки."""
+    monkeypatch.setenv("OPENING_BOOK_PATH", str(tmp_path / "missing.bin"))
+
+    with caplog.at_level("WARNING", logger=providers.logger.name):
+        pipeline = providers.build_pipeline("book,random", "")
+        _select(pipeline)
+        _select(pipeline)
+
+    assert pipeline.names == ["random"]
+    assert len(caplog.records) == 1
+
+
+def test_book_provider_prefers_heaviest_entry(tmp_path):
+    """Из дебютной книги выбирается ход с наибольшим весом."""
+    board = chess.Board()
+    key = chess.polyglot.zobrist_hash(board)
+
+    def raw(move):
+        return move.to_square | (move.from_square << 6)
+
+    entries = [
+        (chess.Move.from_uci("d2d4"), 5),
+        (chess.Move.from_uci("e2e4"), 10),
+    ]
+    book = tmp_path / "book.bin"
+    book.write_bytes(
+        b"".join(
+            struct.pack(">QHHI", key, raw(move), weight, 0)
+            for move, weight in entries
+        )
+    )
+    pipeline = providers.MovePipeline(
+        [(providers.BookProvider(str(book)), None)]
+    )
+
+    assert _select(pipeline).provider == "book"
+    assert _select(pipeline).move == "e2e4"
+
+
+def test_provider_must_implement_propose():
+    """Источник без :meth:`propose` нельзя создать."""
+
+    class Incomplete(providers.MoveProvider):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
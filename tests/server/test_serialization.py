@@ -0,0 +1,68 @@
+"""Тесты быстрой сериализации ответов и MessagePack."""
+
+import msgpack
+import pytest
+
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+PAYLOAD = {"fen": START_FEN, "side": "w", "client_move": "e2e4"}
+
+
+@pytest.fixture(autouse=True)
+def fake_ai(monkeypatch):
+    monkeypatch.setattr(
+        "server.app.gpt_client.query_model", lambda _fen, legal, **_: legal[0]
+    )
+
+
+def test_json_response_matches_schema(client):
+    """Ответ без согласования остаётся JSON по схеме MoveResponse."""
+    from server.app.models import MoveResponse
+
+    response = client.post("/move", json=PAYLOAD)
+
+    assert response.headers["content-type"] == "application/json"
+    data = MoveResponse.model_validate(response.json())
+    assert data.applied_client_move
+    assert data.errors == []
+
+
+def test_msgpack_request_and_response(client):
+    """Клиент может отправить и получить ход в MessagePack."""
+    response = client.post(
+        "/move",
+        content=msgpack.packb(PAYLOAD),
+        headers={
+            "Content-Type": "application/msgpack",
+            "Accept": "application/msgpack",
+        },
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/msgpack"
+    data = msgpack.unpackb(response.content)
+    assert data["applied_client_move"] is True
+    assert data["flags"]["check"] is False
+    assert data["new_fen"] != START_FEN
+
+
+def test_invalid_msgpack_body_is_rejected(client):
+    """Повреждённое тело MessagePack даёт ответ 400."""
+    response = client.post(
+        "/move",
+        content=b"\xc1",
+        headers={"Content-Type": "application/msgpack"},
+    )
+
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Invalid MessagePack body"}
+
+
+def test_msgpack_body_is_validated(client):
+    """Тело MessagePack проверяется той же моделью запроса."""
+    response = client.post(
+        "/move",
+        content=msgpack.packb({"fen": START_FEN, "side": "x"}),
+        headers={"Content-Type": "application/msgpack"},
+    )
+
+    assert response.status_code == 422
@@ -0,0 +1,50 @@
+"""Тесты заголовка Server-Timing."""
+
+
+def _phases(header):
+    return {
+        metric.split(";")[0].strip(): float(metric.split("dur=")[1])
+        for metric in header.split(",")
+    }
+
+
+def test_move_response_has_server_timing(client, monkeypatch):
+    """Ответ /move содержит длительности этапов обработки хода."""
+    monkeypatch.setattr(
+        "server.app.gpt_client.query_model", lambda _fen, legal, **_: legal[0]
+    )
+    payload = {
+        "fen": "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+        "side": "w",
+        "client_move": "e2e4",
+    }
+
+    response = client.post("/move", json=payload)
+
+    timings = _phases(response.headers["server-timing"])
+    for phase in ("fen", "validate", "analyze", "ai", "ai-gpt", "flags"):
+        assert phase in timings
+    assert "respond" in timings
+    assert timings["total"] >= timings["ai"]
+
+
+def test_timing_log_line(monkeypatch, caplog):
+    """При TIMING_LOG=1 замеры пишутся в лог строкой JSON."""
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from server.app.timing import ServerTimingMiddleware, span
+
+    app = FastAPI()
+    app.add_middleware(ServerTimingMiddleware, log=True)
+
+    @app.get("/ping")
+    async def ping():
+        with span("work"):
+            return {"ok": True}
+
+    with caplog.at_level("INFO"):
+        response = TestClient(app).get("/ping")
+
+    assert "work;dur=" in response.headers["server-timing"]
+    assert '"path": "/ping"' in caplog.text
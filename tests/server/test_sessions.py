@@ -0,0 +1,189 @@
+"""Тесты хранилища игровых сессий."""
+
+import asyncio
+import time
+
+import chess
+import httpx
+from fastapi.testclient import TestClient
+
+import server.app.routes as routes
+from server.app import metrics
+from server.app.sessions import (
+    GameSession,
+    SessionStore,
+    decode_move,
+    encode_move,
+)
+
+
+def test_move_encoding_roundtrip():
+    """Кодирование сохраняет клетки и фигуру превращения."""
+    for uci in ("e2e4", "e7e8q", "a2a1n", "e1g1"):
+        move = chess.Move.from_uci(uci)
+        assert decode_move(encode_move(move)) == move
+        assert encode_move(move) < 2 ** 16
+
+
+def test_session_replays_history():
+    """Доска сессии восстанавливается вместе с историей ходов."""
+    session = GameSession(chess.STARTING_FEN, 0.0)
+    board = session.board()
+    board.push_uci("e2e4")
+    board.push_uci("e7e5")
+    session.sync(board)
+    assert list(session.moves) == [
+        encode_move(m) for m in board.move_stack
+    ]
+    assert session.board().fen() == board.fen()
+
+    restored = GameSession(chess.STARTING_FEN, 0.0)
+    restored.moves = session.moves
+    assert restored.board().fen() == board.fen()
+
+
+def test_session_board_keeps_reversible_tail():
+    """Доска сессии хранит ходы после последнего необратимого хода."""
+    session = GameSession(chess.STARTING_FEN, 0.0)
+    board = session.board()
+    for move in ("e2e4", "g8f6", "g1f3", "f6g8"):
+        board.push_uci(move)
+    session.sync(board)
+
+    board = session.board()
+    assert [m.uci() for m in board.move_stack] == ["g8f6", "g1f3", "f6g8"]
+    # Изменения копии не попадают в сессию до sync
+    board.push_uci("f3g1")
+    assert session.board().fen() != board.fen()
+    session.sync(board)
+    assert len(session.moves) == 5
+    assert session.board().fen() == board.fen()
+
+
+def test_store_evicts_lru_and_idle():
+    """Сессии вытесняются по числу и по времени простоя."""
+    now = [0.0]
+    store = SessionStore(max_sessions=2, idle_timeout=10, clock=lambda: now[0])
+    first = store.create()
+    second = store.create()
+    store.get(first)
+    third = store.create()
+    assert store.get(second) is None
+    assert store.get(first) is not None
+    now[0] = 20.0
+    assert store.get(third) is None
+    assert len(store) == 0
+
+
+def test_store_respects_memory_ceiling():
+    """Потолок памяти ограничивает число сессий."""
+    size = GameSession(chess.STARTING_FEN, 0.0).nbytes
+    store = SessionStore(max_bytes=size * 2)
+    for _ in range(5):
+        store.create()
+    assert len(store) == 2
+    assert store.stats()["bytes"] <= size * 2
+
+
+def test_store_rejects_stale_version():
+    """Сессия, прочитанная до чужого сохранения, не затирает его."""
+    store = SessionStore()
+    game_id = store.create()
+    first = store.get(game_id)
+    second = store.get(game_id)
+
+    board = first.board()
+    board.push_uci("e2e4")
+    first.sync(board)
+    assert store.put(game_id, first)
+
+    board = second.board()
+    board.push_uci("d2d4")
+    second.sync(board)
+    assert not store.put(game_id, second)
+
+    restored = store.get(game_id)
+    assert list(restored.moves) == [encode_move(chess.Move.from_uci("e2e4"))]
+    assert restored.version == first.version == 2
+
+
+def _session_conflicts() -> float:
+    """Значение счётчика конфликтов сессий из выдачи метрик."""
+    for line in metrics.REGISTRY.render().splitlines():
+        if line.startswith("game_session_conflicts_total "):
+            return float(line.split()[1])
+    return 0.0
+
+
+def test_concurrent_moves_keep_first_history(monkeypatch):
+    """Из двух одновременных ходов одной игры в историю попадает один."""
+    store = SessionStore()
+    monkeypatch.setattr(routes, "_session_store", store)
+
+    def slow_ai(_fen, legal, **_):
+        time.sleep(0.05)
+        return legal[0]
+
+    monkeypatch.setattr("server.app.gpt_client.query_model", slow_ai)
+    from server.app.main import app
+
+    game_id = store.create()
+    conflicts = _session_conflicts()
+
+    async def play():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as http:
+            return await asyncio.gather(
+                *(
+                    http.post(
+                        "/move",
+                        json={
+                            "fen": chess.STARTING_FEN,
+                            "side": "w",
+                            "client_move": move,
+                            "game_id": game_id,
+                        },
+                    )
+                    for move in ("e2e4", "d2d4")
+                )
+            )
+
+    responses = asyncio.run(play())
+
+    assert all(r.json()["status"] == "ok" for r in responses)
+    assert len(store.get(game_id).moves) == 2
+    assert _session_conflicts() == conflicts + 1
+
+
+def test_move_with_game_id_tracks_repetition(monkeypatch):
+    """С сессией сервер фиксирует пятикратный повтор позиции."""
+    monkeypatch.setattr(routes, "_session_store", SessionStore())
+    replies = {"g8f6", "f6g8"}
+
+    def fake_ai(_fen, legal, **_):
+        return next(m for m in legal if m in replies)
+
+    monkeypatch.setattr("server.app.gpt_client.query_model", fake_ai)
+    from server.app.main import app
+
+    client = TestClient(app)
+    new = client.post("/new").json()
+    game_id = new["game_id"]
+    fen = new["fen"]
+    data = None
+    for _ in range(4):
+        for move in ("g1f3", "f3g1"):
+            data = client.post(
+                "/move",
+                json={
+                    "fen": fen,
+                    "side": "w",
+                    "client_move": move,
+                    "game_id": game_id,
+                },
+            ).json()
+            fen = data["new_fen"]
+    assert data["game_id"] == game_id
+    assert data["flags"]["fivefold_repetition"] is True
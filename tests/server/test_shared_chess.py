@@ -2,7 +2,11 @@
 
 import chess
 
-from shared.chess import compute_game_flags, validate_and_apply_move
+from shared.chess import (
+    analyze_position,
+    compute_game_flags,
+    validate_and_apply_move,
+)
 
 
 def test_validate_and_apply_move_success():
@@ -29,3 +33,41 @@ def test_compute_game_flags_checkmate():
     assert flags["checkmate"]
     assert flags["check"]
     assert not flags["stalemate"]
+
+
+def test_analyze_position_matches_board_checks():
+    """Флаги однократного анализа совпадают с проверками python-chess."""
+    fens = [
+        chess.STARTING_FEN,
+        "k7/1Q6/2K5/8/8/8/8/8 b - - 0 1",
+        "k7/1Q6/1K6/8/8/8/8/8 b - - 0 1",
+        "8/8/8/8/8/8/8/K6k w - - 0 1",
+        "8/8/8/4k3/8/8/4P3/4K3 w - - 150 200",
+    ]
+    for fen in fens:
+        board = chess.Board(fen)
+        analysis = analyze_position(board)
+        assert analysis.flags == {
+            "check": board.is_check(),
+            "checkmate": board.is_checkmate(),
+            "stalemate": board.is_stalemate(),
+            "insufficient_material": board.is_insufficient_material(),
+            "seventyfive_moves": board.is_seventyfive_moves(),
+            "fivefold_repetition": board.is_fivefold_repetition(),
+        }
+        assert analysis.is_game_over == board.is_game_over()
+        assert analysis.legal_moves == [m.uci() for m in board.legal_moves]
+
+
+def test_validate_and_apply_move_accepts_board():
+    """Ход применяется к переданной доске без повторного разбора FEN."""
+    board = chess.Board()
+    result, errors = validate_and_apply_move(board, "e2e4")
+    assert not errors
+    assert result is board
+    assert board.peek() == chess.Move.from_uci("e2e4")
+
+    result, errors = validate_and_apply_move(board, "e2e4")
+    assert result is None
+    assert errors == ["illegal_client_move"]
+    assert len(board.move_stack) == 1
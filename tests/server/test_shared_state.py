@@ -0,0 +1,217 @@
+"""Тесты общего состояния воркеров."""
+
+import asyncio
+import os
+
+import chess
+
+from server.app import metrics, routes
+from server.app.admission import RateLimiter
+from server.app.move_store import MoveStore
+from server.app.shared_state import (
+    SharedMetrics,
+    SharedRateLimiter,
+    SharedSessionStore,
+    reset_run_state,
+)
+
+
+def test_rate_limit_is_shared_between_workers(tmp_path):
+    """Два воркера списывают токены из одного ведра клиента."""
+    path = str(tmp_path / "state.sqlite3")
+    now = [1000.0]
+    first = SharedRateLimiter(path, rate=1.0, burst=2, clock=lambda: now[0])
+    second = SharedRateLimiter(path, rate=1.0, burst=2, clock=lambda: now[0])
+
+    assert first.check("client") is None
+    assert second.check("client") is None
+    assert first.check("client") == 1.0
+    assert second.check("other") is None
+
+    now[0] += 1.0
+    assert second.check("client") is None
+    assert len(first) == 2
+
+
+def _in_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def test_shared_stores_are_called_off_event_loop(tmp_path):
+    """Обращения к SQLite выполняются вне цикла событий."""
+    calls = []
+
+    class TrackingLimiter(SharedRateLimiter):
+        def check(self, key, cost=1.0):
+            calls.append(_in_event_loop())
+            return super().check(key, cost)
+
+    class TrackingMemoryLimiter(RateLimiter):
+        def check(self, key, cost=1.0):
+            calls.append(_in_event_loop())
+            return super().check(key, cost)
+
+    shared = TrackingLimiter(str(tmp_path / "s.sqlite3"), rate=1.0, burst=1)
+    memory = TrackingMemoryLimiter(rate=1.0, burst=1)
+
+    assert asyncio.run(routes._state_call(shared.check, "client")) is None
+    assert asyncio.run(routes._state_call(memory.check, "client")) is None
+    assert calls == [False, True]
+
+
+def test_sessions_are_shared_between_workers(tmp_path):
+    """Сессия, обновлённая одним воркером, видна другому."""
+    path = str(tmp_path / "state.sqlite3")
+    now = [0.0]
+    first = SharedSessionStore(path, idle_timeout=10, clock=lambda: now[0])
+    second = SharedSessionStore(path, idle_timeout=10, clock=lambda: now[0])
+
+    game_id = first.create()
+    session = second.get(game_id)
+    board = session.board()
+    board.push_uci("e2e4")
+    board.push_uci("e7e5")
+    session.sync(board)
+    second.put(game_id, session)
+
+    restored = first.get(game_id)
+    assert restored.board().fen() == board.fen()
+    assert list(restored.moves) == list(session.moves)
+    assert first.stats()["sessions"] == 1
+
+    now[0] = 20.0
+    assert first.get(game_id) is None
+    first.evict_idle()
+    assert len(second) == 0
+
+
+def test_shared_session_rejects_stale_version(tmp_path):
+    """Воркер с устаревшей версией сессии не затирает чужие ходы."""
+    path = str(tmp_path / "state.sqlite3")
+    first = SharedSessionStore(path)
+    second = SharedSessionStore(path)
+    game_id = first.create()
+    stale = second.get(game_id)
+
+    session = first.get(game_id)
+    board = session.board()
+    board.push_uci("e2e4")
+    session.sync(board)
+    assert first.put(game_id, session)
+
+    board = stale.board()
+    board.push_uci("d2d4")
+    stale.sync(board)
+    assert not second.put(game_id, stale)
+    assert second.get(game_id).board().fen() == session.board().fen()
+
+
+def test_move_store_tables_are_independent(tmp_path):
+    """Хранилища в разных таблицах одного файла не мешают друг другу."""
+    path = str(tmp_path / "state.sqlite3")
+    moves = MoveStore(path)
+    positions = MoveStore(path, table="positions")
+
+    moves.put("key", "e2e4")
+    positions.put("key", chess.STARTING_FEN)
+
+    assert moves.get("key") == "e2e4"
+    assert positions.get("key") == chess.STARTING_FEN
+    positions.clear()
+    assert positions.get("key") is None
+    assert moves.get("key") == "e2e4"
+
+
+def test_reset_run_state_keeps_move_cache(tmp_path):
+    """Перед запуском удаляется состояние прошлого запуска, кроме кэша."""
+    path = str(tmp_path / "state.sqlite3")
+    limiter = SharedRateLimiter(path, rate=1.0, burst=1)
+    sessions = SharedSessionStore(path)
+    positions = MoveStore(path, table="positions")
+    moves = MoveStore(path)
+    limiter.check("client")
+    game_id = sessions.create()
+    positions.put("key", chess.STARTING_FEN)
+    moves.put("key", "e2e4")
+
+    reset_run_state(path)
+
+    assert len(limiter) == 0
+    assert sessions.get(game_id) is None
+    assert positions.get("key") is None
+    assert moves.get("key") == "e2e4"
+
+
+def test_serve_uses_private_state_file(monkeypatch):
+    """Без SHARED_STATE_PATH каждый запуск получает свой каталог."""
+    import uvicorn
+
+    from server.app import main
+
+    paths = []
+
+    def fake_run(*_args, **_kwargs):
+        path = os.environ["SHARED_STATE_PATH"]
+        assert os.path.isdir(os.path.dirname(path))
+        paths.append(path)
+
+    monkeypatch.setattr(main, "_SERVER_WORKERS", 2)
+    monkeypatch.setenv("SHARED_STATE_PATH", "")
+    monkeypatch.setattr(uvicorn, "run", fake_run)
+
+    main.serve()
+    monkeypatch.setenv("SHARED_STATE_PATH", "")
+    main.serve()
+
+    assert paths[0] != paths[1]
+    assert not any(os.path.exists(os.path.dirname(p)) for p in paths)
+
+
+def test_metrics_are_merged_across_workers(tmp_path):
+    """Счётчики складываются, индикаторы выдаются по воркерам."""
+    path = str(tmp_path / "state.sqlite3")
+    now = [0.0]
+
+    def snapshot(requests, in_flight):
+        registry = metrics.Registry()
+        registry.register(metrics.Counter("requests_total", "R.")).inc(
+            requests
+        )
+        registry.register(metrics.Gauge("in_flight", "F.")).set(in_flight)
+        return registry.collect()
+
+    first = SharedMetrics(
+        path, worker="1", stale_after=10, clock=lambda: now[0]
+    )
+    second = SharedMetrics(
+        path, worker="2", stale_after=10, clock=lambda: now[0]
+    )
+    first.publish(snapshot(3.0, 1.0))
+    now[0] = 15.0
+    second.publish(snapshot(4.0, 2.0))
+
+    text = metrics.render_families(
+        metrics.merge_families(second.snapshots())
+    )
+
+    assert "requests_total 7.0" in text
+    assert 'in_flight{worker="2"} 2.0' in text
+    # Снимок первого воркера устарел: его индикаторы не выдаются
+    assert 'worker="1"' not in text
+
+    first.reset()
+    assert second.snapshots() == []
+
+
+def test_registry_renders_shared_metrics(tmp_path):
+    """Реестр с общим хранилищем публикует свой снимок при выдаче."""
+    store = SharedMetrics(str(tmp_path / "state.sqlite3"), worker="7")
+    registry = metrics.Registry()
+    registry.register(metrics.Gauge("in_flight", "F.")).set(1.0)
+    registry.share(store)
+
+    assert 'in_flight{worker="7"} 1.0' in registry.render()